@@ -6,14 +6,23 @@ import os
 import sys
 import json
 import time
-import subprocess
+import atexit
+import threading
 import logging
-from datetime import datetime
+import urllib.request
+from datetime import datetime, timedelta
 from pathlib import Path
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
+from concurrent.futures import TimeoutError as FutureTimeout
 from dotenv import load_dotenv
 
+from jobs import JobQueue, JobCancelled, QueueFull, TASKS
+from downsample import MAX_POINTS, load_chart, to_json
+from supervisor import BotSupervisor
+from model_watch import request_rollback
+import metrics
+
 # --- Seadistus ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - [API] %(message)s')
 logger = logging.getLogger(__name__)
@@ -28,191 +37,306 @@ if env_path.exists():
 app = Flask(__name__)
 CORS(app)
 
-# --- Globaalne boti staatus ---
-BOT_STATE = {
-    "running": False,
-    "process": None,
-    "started_at": None,
-    "last_trade": None,
-    "total_trades": 0,
-    "error": None
-}
-
+# --- Boti protsess ---
 BOT_SCRIPT = Path(__file__).parent / "bot.py"
+SSE_HEARTBEAT = 15  # sekundit; hoiab proksid ja brauseri ühenduse lahti
+
+supervisor = BotSupervisor([sys.executable, str(BOT_SCRIPT)], cwd=str(BOT_SCRIPT.parent))
+atexit.register(supervisor.stop)
+
+# --- Mõõdikud ---
+BOT_METRICS_PORT = os.getenv('METRICS_PORT')  # Kui määratud, avaldab ka bot mõõdikud (pärib keskkonna)
+
+metrics.enable()
+API_REQUESTS = metrics.histogram('api_request_seconds', 'API päringute kestus (s)', ['endpoint', 'status'])
+metrics.gauge('bot_up', 'Kas boti protsess jookseb').set_function(lambda: int(supervisor.running))
+metrics.gauge('bot_restarts', 'Taaskäivitusi järelevalve algusest').set_function(lambda: supervisor.restarts)
+metrics.gauge('bot_uptime_seconds', 'Praeguse boti protsessi tööaeg (s)') \
+    .set_function(lambda: supervisor.status()["uptime_seconds"])
+
+@app.before_request
+def _start_timer():
+    g.started = time.perf_counter()
+
+@app.after_request
+def _observe_request(response):
+    endpoint = request.url_rule.rule if request.url_rule else "unknown"
+    API_REQUESTS.observe(time.perf_counter() - g.started, endpoint=endpoint, status=response.status_code)
+    return response
+
+# --- Jagatud Supabase klient ja staatuse vahemälu ---
+STATUS_TTL = float(os.getenv('STATUS_TTL', 5))  # sekundit
+
+_supabase_client = None
+_client_lock = threading.Lock()
+_status_lock = threading.Lock()
+_status_cache = {"snapshot": None, "fetched_at": 0.0}
+
+def get_supabase():
+    """Üks Supabase klient protsessi kohta (httpx ühenduste kogumiga)"""
+    global _supabase_client
+    if _supabase_client is None:
+        with _client_lock:
+            if _supabase_client is None:
+                from supabase import create_client
+                
+                SUPABASE_URL = os.getenv('VITE_SUPABASE_URL') or os.getenv('SUPABASE_URL')
+                SUPABASE_KEY = os.getenv('VITE_SUPABASE_ANON_KEY') or os.getenv('SUPABASE_KEY')
+                if not SUPABASE_URL or not SUPABASE_KEY:
+                    raise RuntimeError("Supabase seaded puuduvad")
+                _supabase_client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return _supabase_client
+
+def get_status_snapshot():
+    """Viimane tehing ja ridade arv, vahemälus STATUS_TTL sekundit.
+    
+    Samaaegsed päringud ootavad lukul ja kasutavad ühe päringu tulemust.
+    """
+    if time.time() - _status_cache["fetched_at"] < STATUS_TTL:
+        return _status_cache["snapshot"]
+    with _status_lock:
+        if time.time() - _status_cache["fetched_at"] < STATUS_TTL:
+            return _status_cache["snapshot"]
+        
+        # Üks päring: viimane rida + hinnanguline ridade arv (ilma täisskaneerimiseta)
+        res = get_supabase().table('trade_logs') \
+            .select('*', count='estimated') \
+            .order('created_at', desc=True) \
+            .limit(1).execute()
+        snapshot = {
+            "last_trade": res.data[0] if res.data else None,
+            "total_trades": res.count or 0
+        }
+        _status_cache.update(snapshot=snapshot, fetched_at=time.time())
+        return snapshot
 
 @app.route('/api/bot/status', methods=['GET'])
 def get_bot_status():
     """Tagastab boti praeguse staatus"""
+    status = supervisor.status()
     try:
-        import supabase
-        from supabase import create_client
-        
-        SUPABASE_URL = os.getenv('VITE_SUPABASE_URL') or os.getenv('SUPABASE_URL')
-        SUPABASE_KEY = os.getenv('VITE_SUPABASE_ANON_KEY') or os.getenv('SUPABASE_KEY')
-        
-        if not SUPABASE_URL or not SUPABASE_KEY:
-            return jsonify({"error": "Supabase seaded puuduvad"}), 400
-        
-        supabase_client = create_client(SUPABASE_URL, SUPABASE_KEY)
-        
-        # Tõmbame viimased andmed
-        res = supabase_client.table('trade_logs').select('*').order('created_at', desc=True).limit(1).execute()
-        last_trade = res.data[0] if res.data else None
-        
-        # Loeme tehingute arvu
-        res = supabase_client.table('trade_logs').select('count').execute()
-        total_trades = res.count if hasattr(res, 'count') else 0
-        
-        return jsonify({
-            "running": BOT_STATE["running"],
-            "started_at": BOT_STATE["started_at"],
-            "last_trade": last_trade,
-            "total_trades": total_trades,
-            "error": BOT_STATE["error"]
-        }), 200
+        snapshot = get_status_snapshot()
+        status.update(last_trade=snapshot["last_trade"], total_trades=snapshot["total_trades"])
+        return jsonify(status), 200
         
+    except RuntimeError as e:
+        return jsonify({**status, "error": str(e)}), 400
     except Exception as e:
         logger.error(f"Status päring viga: {e}")
-        return jsonify({"error": str(e)}), 500
+        return jsonify({**status, "error": str(e)}), 500
 
 @app.route('/api/bot/start', methods=['POST'])
 def start_bot():
-    """Käivitab boti"""
-    global BOT_STATE
+    """Käivitab boti (järelevalve all: väljund loetakse puhvrisse, kukkumisel taaskäivitus)"""
+    if not BOT_SCRIPT.exists():
+        return jsonify({"error": f"Bot skripti ei leitud: {BOT_SCRIPT}"}), 404
     
-    if BOT_STATE["running"]:
+    if not supervisor.start():
         return jsonify({"error": "Bot on juba käivitatud"}), 400
     
-    try:
-        if not BOT_SCRIPT.exists():
-            return jsonify({"error": f"Bot skripti ei leitud: {BOT_SCRIPT}"}), 404
-        
-        # Käivitame boti subprotsessina
-        BOT_STATE["process"] = subprocess.Popen(
-            [sys.executable, str(BOT_SCRIPT)],
-            cwd=str(BOT_SCRIPT.parent),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
-        
-        BOT_STATE["running"] = True
-        BOT_STATE["started_at"] = datetime.now().isoformat()
-        BOT_STATE["error"] = None
-        
-        logger.info("✅ Bot käivitatud")
-        
-        return jsonify({
-            "status": "started",
-            "started_at": BOT_STATE["started_at"]
-        }), 200
-        
-    except Exception as e:
-        logger.error(f"Boti käivitus viga: {e}")
-        BOT_STATE["error"] = str(e)
-        return jsonify({"error": str(e)}), 500
+    logger.info("✅ Bot käivitatud")
+    return jsonify({
+        "status": "started",
+        "started_at": supervisor.started_at
+    }), 200
 
 @app.route('/api/bot/stop', methods=['POST'])
 def stop_bot():
     """Peatab boti"""
-    global BOT_STATE
-    
-    if not BOT_STATE["running"] or not BOT_STATE["process"]:
+    if not supervisor.supervised:
         return jsonify({"error": "Bot ei jooksu"}), 400
     
     try:
-        BOT_STATE["process"].terminate()
-        BOT_STATE["process"].wait(timeout=5)
-        
-        BOT_STATE["running"] = False
-        BOT_STATE["process"] = None
-        BOT_STATE["error"] = None
-        
-        logger.info("✅ Bot peatatud")
-        
-        return jsonify({"status": "stopped"}), 200
-        
-    except subprocess.TimeoutExpired:
-        BOT_STATE["process"].kill()
-        BOT_STATE["running"] = False
-        BOT_STATE["process"] = None
-        logger.warning("⚠️ Bot peatatud jõuga")
-        return jsonify({"status": "killed"}), 200
+        result = supervisor.stop()
+        if result == "killed":
+            logger.warning("⚠️ Bot peatatud jõuga")
+        else:
+            logger.info("✅ Bot peatatud")
+        return jsonify({"status": result}), 200
         
     except Exception as e:
         logger.error(f"Boti peatamise viga: {e}")
-        BOT_STATE["error"] = str(e)
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/bot/logs', methods=['GET'])
+def get_bot_logs():
+    """Viimased logiread: ?lines=200 (või ?after=<seq>)"""
+    lines = request.args.get('lines', 200, type=int)
+    after = request.args.get('after', 0, type=int)
+    return jsonify({"seq": supervisor.logs.seq, "lines": supervisor.logs.tail(after, lines)}), 200
+
+@app.route('/api/bot/logs/stream', methods=['GET'])
+def stream_bot_logs():
+    """Logide saba Server-Sent Events'ina.
+
+    Uuesti ühendudes jätkab brauser `Last-Event-ID` päisest; esimesel korral
+    saadetakse viimased ?lines=100 rida. Vigase id korral alustatakse puhvri
+    algusest.
+    """
+    buffer = supervisor.logs
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('after')
+    if last_id is not None:
+        try:
+            after = max(0, int(last_id))
+        except ValueError:
+            after = 0  # Kliendi päis, mitte serveri viga
+    else:
+        after = max(0, buffer.seq - request.args.get('lines', 100, type=int))
+
+    def events(after):
+        yield "retry: 2000\n\n"
+        while True:
+            entries = buffer.wait(after, timeout=SSE_HEARTBEAT)
+            if not entries:
+                yield ": keepalive\n\n"
+                continue
+            for entry in entries:
+                yield f"id: {entry['seq']}\ndata: {json.dumps(entry, ensure_ascii=False)}\n\n"
+            after = entries[-1]["seq"]
+
+    return Response(events(after), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# --- Tööjärjekord (backtest, treenimine) ---
+JOB_TIMEOUT = 600  # sünkroonse režiimi ooteaeg (s)
+
+_job_queue = None
+_job_lock = threading.Lock()
+
+def get_job_queue():
+    """Loob tööjärjekorra esimesel kasutusel (mitte importimisel, et spawn'itud
+    tööprotsessid ei looks omakorda uusi järjekordi)"""
+    global _job_queue
+    with _job_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue()
+    return _job_queue
+
+def submit_job(kind, params, wait):
+    """Paneb töö järjekorda. `wait` korral ootab tulemust (vana sünkroonne API)."""
+    try:
+        job_id = get_job_queue().submit(kind, params)
+    except QueueFull as e:
+        return jsonify({"error": str(e)}), 429
+    
+    if not wait:
+        return jsonify(get_job_queue().status(job_id)), 202
+    
+    try:
+        return jsonify(get_job_queue().result(job_id, timeout=JOB_TIMEOUT)), 200
+    except FutureTimeout:
+        get_job_queue().cancel(job_id)
+        return jsonify({"error": "Töö timeout (üle 10 minuti)", "job_id": job_id}), 500
+    except (Exception, JobCancelled) as e:
+        logger.error(f"Töö {job_id} viga: {e}")
+        return jsonify({"error": str(e) or type(e).__name__, "job_id": job_id}), 500
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """Lisab töö järjekorda: {"type": "backtest" | "train", "params": {...}}"""
+    data = request.get_json() or {}
+    kind = data.get('type')
+    if kind not in TASKS:
+        return jsonify({"error": f"Tundmatu töö tüüp: {kind}"}), 400
+    return submit_job(kind, data.get('params') or {}, wait=False)
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """Kõik teadaolevad tööd"""
+    queue = get_job_queue()
+    return jsonify([queue.status(job_id) for job_id in list(queue.jobs)]), 200
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Töö staatus ja progress"""
+    status = get_job_queue().status(job_id)
+    if status is None:
+        return jsonify({"error": "Tööd ei leitud"}), 404
+    return jsonify(status), 200
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """Lõpetatud töö tulemus"""
+    status = get_job_queue().status(job_id)
+    if status is None:
+        return jsonify({"error": "Tööd ei leitud"}), 404
+    if status["status"] in ("queued", "running", "cancelling"):
+        return jsonify(status), 202
+    if status["status"] != "completed":
+        return jsonify(status), 409
+    return jsonify(get_job_queue().result(job_id)), 200
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Tühistab järjekorras või jooksva töö"""
+    if not get_job_queue().cancel(job_id):
+        return jsonify({"error": "Tööd ei saa tühistada"}), 409
+    return jsonify(get_job_queue().status(job_id)), 200
+
 @app.route('/api/bot/backtest', methods=['POST'])
 def run_backtest():
-    """Jooksutab backtest'i"""
-    try:
-        data = request.get_json() or {}
-        hours = data.get('hours', 500)
-        
-        backtest_script = Path(__file__).parent / "backtester.py"
-        
-        if not backtest_script.exists():
-            return jsonify({"error": "Backtest skripti ei leitud"}), 404
-        
-        logger.info(f"🔄 Backtest'i käivitus: {hours} tundi")
-        
-        result = subprocess.run(
-            [sys.executable, str(backtest_script), str(hours)],
-            cwd=str(backtest_script.parent),
-            capture_output=True,
-            text=True,
-            timeout=600
-        )
-        
-        # Proovime sisend parsida JSON-ina
-        try:
-            output = json.loads(result.stdout)
-            return jsonify(output), 200
-        except json.JSONDecodeError:
-            # Kui JSON pole, tagasta raw output
-            return jsonify({
-                "status": "completed",
-                "output": result.stdout,
-                "error": result.stderr if result.returncode != 0 else None
-            }), 200
-        
-    except subprocess.TimeoutExpired:
-        logger.error("Backtest timeout")
-        return jsonify({"error": "Backtest timeout (üle 10 minuti)"}), 500
-    except Exception as e:
-        logger.error(f"Backtest viga: {e}", exc_info=True)
-        return jsonify({"error": str(e)}), 500
+    """Jooksutab backtest'i tööjärjekorras. {"async": true} tagastab kohe töö ID."""
+    data = request.get_json() or {}
+    hours = data.get('hours', 500)
+    logger.info(f"🔄 Backtest'i käivitus: {hours} tundi")
+    return submit_job("backtest", {"hours": hours}, wait=not data.get('async'))
 
 @app.route('/api/bot/brain/train', methods=['POST'])
 def train_brain():
-    """Treenib uue mudeli"""
+    """Treenib mudeli tööjärjekorras. {"mode": "full" | "incremental", "async": true}"""
+    data = request.get_json(silent=True) or {}
+    params = {"mode": data['mode']} if data.get('mode') in ('full', 'incremental') else {}
+    return submit_job("train", params, wait=not data.get('async'))
+
+@app.route('/api/bot/brain/rollback', methods=['POST'])
+def rollback_brain():
+    """Palub töötaval botil eelmise mudeli tagasi võtta (vahetub järgmisel tick'il)."""
+    if not supervisor.running:
+        return jsonify({"error": "Bot ei jooksu"}), 400
+    request_rollback()
+    logger.info("⏪ Mudeli tagasivõtt palutud")
+    return jsonify({"status": "rollback_requested"}), 202
+
+# --- Graafikud ---
+CHART_COLUMNS = {'price', 'pnl', 'rsi', 'macd', 'vwap', 'bot_confidence'}
+CHART_SYMBOL = os.getenv('SYMBOLS', 'BTCUSDT').split(',')[0].strip().upper()  # Vaikimisi boti esimene sümbol
+
+@app.route('/api/chart', methods=['GET'])
+def get_chart():
+    """Vähendatud aegrida: ?hours=24 (või ?start=&end=), ?width=1000, ?columns=price,pnl, ?symbol=BTCUSDT"""
+    columns = [c for c in request.args.get('columns', 'price').split(',') if c]
+    unknown = set(columns) - CHART_COLUMNS
+    if unknown or not columns:
+        return jsonify({"error": f"Tundmatud veerud: {sorted(unknown)}"}), 400
     try:
-        brain_script = Path(__file__).parent / "brain.py"
-        
-        if not brain_script.exists():
-            return jsonify({"error": "Brain skripti ei leitud"}), 404
-        
-        result = subprocess.run(
-            [sys.executable, str(brain_script)],
-            cwd=str(brain_script.parent),
-            capture_output=True,
-            text=True,
-            timeout=600
-        )
-        
-        return jsonify({
-            "status": "completed",
-            "output": result.stdout,
-            "error": result.stderr if result.returncode != 0 else None
-        }), 200
-        
-    except subprocess.TimeoutExpired:
-        return jsonify({"error": "Treenimine timeout"}), 500
+        width = max(3, min(int(request.args.get('width', 1000)), MAX_POINTS))
+        start = request.args.get('start') or \
+            (datetime.utcnow() - timedelta(hours=float(request.args.get('hours', 24)))).isoformat()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    end = request.args.get('end')
+    try:
+        symbol = request.args.get('symbol', CHART_SYMBOL).upper()
+        charts = load_chart(get_supabase(), start, end, columns, width, symbol=symbol)
+        return jsonify({"start": start, "end": end, "symbol": symbol, "width": width, "series": to_json(charts)}), 200
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        logger.error(f"Treenimine viga: {e}")
+        logger.error(f"Graafiku päring viga: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus mõõdikud: API omad ja (kui METRICS_PORT on määratud) boti omad"""
+    body = metrics.render()
+    if BOT_METRICS_PORT and supervisor.running:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{BOT_METRICS_PORT}/metrics", timeout=1) as res:
+                body += res.read().decode()
+        except OSError as e:
+            logger.warning(f"⚠️ Boti mõõdikud pole kättesaadavad: {e}")
+    return Response(body, content_type=metrics.CONTENT_TYPE)
+
 @app.route('/api/health', methods=['GET'])
 def health():
     """Health check"""
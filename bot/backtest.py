@@ -1,11 +1,15 @@
 import os
+import numpy as np
 import pandas as pd
-import joblib
 from supabase import create_client
 from dotenv import load_dotenv
 from pathlib import Path
 import logging
 
+from strategies import simulate_ai
+from inference import Predictor
+from log_loader import load_frame
+
 # 1. SEADISTUS
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - [backtest] %(message)s')
 logger = logging.getLogger(__name__)
@@ -29,10 +33,30 @@ except Exception as e:
     logger.error(f"❌ Ühenduse viga: {e}")
     exit()
 
+FEATURES = ['price', 'rsi', 'macd', 'macd_signal', 'vwap', 'stoch_k', 'stoch_d', 'atr', 'ema200', 'market_pressure']
+PREDICT_CHUNK = 50_000  # Mitu rida korraga predict_proba-sse
+
+def load_history():
+    """Laadib kogu trade_logs ajaloo keyset lehekülgedena, ainult vajalikud veerud."""
+    return load_frame(supabase, ['created_at'] + FEATURES)
+
+def build_features(df):
+    """Ehitab tunnuste maatriksi korraga. Tagastab (X, valid_mask)."""
+    X = df[FEATURES].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+    valid = ~np.isnan(X).any(axis=1)
+    return X, valid
+
+def predict_all(model, X):
+    """Skoorib kõik read partiidena. Tagastab klassi 1 tõenäosused."""
+    probs = np.empty(len(X), dtype=np.float64)
+    for start in range(0, len(X), PREDICT_CHUNK):
+        chunk = X[start:start + PREDICT_CHUNK]
+        probs[start:start + len(chunk)] = model.predict_proba(chunk)[:, 1]
+    return probs
+
 def run_backtest():
-    # 1. Laadi andmed
-    res = supabase.table("trade_logs").select("*").order("created_at", desc=False).limit(1000).execute()
-    df = pd.DataFrame(res.data)
+    # 1. Laadi andmed (kogu ajalugu, mitte ainult 1000 rida)
+    df = load_history()
     
     if len(df) < 20:
         print("Liiga vähe andmeid backtestiks.")
@@ -44,52 +68,29 @@ def run_backtest():
         print("Mudelit ei leitud! Käivita enne brain.py")
         return
     
-    model = joblib.load(model_path)
-
-    # 3. Simuleeri
-    balance = 100.0  # Alustame 100 USDT-ga
-    position = 0     # 0 = ei oma, 1 = omame BTC
-    buy_price = 0
-    trades = 0
-    wins = 0
-
-    print(f"\n--- BACKTEST ALUSTATUD ({len(df)} rida) ---")
-
-    features_list = ['price', 'rsi', 'macd', 'macd_signal', 'vwap', 'stoch_k', 'stoch_d', 'atr', 'ema200', 'market_pressure']
-
-    for i in range(len(df)):
-        curr = df.iloc[i]
-        
-        # Valmistame ette tunnused ennustuseks
-        try:
-            feats = [float(curr[f]) for f in features_list]
-            prob = model.predict_proba([feats])[0][1]
-        except:
-            continue
-
-        price = float(curr['price'])
-
-        # OSTMINE: Ennustus > 0.6 ja meil pole positsiooni
-        if position == 0 and prob > 0.6 and float(curr['stoch_k']) < 30:
-            buy_price = price
-            position = 1
-            trades += 1
-            print(f"[{curr['created_at'][:16]}] BUY: {price:.2f} (AI: {prob:.2f})")
-
-        # MÜÜMINE: Kasum 1% või kahjum -0.5% (või AI ütleb, et hind langeb)
-        elif position == 1:
-            pnl = (price - buy_price) / buy_price * 100
-            if pnl > 1.0 or pnl < -0.5 or prob < 0.3:
-                balance *= (1 + pnl/100)
-                position = 0
-                if pnl > 0: wins += 1
-                trades += 1
-                print(f"[{curr['created_at'][:16]}] SELL: {price:.2f} | PnL: {pnl:.2f}% | Balance: {balance:.2f} USDT")
+    model = Predictor.load(model_path)
+
+    # 3. Tunnused ja ennustused korraga
+    X, valid = build_features(df)
+    invalid_rows = int((~valid).sum())
+    if invalid_rows:
+        logger.warning(f"⚠️ {invalid_rows} rida puuduvate/vigaste tunnustega jäetakse simulatsioonist välja")
+
+    X = X[valid]
+    created_at = df['created_at'].to_numpy()[valid]
+    prob = predict_all(model, X) if len(X) else np.empty(0)
+
+    # 4. Simuleeri
+    print(f"\n--- BACKTEST ALUSTATUD ({len(df)} rida, {len(X)} kehtivat) ---")
+    price = X[:, FEATURES.index('price')]
+    stoch_k = X[:, FEATURES.index('stoch_k')]
+    balance, trades, wins = simulate_ai(price, prob, stoch_k, created_at)
 
     print("\n--- TULEMUSED ---")
     print(f"Lõppsaldo: {balance:.2f} USDT")
     print(f"Tehinguid kokku: {trades}")
     print(f"Võiduprotsent: {(wins/(trades/2)*100 if trades > 0 else 0):.1f}%")
+    print(f"Vigaseid ridu: {invalid_rows}")
 
 if __name__ == "__main__":
-    run_backtest()
\ No newline at end of file
+    run_backtest()
@@ -0,0 +1,339 @@
+"""Võrguta benchmarkid: kiirus, latentsus ja mälu mitme andmemahu juures.
+
+Iga (juhtum, suurus) jookseb eraldi protsessis: sünteetilised küünlad
+(`bench_fixtures.synthetic_klines`), mälus Supabase ja Binance, ajutised
+vahemälu kaustad ja töökaust (repo mudelit ega vahemälu ei puututa).
+Mõõdetakse kordusi (mediaan, min), läbilaset (rida/s), tick'i latentsust
+(p50/p95/p99, kus asjakohane) ja mälu tippu (tracemalloc + protsessi RSS).
+
+Tulemus salvestatakse JSON-ina ja võrreldakse baseline'iga: kui mediaanaeg
+või mälu tipp kasvab üle `--threshold`, märgitakse regressioon ja
+väljumiskood on 1.
+
+Käivitamine:
+    python bench.py                                   # kõik juhtumid, 1k / 100k / 1M
+    python bench.py --cases fetch_data,backtest --sizes 1000,100000
+    python bench.py --save-baseline                   # tulemus uueks baseline'iks
+    python bench.py --baseline bench_baseline.json --threshold 0.2
+"""
+import os
+import io
+import gc
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import resource
+import tempfile
+import contextlib
+import subprocess
+import tracemalloc
+import multiprocessing
+from pathlib import Path
+from datetime import datetime, timezone
+from importlib import metadata
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from bench_fixtures import MemorySupabase, SyntheticBinance, anchored, install, synthetic_klines, trade_logs_columns
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - [bench] %(message)s')
+logger = logging.getLogger(__name__)
+
+BOT_DIR = Path(__file__).parent
+RESULTS_DIR = BOT_DIR / '.bench'
+FIXTURE_DIR = RESULTS_DIR / 'fixtures'  # tunnustega trade_logs fikstuurid (sisu järgi adresseeritud)
+BASELINE_PATH = BOT_DIR / 'bench_baseline.json'
+SIZES = (1_000, 100_000, 1_000_000)
+SEED = 42
+THRESHOLD = 0.15  # +15% aega või mälu = regressioon
+WARMUP = 300      # fetch_data soojenduse küünlad
+
+
+def repeats_for(size):
+    return 5 if size <= 10_000 else 3 if size <= 100_000 else 1
+
+
+# --- Juhtumid: (suurus, seed) -> (run, reset) ---
+
+def _trade_logs(size, seed):
+    """`size` rida trade_logs'i samade tunnustega, mida bot logib."""
+    import features
+    df = features.compute_cached(synthetic_klines(size, seed), f'BENCH{seed}', cache_dir=FIXTURE_DIR)
+    return trade_logs_columns(df)
+
+
+def case_fetch_data(size, seed):
+    """bot.fetch_data püsirežiimis: iga tick = tail päring + uued küünlad mootorisse."""
+    import bot
+    from replay import ReplayClock, TICK_OFFSET
+    client = SyntheticBinance(synthetic_klines(size + WARMUP, seed))
+    bot.binance = client
+    # fetch_data arvutab puuduvad küünlad kella järgi, seega kell käib kursoriga kaasas
+    bot._clock = clock = ReplayClock(0, float('inf'))
+
+    def tick():
+        clock.now = client.klines[client.cursor, 0] / 1000 + TICK_OFFSET
+
+    def run():
+        client.cursor = WARMUP - 1
+        tick()
+        state = bot.SymbolState(bot.SYMBOL)
+        bot.fetch_data(state)
+        latencies = np.empty(size)
+        for i in range(size):
+            client.cursor += 1
+            tick()
+            start = time.perf_counter()
+            bot.fetch_data(state)
+            latencies[i] = time.perf_counter() - start
+        return latencies
+    return run, None
+
+
+def case_prepare_dataframe(size, seed):
+    """backtester.prepare_dataframe külma tunnuste vahemäluga."""
+    import backtester
+    import features
+    klines = synthetic_klines(size, seed)
+    return (lambda: backtester.prepare_dataframe(klines)), \
+        (lambda: shutil.rmtree(features.CACHE_DIR, ignore_errors=True))
+
+
+def case_prepare_dataframe_cached(size, seed):
+    """backtester.prepare_dataframe, kui sama vahemik on juba vahemälus."""
+    import backtester
+    klines = synthetic_klines(size, seed)
+    backtester.prepare_dataframe(klines)
+    return (lambda: backtester.prepare_dataframe(klines)), None
+
+
+def case_backtester(size, seed):
+    """backtester.run_backtest: küünlad soojast KlineStore'ist, tunnused külmalt."""
+    import backtester
+    import features
+    from kline_store import KlineStore, hours_ago_ms
+    client = SyntheticBinance(anchored(synthetic_klines(size + 120, seed)))
+    backtester.client = client
+    backtester.store = KlineStore(client)
+    hours = size / 60
+    backtester.store.load(backtester.SYMBOL, hours_ago_ms(hours))
+
+    def run():
+        result = backtester.run_backtest(hours)
+        if result.get('status') != 'success':
+            raise RuntimeError(result.get('error'))
+    return run, lambda: shutil.rmtree(features.CACHE_DIR, ignore_errors=True)
+
+
+def case_backtest(size, seed):
+    """backtest.run_backtest: trade_logs laadimine lehtedena, ennustus ja simulatsioon."""
+    import backtest
+    backtest.supabase = MemorySupabase({'trade_logs': _trade_logs(size, seed)})
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            backtest.run_backtest()
+    return run, None
+
+
+def case_train_brain(size, seed):
+    """brain.train_brain('full'): sünkroonimine, märgistamine ja treening nullist."""
+    import brain
+    brain.supabase = MemorySupabase({'trade_logs': _trade_logs(size, seed)})
+
+    def reset():
+        shutil.rmtree(brain.STORE_DIR, ignore_errors=True)
+        brain.MODEL_PATH.unlink(missing_ok=True)
+
+    def run():
+        if not brain.train_brain('full'):
+            raise RuntimeError("treening ebaõnnestus")
+    return run, reset
+
+
+CASES = {
+    "fetch_data": case_fetch_data,
+    "prepare_dataframe": case_prepare_dataframe,
+    "prepare_dataframe_cached": case_prepare_dataframe_cached,
+    "backtester": case_backtester,
+    "backtest": case_backtest,
+    "train_brain": case_train_brain,
+}
+
+
+# --- Mõõtmine (tööprotsessis) ---
+
+def _measure(name, size, seed, repeats, memory=True):
+    workdir = Path(tempfile.mkdtemp(prefix='bench-'))
+    os.environ.update(
+        SUPABASE_URL='http://bench.invalid', SUPABASE_KEY='bench',
+        FEATURE_CACHE_DIR=str(workdir / 'features'), KLINE_CACHE_DIR=str(workdir / 'klines'),
+        BRAIN_STORE_DIR=str(workdir / 'brain'), TRADE_LOG_JOURNAL=str(workdir / 'journal.jsonl'),
+    )
+    os.chdir(workdir)
+    sys.path.insert(0, str(BOT_DIR))
+    logging.disable(logging.ERROR)  # vead tulevad erandina
+    install()
+    try:
+        start = time.perf_counter()
+        run, reset = CASES[name](size, seed)
+        setup_s = time.perf_counter() - start
+
+        seconds, latencies = [], None
+        for _ in range(repeats):
+            if reset:
+                reset()
+            gc.collect()
+            start = time.perf_counter()
+            out = run()
+            seconds.append(time.perf_counter() - start)
+            if isinstance(out, np.ndarray):
+                latencies = out
+
+        peak_mb = None
+        if memory:
+            if reset:
+                reset()
+            gc.collect()
+            tracemalloc.start()
+            run()
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+
+        median = float(np.median(seconds))
+        result = {
+            "case": name, "size": size, "repeats": repeats,
+            "seconds": [round(s, 6) for s in seconds],
+            "median_s": round(median, 6), "min_s": round(min(seconds), 6),
+            "rows_per_s": round(size / median, 1) if median else None,
+            "peak_mb": None if peak_mb is None else round(peak_mb, 2),
+            "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            "setup_s": round(setup_s, 3),
+        }
+        if latencies is not None:
+            ms = latencies * 1000
+            result["latency_ms"] = {p: round(float(np.percentile(ms, q)), 4)
+                                    for p, q in (("p50", 50), ("p95", 95), ("p99", 99), ("max", 100))}
+        return result
+    finally:
+        os.chdir(BOT_DIR)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def meta(seed):
+    def version(pkg):
+        try:
+            return metadata.version(pkg)
+        except metadata.PackageNotFoundError:
+            return None
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BOT_DIR,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "seed": seed,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "packages": {p: version(p) for p in ("numpy", "pandas", "xgboost")},
+    }
+
+
+def run_suite(cases, sizes, seed=SEED, repeats=None, memory=True):
+    """Jooksutab kõik (juhtum, suurus) paarid eraldi protsessides."""
+    ctx = multiprocessing.get_context('spawn')
+    results = {}
+    for name in cases:
+        for size in sizes:
+            key = f"{name}@{size}"
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                try:
+                    res = pool.submit(_measure, name, size, seed, repeats or repeats_for(size), memory).result()
+                except Exception as e:
+                    logger.error(f"❌ {key}: {e}")
+                    results[key] = {"case": name, "size": size, "error": str(e)}
+                    continue
+            results[key] = res
+            lat = f", p95 {res['latency_ms']['p95']:.3f} ms" if "latency_ms" in res else ""
+            logger.info(f"⏱️ {key}: {res['median_s']:.4f}s ({res['rows_per_s']:,.0f} rida/s{lat}), "
+                        f"mälu {res['peak_mb']} MB")
+    return {"meta": meta(seed), "results": results}
+
+
+# --- Võrdlus ---
+
+def compare(current, baseline, threshold=THRESHOLD):
+    """Tagastab read {key, base_s, cur_s, time_ratio, mem_ratio, regression}."""
+    rows = []
+    for key, cur in current["results"].items():
+        base = baseline.get("results", {}).get(key)
+        if not base or "error" in cur or "error" in base:
+            continue
+        time_ratio = cur["median_s"] / base["median_s"] if base["median_s"] else 1.0
+        mem_ratio = cur["peak_mb"] / base["peak_mb"] if cur.get("peak_mb") and base.get("peak_mb") else 1.0
+        rows.append({
+            "key": key, "base_s": base["median_s"], "cur_s": cur["median_s"],
+            "time_ratio": round(time_ratio, 3), "mem_ratio": round(mem_ratio, 3),
+            "regression": time_ratio > 1 + threshold or mem_ratio > 1 + threshold,
+        })
+    return rows
+
+
+def print_comparison(rows):
+    print(f"\n{'juhtum':<36}{'baseline s':>12}{'praegu s':>12}{'aeg':>8}{'mälu':>8}")
+    for r in rows:
+        flag = "  ❌ REGRESSIOON" if r["regression"] else ""
+        print(f"{r['key']:<36}{r['base_s']:>12.4f}{r['cur_s']:>12.4f}{r['time_ratio']:>7.2f}x{r['mem_ratio']:>7.2f}x{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Võrguta benchmarkid")
+    parser.add_argument("--cases", default=",".join(CASES), help=f"komadega: {', '.join(CASES)}")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)))
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--repeats", type=int, default=None, help="vaikimisi suuruse järgi (5/3/1)")
+    parser.add_argument("--no-memory", action="store_true", help="jäta tracemalloc'i mõõtmine vahele")
+    parser.add_argument("--out", default=None, help="tulemuse JSON (vaikimisi .bench/bench-<aeg>.json)")
+    parser.add_argument("--baseline", default=None, help=f"võrdlusfail (vaikimisi {BASELINE_PATH.name}, kui olemas)")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--save-baseline", action="store_true", help="salvesta tulemus uueks baseline'iks")
+    args = parser.parse_args()
+
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    unknown = [c for c in cases if c not in CASES]
+    if unknown:
+        parser.error(f"tundmatud juhtumid: {unknown}")
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    report = run_suite(cases, sizes, args.seed, args.repeats, memory=not args.no_memory)
+
+    out = Path(args.out) if args.out else RESULTS_DIR / f"bench-{datetime.now():%Y%m%d-%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    logger.info(f"💾 Tulemused: {out}")
+
+    baseline_path = Path(args.baseline) if args.baseline else BASELINE_PATH
+    regressions = False
+    if baseline_path.exists() and not args.save_baseline:
+        rows = compare(report, json.loads(baseline_path.read_text()), args.threshold)
+        print_comparison(rows)
+        regressions = any(r["regression"] for r in rows)
+    elif args.baseline:
+        logger.warning(f"⚠️ Baseline'i ei leitud: {baseline_path}")
+
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(report, indent=2))
+        logger.info(f"📌 Baseline salvestatud: {baseline_path}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
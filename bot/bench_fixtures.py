@@ -0,0 +1,400 @@
+"""Võrguta asendused benchmarkide (ja kordusmängu) jaoks.
+
+- `synthetic_klines(n, seed)`: deterministlik 1m küünlajada (t-jaotusega
+  tootlused, volatiilsuse režiimid), sama seed -> samad baidid;
+- `SyntheticBinance`: `get_klines` / `get_historical_klines` nagu
+  python-binance Client, andmed tulevad massiivist;
+- `MemorySupabase`: veerupõhine mälutabel sama päringuliidesega, mida
+  log_loader, brain ja backtest kasutavad (select, filtrid, `or_`, order,
+  limit, range, insert). Lehe päring ei skaneeri kogu tabelit: read hoitakse
+  (created_at, id) järjekorras ja created_at piirid leitakse kahendotsinguga;
+- `install()`: paneb asendused `sys.modules`-isse enne boti moodulite
+  importi, et ükski klient ei üritaks võrku minna.
+"""
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+
+STEP_MS = 60_000
+START_MS = 1_704_067_200_000  # 2024-01-01 00:00 UTC
+REGIME_CANDLES = 500
+REGIME_VOLS = (0.0005, 0.0015, 0.004)
+
+
+def synthetic_klines(n, seed=42, start_ms=START_MS, price=40_000.0, step=STEP_MS):
+    """(n, 6) float64: time, open, high, low, close, volume."""
+    rng = np.random.default_rng(seed)
+    regimes = rng.integers(0, len(REGIME_VOLS), size=n // REGIME_CANDLES + 1)
+    sigma = np.asarray(REGIME_VOLS)[np.repeat(regimes, REGIME_CANDLES)[:n]]
+    ret = rng.standard_t(4, size=n) * sigma / np.sqrt(2)  # t(4) dispersioon on 2
+    close = price * np.exp(np.cumsum(ret))
+    open_ = np.concatenate([[price], close[:-1]])
+    wick = np.abs(rng.standard_normal((2, n))) * sigma / 2
+    out = np.empty((n, 6), dtype=np.float64)
+    out[:, 0] = start_ms + np.arange(n, dtype=np.float64) * step
+    out[:, 1] = open_
+    out[:, 2] = np.maximum(open_, close) * (1 + wick[0])
+    out[:, 3] = np.minimum(open_, close) * (1 - wick[1])
+    out[:, 4] = close
+    out[:, 5] = rng.lognormal(3.0, 1.0, size=n) * (1 + 50 * np.abs(ret))
+    return out
+
+
+def to_binance(arr, step=STEP_MS):
+    """Massiiv -> Binance'i REST vastus (hinnad tekstina, 12 välja)."""
+    return [[int(t), f"{o:.2f}", f"{h:.2f}", f"{lo:.2f}", f"{c:.2f}", f"{v:.4f}",
+             int(t) + step - 1, "0", 0, "0", "0", "0"]
+            for t, o, h, lo, c, v in arr.tolist()]
+
+
+class SyntheticBinance:
+    """python-binance Client'i asendus. `cursor` = pooleli oleva küünla indeks."""
+
+    KLINE_INTERVAL_1MINUTE = '1m'
+
+    def __init__(self, klines, cursor=None, step=STEP_MS):
+        self.klines = klines
+        self.step = step
+        self.cursor = len(klines) - 1 if cursor is None else cursor
+        self.calls = 0
+
+    def get_klines(self, symbol=None, interval=None, limit=500, startTime=None, endTime=None):
+        self.calls += 1
+        if startTime is not None:
+            return self.get_historical_klines(symbol, interval, startTime, endTime, limit)
+        lo = max(0, self.cursor + 1 - limit)
+        return to_binance(self.klines[lo:self.cursor + 1], self.step)
+
+    def get_historical_klines(self, symbol, interval, start_str, end_str=None, limit=None):
+        self.calls += 1
+        times = self.klines[:, 0]
+        lo = int(np.searchsorted(times, int(start_str), side='left'))
+        hi = len(times) if end_str is None else int(np.searchsorted(times, int(end_str), side='right'))
+        if limit:
+            hi = min(hi, lo + limit)
+        return to_binance(self.klines[lo:hi], self.step)
+
+
+def anchored(klines, end_ms=None, step=STEP_MS):
+    """Nihutab jada nii, et viimane küünal lõpeb enne `end_ms`-i (vaikimisi praegune minut)."""
+    if end_ms is None:
+        end_ms = int(pd.Timestamp.now(tz='UTC').value // 1_000_000) // step * step
+    out = klines.copy()
+    out[:, 0] = end_ms - step * np.arange(len(klines), 0, -1)
+    return out
+
+
+# --- Supabase ---
+
+class _Result:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class MemoryTable:
+    """Veerud NumPy massiividena, järjestatud (created_at, id) järgi."""
+
+    def __init__(self, columns):
+        self.columns = {}
+        self._set(columns)
+
+    def _set(self, columns):
+        n = len(next(iter(columns.values()))) if columns else 0
+        cols = {k: np.asarray(v) for k, v in columns.items()}
+        if 'id' not in cols:
+            cols['id'] = np.arange(1, n + 1, dtype=np.int64)
+        if 'created_at' in cols and n:
+            order = np.lexsort((cols['id'], cols['created_at']))
+            cols = {k: v[order] for k, v in cols.items()}
+        self.columns = cols
+
+    def __len__(self):
+        return len(self.columns.get('id', ()))
+
+    def insert(self, rows):
+        if not rows:
+            return
+        keys = dict.fromkeys(k for r in rows for k in r)
+        start = int(self.columns['id'].max()) + 1 if len(self) and self.columns['id'].dtype.kind == 'i' else 1
+        new = {k: [r.get(k) for r in rows] for k in keys}
+        new.setdefault('id', list(range(start, start + len(rows))))
+        merged = {}
+        for k in dict.fromkeys(list(self.columns) + list(new)):
+            old = self.columns.get(k, np.full(len(self), None, dtype=object))
+            add = np.asarray(new.get(k, [None] * len(rows)))
+            merged[k] = np.concatenate([old.astype(object), add.astype(object)]) \
+                if old.dtype.kind != add.dtype.kind else np.concatenate([old, add])
+        self._set(merged)
+
+
+class _Query:
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+        self.cols = None
+        self.filters = []  # (veerg, op, väärtus, eitus)
+        self.orders = []
+        self.lim = None
+        self.rng = None
+        self.count = None
+        self.rows = None
+        self._neg = False
+
+    # --- Päringu ehitamine ---
+
+    def select(self, columns='*', count=None):
+        self.cols = None if columns.strip() == '*' else [c.strip() for c in columns.split(',')]
+        self.count = count
+        return self
+
+    def insert(self, rows, **kwargs):
+        self.rows = rows if isinstance(rows, list) else [rows]
+        return self
+
+    @property
+    def not_(self):
+        self._neg = True
+        return self
+
+    def _filter(self, col, op, value):
+        self.filters.append((col, op, value, self._neg))
+        self._neg = False
+        return self
+
+    def eq(self, col, value): return self._filter(col, 'eq', value)
+    def neq(self, col, value): return self._filter(col, 'neq', value)
+    def gt(self, col, value): return self._filter(col, 'gt', value)
+    def gte(self, col, value): return self._filter(col, 'gte', value)
+    def lt(self, col, value): return self._filter(col, 'lt', value)
+    def lte(self, col, value): return self._filter(col, 'lte', value)
+    def is_(self, col, value): return self._filter(col, 'is', value)
+    def in_(self, col, values): return self._filter(col, 'in', list(values))
+    def or_(self, filters): return self._filter(None, 'or', _parse_logic(filters))
+
+    def order(self, col, desc=False):
+        self.orders.append((col, desc))
+        return self
+
+    def limit(self, n):
+        self.lim = n
+        return self
+
+    def range(self, start, end):
+        self.rng = (start, end)
+        return self
+
+    # --- Täitmine ---
+
+    def execute(self):
+        self.db.calls += 1
+        table = self.db.tables.setdefault(self.name, MemoryTable({}))
+        if self.rows is not None:
+            table.insert(self.rows)
+            return _Result(self.rows)
+        if not len(table):
+            return _Result([], 0 if self.count else None)
+
+        lo, hi = self._bounds(table)
+        offset, want = (self.rng[0], self.rng[1] - self.rng[0] + 1) if self.rng else (0, self.lim)
+        storage_order = (not self.orders or self.orders[0][0] == 'created_at') and \
+            all(c in ('created_at', 'id') for c, _ in self.orders) and len({d for _, d in self.orders}) <= 1
+        desc = bool(self.orders and self.orders[0][1])
+        if storage_order and not self.count:
+            idx = self._scan(table, lo, hi, desc, None if want is None else offset + want)
+        else:
+            idx = lo + np.flatnonzero(self._mask(table, lo, hi))
+            if self.orders:
+                keys = [table.columns[c][idx] for c, _ in reversed(self.orders)]
+                idx = idx[np.lexsort(keys)]
+                if desc:
+                    idx = idx[::-1]
+        total = len(idx)
+        idx = idx[offset:None if want is None else offset + want]
+        return _Result(self._rows(table, idx), total if self.count else None)
+
+    def _bounds(self, table):
+        """created_at vahemik kahendotsinguga (ülejäänud filtrid rakenduvad hiljem)."""
+        ts = table.columns.get('created_at')
+        lo, hi = 0, len(table)
+        if ts is None:
+            return lo, hi
+        for col, op, value, neg in self.filters:
+            if col != 'created_at' or neg:
+                continue
+            if op == 'gte':
+                lo = max(lo, int(np.searchsorted(ts, value, side='left')))
+            elif op == 'gt':
+                lo = max(lo, int(np.searchsorted(ts, value, side='right')))
+            elif op == 'lt':
+                hi = min(hi, int(np.searchsorted(ts, value, side='left')))
+            elif op == 'lte':
+                hi = min(hi, int(np.searchsorted(ts, value, side='right')))
+        return lo, max(lo, hi)
+
+    def _mask(self, table, lo, hi):
+        mask = np.ones(hi - lo, dtype=bool)
+        for col, op, value, neg in self.filters:
+            if op == 'or':
+                m = _logic_mask(table, lo, hi, value)
+                mask &= ~m if neg else m
+                continue
+            v = table.columns[col][lo:hi] if col in table.columns else np.full(hi - lo, None, dtype=object)
+            if op == 'is':
+                m = _is_null(v) if value in (None, 'null') else (v == value)
+            elif op == 'in':
+                m = np.isin(v, value)
+            else:
+                m = {'eq': np.equal, 'neq': np.not_equal, 'gt': np.greater, 'gte': np.greater_equal,
+                     'lt': np.less, 'lte': np.less_equal}[op](v, value)
+            mask &= ~m if neg else m
+        return mask
+
+    def _scan(self, table, lo, hi, desc, want):
+        """Salvestusjärjekorras plokkide kaupa, kuni `want` rida on koos."""
+        if want is None:
+            idx = lo + np.flatnonzero(self._mask(table, lo, hi))
+            return idx[::-1] if desc else idx
+        found, block = [], max(1024, 2 * want)
+        got = 0
+        while got < want and lo < hi:
+            a, b = (max(lo, hi - block), hi) if desc else (lo, min(hi, lo + block))
+            idx = a + np.flatnonzero(self._mask(table, a, b))
+            if desc:
+                idx = idx[::-1]
+                hi = a
+            else:
+                lo = b
+            found.append(idx)
+            got += len(idx)
+            block *= 2
+        return np.concatenate(found)[:want] if found else np.empty(0, dtype=np.int64)
+
+    def _rows(self, table, idx):
+        names = list(table.columns) if self.cols is None else self.cols
+        data = {}
+        for name in names:
+            col = table.columns.get(name)
+            values = [None] * len(idx) if col is None else col[idx].tolist()
+            if col is not None and col.dtype.kind == 'f':
+                values = [None if x != x else x for x in values]  # NaN -> null nagu JSON-is
+            data[name] = values
+        return [dict(zip(names, row)) for row in zip(*data.values())] if names else [{} for _ in idx]
+
+
+def _split_top(text):
+    """Komad, mis pole sulgudes ega jutumärkides."""
+    parts, depth, quoted, start = [], 0, False, 0
+    for i, ch in enumerate(text):
+        if ch == '"' and text[i - 1:i] != '\\':
+            quoted = not quoted
+        elif not quoted and ch in '()':
+            depth += 1 if ch == '(' else -1
+        elif not quoted and ch == ',' and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    return parts + [text[start:]]
+
+
+def _parse_logic(text, kind='or'):
+    """PostgRESTi `or=(...)` filtri tekst -> ('or'|'and', [tingimused]); tingimus on (veerg, op, väärtus)."""
+    terms = []
+    for part in _split_top(text):
+        for logic in ('and', 'or'):
+            if part.startswith(logic + '('):
+                terms.append(_parse_logic(part[len(logic) + 1:-1], logic))
+                break
+        else:
+            col, op, value = part.split('.', 2)
+            if value.startswith('"'):
+                value = value[1:-1].replace('\\"', '"').replace('\\\\', '\\')
+            terms.append((col, op, value))
+    return (kind, terms)
+
+
+def _logic_mask(table, lo, hi, node):
+    kind, terms = node
+    masks = []
+    for term in terms:
+        if term[0] in ('and', 'or'):
+            masks.append(_logic_mask(table, lo, hi, term))
+            continue
+        col, op, value = term
+        v = table.columns[col][lo:hi] if col in table.columns else np.full(hi - lo, None, dtype=object)
+        if op == 'is':
+            masks.append(_is_null(v) if value == 'null' else v == value)
+            continue
+        if v.dtype.kind in 'iuf':
+            value = v.dtype.type(value)
+        masks.append({'eq': np.equal, 'neq': np.not_equal, 'gt': np.greater, 'gte': np.greater_equal,
+                      'lt': np.less, 'lte': np.less_equal}[op](v, value))
+    return np.logical_and.reduce(masks) if kind == 'and' else np.logical_or.reduce(masks)
+
+
+def _is_null(values):
+    if values.dtype.kind == 'f':
+        return np.isnan(values)
+    if values.dtype.kind == 'O':
+        return np.array([x is None or x != x for x in values], dtype=bool)
+    return np.zeros(len(values), dtype=bool)
+
+
+class MemorySupabase:
+    """Supabase kliendi asendus: `client.table(name).select(...)...execute()`."""
+
+    def __init__(self, tables=None):
+        self.tables = {name: t if isinstance(t, MemoryTable) else MemoryTable(t) for name, t in (tables or {}).items()}
+        self.calls = 0
+
+    def table(self, name):
+        return _Query(self, name)
+
+
+def trade_logs_columns(features, symbol='BTCUSDT', start_id=1):
+    """features.compute tulemus -> trade_logs veerud (nagu bot need logib)."""
+    n = len(features)
+    created = features['time'].to_numpy(dtype=np.int64).astype('datetime64[ms]').astype('datetime64[s]')
+    cols = {
+        'id': np.arange(start_id, start_id + n, dtype=np.int64),
+        'created_at': np.datetime_as_string(created),
+        'symbol': np.full(n, symbol, dtype=object),
+        'action': np.full(n, 'HOLD', dtype=object),
+        'pnl': np.zeros(n),
+        'avg_entry_price': np.zeros(n),
+        'bot_confidence': np.zeros(n),
+        'volume': features['volume'].to_numpy(dtype=np.float64),
+    }
+    for col in features.columns:
+        if col not in ('time', 'open', 'high', 'low', 'close', 'volume', 'is_panic_mode'):
+            cols[col] = features[col].to_numpy(dtype=np.float64)
+    return cols
+
+
+# --- Moodulite asendamine ---
+
+def install(binance=None, supabase=None):
+    """Asendab `binance.client` ja `supabase` moodulid võrguta versioonidega.
+
+    Tuleb kutsuda enne boti moodulite importi. `create_client` tagastab
+    `supabase` kliendi (vaikimisi tühja MemorySupabase'i), `Client(...)`
+    tagastab `binance` kliendi (vaikimisi ühe päeva sünteetilised küünlad).
+    """
+    binance = binance or SyntheticBinance(anchored(synthetic_klines(1440)))
+    supabase = supabase or MemorySupabase()
+
+    class Client:
+        KLINE_INTERVAL_1MINUTE = '1m'
+
+        def __new__(cls, *args, **kwargs):
+            return binance
+
+    client_mod = types.ModuleType('binance.client')
+    client_mod.Client = Client
+    binance_mod = types.ModuleType('binance')
+    binance_mod.client = client_mod
+    supabase_mod = types.ModuleType('supabase')
+    supabase_mod.create_client = lambda *a, **k: supabase
+    sys.modules.update({'binance': binance_mod, 'binance.client': client_mod, 'supabase': supabase_mod})
+    return binance, supabase
@@ -1,15 +1,26 @@
 import os
 import time
-import pandas as pd
-import pandas_ta as ta
 import numpy as np
-import joblib
 import logging
 import sys
+import queue
+import signal
+import threading
+from collections import deque
 from datetime import datetime
-from supabase import create_client
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from binance.client import Client
+# Rasked moodulid (supabase, binance, websockets, xgboost) laetakse alles vajadusel/taustal,
+# et taaskäivitus hetktõmmisest oleks mõne sekundiga valmis
+from indicators import IndicatorEngine, fillna
+from log_writer import TradeLogWriter
+from config_cache import CachedSetting, risk_percent_fetcher
+from strategies import BOT_CONFIDENCE, ACTIONS
+from inference import MODEL_PATH
+from model_watch import ModelWatcher
+import snapshot
+import metrics
+from metrics import span
 
 # --- 1. LOGIMINE JA SÄTTED ---
 logging.basicConfig(
@@ -22,25 +33,124 @@ load_dotenv()
 
 # --- 2. KONFIGURATSIOON ---
 SYMBOL = "BTCUSDT"
+SYMBOLS = [s.strip().upper() for s in os.getenv('SYMBOLS', SYMBOL).split(',') if s.strip()]
 FEATURES = ['price', 'rsi', 'macd', 'macd_signal', 'vwap', 'stoch_k', 'stoch_d', 'atr', 'ema200', 'market_pressure']
-current_position = None  # Nüüd hoiab see: {"entry_price": float, "type": "LONG" või "SHORT"}
+WARMUP_CANDLES = 300  # Esimene soojendus
+TAIL_CANDLES = 5      # Iga tsükli väike päring
+STREAM_BATCH_WINDOW = 0.5  # Voorežiimis kogume nii kaua teiste sümbolite küünlaid (s)
+KLINE_MODE = os.getenv('KLINE_MODE', 'poll')  # 'poll' või 'stream'
+KLINE_INTERVAL = '1m'  # Client.KLINE_INTERVAL_1MINUTE
+MODEL_WAIT = 60       # Kaua esimest mudelit stardis oodatakse (s)
+log_writer = None     # TradeLogWriter, luuakse start_bot-is
+risk_setting = None   # CachedSetting risk_percent jaoks
+model_watcher = None  # ModelWatcher, vahetab mudeli tick'ide vahel
+RISK_TTL = float(os.getenv('RISK_TTL', 30))  # Kui tihti riski taustal värskendatakse (s)
+METRICS_PORT = os.getenv('METRICS_PORT')  # nt 9108; määramata = mõõdikud välja lülitatud
+CYCLE_SECONDS = 60
 
-# --- 3. ÜHENDUSED ---
-try:
-    supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
-    binance = Client(os.getenv('BINANCE_API_KEY'), os.getenv('BINANCE_API_SECRET'))
-    logger.info(f"✅ Ühendused loodud: {SYMBOL} (FUTURES MODE)")
-except Exception as e:
-    logger.error(f"❌ Ühenduse viga: {e}")
-    sys.exit(1)
+# --- MÕÕDIKUD (vt metrics.py; ilma METRICS_PORT-ita on need no-op) ---
+TICKS = metrics.counter('bot_ticks_total', "Töödeldud tick'id", ['symbol'])
+SKIPPED = metrics.counter('bot_skipped_ticks_total', "Vahele jäetud tick'id", ['symbol', 'reason'])
+LOOP_LAG = metrics.gauge('bot_loop_lag_seconds', 'Tsükli hilinemine plaanitud algusest (poll) või küünla sulgemisest (stream)')
+DRIFT = metrics.gauge('bot_schedule_drift_seconds', 'Tsükli alguse nihe minutis esimese tsükli suhtes')
+HEADROOM = metrics.gauge('bot_cycle_headroom_seconds', 'Aega järgmise tsüklini pärast töö lõppu (< 0 = küünal jääb vahele)')
+
+# --- 3. ÜHENDUSED JA KELL ---
+supabase = None  # LazyClient, luuakse connect()-is; replay (replay.py) läheb ilma
+binance = None
+
+
+class LazyClient:
+    """Klient, mis luuakse esimesel kasutusel; `warm()` alustab loomist kohe taustal.
+
+    Ebaõnnestunud loomist proovitakse järgmisel kasutusel uuesti.
+    """
+
+    def __init__(self, name, factory):
+        self._name = name
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+                    logger.info(f"✅ {self._name} ühendus loodud")
+        return self._client
+
+    def warm(self):
+        def run():
+            try:
+                self.get()
+            except Exception as e:
+                logger.error(f"❌ {self._name} ühenduse viga: {e}")
+        threading.Thread(target=run, name=f"connect-{self._name}", daemon=True).start()
+        return self
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+def _supabase_client():
+    from supabase import create_client
+    return create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
+
+
+def _binance_client():
+    from binance.client import Client
+    return Client(os.getenv('BINANCE_API_KEY'), os.getenv('BINANCE_API_SECRET'))
+
+
+def connect():
+    """Alustab Supabase'i ja Binance'i klientide loomist taustal (kui neid veel pole)."""
+    global supabase, binance
+    if supabase is None:
+        supabase = LazyClient("Supabase", _supabase_client).warm()
+    if binance is None:
+        binance = LazyClient("Binance", _binance_client).warm()
+    logger.info(f"🔌 Ühendused: {', '.join(SYMBOLS)} (FUTURES MODE)")
+
+
+class WallClock:
+    """Päris kell. Replay annab asemele virtuaalse, mille `sleep` ei maga."""
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def utcnow(self):
+        return datetime.utcnow()
+
+
+_clock = WallClock()  # Poll-tsükli ja logiridade aeg
 
 # --- 4. FUNKTSIOONID ---
 
-def sync_position_from_supabase():
+class SymbolState:
+    """Ühe sümboli olek: indikaatorimootor, viimased suletud küünlad ja positsioon."""
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.engine = None    # IndicatorEngine, elab tsüklite vahel
+        self.candles = deque(maxlen=WARMUP_CANDLES)  # Hetktõmmise jaoks (mootori taastamine)
+        self.position = None  # {"entry_price": float, "type": "LONG" või "SHORT"}
+        # Voorežiimis uuendab mootorit ja küünlaid voo lõim, hetktõmmist teeb põhilõim
+        self.lock = threading.Lock()
+
+
+states = {}  # {symbol: SymbolState}, täidetakse start_bot-is
+_snapshot_at = 0.0  # Viimase hetktõmmise aeg (time.time())
+
+def sync_position_from_supabase(symbol=SYMBOL):
     """Taastab positsiooni: kas oleme LONG, SHORT või väljas."""
     try:
         response = supabase.table("trade_logs") \
             .select("action, price, avg_entry_price") \
+            .eq("symbol", symbol) \
             .order("created_at", desc=True) \
             .limit(1) \
             .execute()
@@ -51,7 +161,7 @@ def sync_position_from_supabase():
             if last_log['avg_entry_price'] > 0:
                 # Kui viimane action oli LONG, siis oleme LONG. Kui SHORT, siis SHORT.
                 pos_type = last_log['action'] 
-                logger.info(f"🔄 Positsioon taastatud: {pos_type} @ {last_log['avg_entry_price']}")
+                logger.info(f"🔄 {symbol} positsioon taastatud: {pos_type} @ {last_log['avg_entry_price']}")
                 return {
                     "entry_price": float(last_log['avg_entry_price']),
                     "type": pos_type
@@ -61,145 +171,318 @@ def sync_position_from_supabase():
         logger.error(f"❌ Positsiooni taastamise viga: {e}")
         return None
 
-def fetch_data():
+def fetch_data(state):
+    """Tagastab sümboli viimase (pooleli) küünla indikaatorid.
+
+    Esimesel kutsel soojendatakse mootor 300 küünlaga, edaspidi tõmmatakse
+    ainult vahepeal lisandunud küünlad (tavaliselt paar, pärast taastamist
+    hetktõmmisest kõik puuduvad) ja lisatakse olekusse vaid uued suletud.
+    """
     try:
-        klines = binance.get_klines(symbol=SYMBOL, interval=Client.KLINE_INTERVAL_1MINUTE, limit=300)
-        df = pd.DataFrame(klines, columns=['ts', 'open', 'high', 'low', 'close', 'vol', 'close_ts', 'qav', 'num_trades', 'taker_base', 'taker_quote', 'ignore'])
-        df[['open', 'high', 'low', 'close', 'vol']] = df[['open', 'high', 'low', 'close', 'vol']].astype(float)
-        
-        df['ts'] = pd.to_datetime(df['ts'], unit='ms')
-        df.set_index('ts', inplace=True)
-        df.rename(columns={'close': 'price'}, inplace=True)
-
-        # Tehniline analüüs (Säilitatud kõik sinu indikaatorid)
-        df['rsi'] = ta.rsi(df['price'], length=14)
-        macd = ta.macd(df['price'])
-        df['macd'] = macd.iloc[:, 0] if macd is not None else 0
-        df['macd_signal'] = macd.iloc[:, 2] if macd is not None else 0
-        df['ema200'] = ta.ema(df['price'], length=200)
-        df['vwap'] = ta.vwap(df['high'], df['low'], df['price'], df['vol'])
-        stoch = ta.stoch(df['high'], df['low'], df['price'])
-        df['stoch_k'] = stoch.iloc[:, 0] if stoch is not None else 0
-        df['stoch_d'] = stoch.iloc[:, 1] if stoch is not None else 0
-        df['atr'] = ta.atr(df['high'], df['low'], df['price'])
-        df['market_pressure'] = (df['price'] - df['low']) / (df['high'] - df['low'] + 0.0000001) * df['vol']
-        
-        bbands = ta.bbands(df['price'], length=20, std=2)
-        df['bb_upper'] = bbands.iloc[:, 2] if bbands is not None else df['price']
-        df['bb_lower'] = bbands.iloc[:, 0] if bbands is not None else df['price']
-        df['is_panic_mode'] = df['price'] < df['bb_lower']
-        
-        return df.iloc[-1].fillna(0).to_dict()
+        if state.engine is None or state.engine.last_ts is None:
+            with span('get_klines'):
+                klines = binance.get_klines(symbol=state.symbol, interval=KLINE_INTERVAL, limit=WARMUP_CANDLES)
+            with span('warmup'):
+                state.engine = IndicatorEngine()
+                state.engine.warmup(klines[:-1])
+                state.candles.clear()
+                state.candles.extend(k[:6] for k in klines[:-1])
+        else:
+            behind = int(_clock.time() * 1000 - state.engine.last_ts) // 60_000  # Küünlaid pärast viimast suletut
+            limit = min(max(TAIL_CANDLES, behind + 2), WARMUP_CANDLES)
+            with span('get_klines'):
+                klines = binance.get_klines(symbol=state.symbol, interval=KLINE_INTERVAL, limit=limit)
+            closed = [k for k in klines[:-1] if int(k[0]) > state.engine.last_ts]
+            # Kui vahele jäi rohkem küünlaid kui saime, soojendame uuesti
+            if closed and int(closed[0][0]) - state.engine.last_ts > 60_000:
+                logger.warning(f"⚠️ {state.symbol}: küünalde auk, soojendan indikaatorid uuesti.")
+                SKIPPED.inc(symbol=state.symbol, reason='gap')
+                state.engine = None
+                return fetch_data(state)
+            with span('indicators'):
+                for k in closed:
+                    state.engine.update(k)
+                    state.candles.append(k[:6])
+
+        with span('indicators'):
+            return fillna(state.engine.preview(klines[-1]))
     except Exception as e:
-        logger.error(f"❌ Viga andmete hankimisel: {e}")
+        metrics.ERRORS.inc(stage='fetch')
+        logger.error(f"❌ {state.symbol}: viga andmete hankimisel: {e}")
         return None
 
 # --- 5. PÕHITSÜKKEL ---
-def start_bot():
-    global current_position
-    current_position = sync_position_from_supabase()
+def predict_batch(model, rows):
+    """Üks predict_proba kõigi sümbolite peale. Tagastab (n, 3) tõenäosused."""
+    if not rows:
+        return np.empty((0, len(ACTIONS)))
+    X = np.array([[float(data.get(f, 0)) for f in FEATURES] for data in rows])
+    with span('predict'):
+        return model.predict_proba(X)
+
+def decide(state, data, probs, model_version=None):
+    """Ühe sümboli otsus: risk, positsioon ja logi payload (tõenäosused on juba arvutatud)."""
+    # --- 0. RISK (vahemälust, taustal värskendatud) ---
+    # Teeme protsendist kordaja (nt 50% slider -> 0.5 kordaja)
+    with span('risk'):
+        risk_multiplier = risk_setting.get() / 100.0
+
+    # 1. AI Ennustus
+    if probs is not None:
+        ai_action = ACTIONS[np.argmax(probs)]
+        confidence = float(np.max(probs))
+    else:
+        ai_action, confidence = "HOLD", 0.0
+
+    # 2. FUTUURIDE PNL ARVUTUS
+    current_price = float(data['price'])
+    position = state.position
+    avg_entry = float(position['entry_price']) if position else 0.0
+
+    raw_pnl = 0.0
+    if position:
+        if position['type'] == "LONG":
+            raw_pnl = ((current_price - avg_entry) / avg_entry * 100)
+        elif position['type'] == "SHORT":
+            raw_pnl = ((avg_entry - current_price) / avg_entry * 100)
+
+    # RAKENDAME RISKI (Siin toimub maagia)
+    final_pnl = raw_pnl * risk_multiplier
+
+    summary = f"AI: {ai_action} | Risk: {risk_multiplier*100:.0f}% | PNL:{final_pnl:.2f}%"
+
+    # 3. KAUPLEMISE OTSUS
+    if ai_action == "LONG" and confidence > BOT_CONFIDENCE:
+        if position is None or position['type'] == "SHORT":
+            state.position = {"entry_price": current_price, "type": "LONG"}
+            logger.info(f"🚀 {state.symbol} OPEN LONG: {current_price}")
+
+    elif ai_action == "SHORT" and confidence > BOT_CONFIDENCE:
+        if position is None or position['type'] == "LONG":
+            state.position = {"entry_price": current_price, "type": "SHORT"}
+            logger.info(f"📉 {state.symbol} OPEN SHORT: {current_price}")
+
+    # 4. PAYLOAD SUPABASE-ILE
+    position = state.position
+    log_payload = {
+        "price": current_price,
+        "rsi": float(data['rsi']),
+        "macd": float(data['macd']),
+        "macd_signal": float(data['macd_signal']),
+        "vwap": float(data['vwap']),
+        "stoch_k": float(data['stoch_k']),
+        "stoch_d": float(data['stoch_d']),
+        "atr": float(data['atr']),
+        "ema200": float(data['ema200']),
+        "market_pressure": float(data['market_pressure']),
+        "symbol": state.symbol,
+        "pnl": final_pnl, # Kasutame riskiga korrigeeritud PNL-i
+        "ai_prediction": confidence,
+        "bot_confidence": confidence,
+        "fear_greed_index": 50,
+        "is_panic_mode": bool(data['is_panic_mode']),
+        "bb_upper": float(data['bb_upper']),
+        "bb_lower": float(data['bb_lower']),
+        "volume": float(data['vol']),
+        "avg_entry_price": position['entry_price'] if position else 0.0,
+        "action": position['type'] if position else "HOLD",
+        "analysis_summary": summary,
+        "model_version": model_version,
+        "created_at": _clock.utcnow().isoformat()
+    }
+
+    logger.info(f"📊 {state.symbol} {summary} | Hind: {current_price}")
+    return log_payload
+
+def process_batch(ticks, model, model_version=None):
+    """Otsustussamm mitmele sümbolile korraga: üks ennustus, read logijasse.
+
+    `ticks` on [(SymbolState, data), ...]. Tagastab {symbol: payload} ainult
+    sümbolitele, mille börsi andmed olid korras.
+    """
+    valid = []
+    for state, data in ticks:
+        # --- TURVAKONTROLL: Kas andmed on reaalsed? ---
+        # Kui maht on 0, tähendab see, et börsilt ei tulnud õigeid andmeid
+        current_vol = float(data.get('vol', 0))
+        current_price = float(data.get('price', 0))
+        if current_vol == 0 or current_price == 0:
+            logger.warning(f"⚠️ {state.symbol}: vigased andmed börsilt (Vol: {current_vol}, Hind: {current_price}). Jätan vahele.")
+            SKIPPED.inc(symbol=state.symbol, reason='invalid_data')
+            continue
+        valid.append((state, data))
+
+    probs = predict_batch(model, [data for _, data in valid]) if model else [None] * len(valid)
+    payloads = {}
+    for (state, data), p in zip(valid, probs):
+        with span('decide'):
+            payloads[state.symbol] = decide(state, data, p, model_version)
+        # 5. SALVESTAMINE (taustal; logija koondab kõigi sümbolite read üheks insert'iks)
+        log_writer.write(payloads[state.symbol])
+        TICKS.inc(symbol=state.symbol)
+    return payloads
+
+def process_tick(data, model, state=None):
+    """Üks otsustussamm ühele sümbolile. Tagastab payload'i või None, kui andmed olid vigased."""
+    state = state or states[SYMBOLS[0]]
+    return process_batch([(state, data)], model).get(state.symbol)
+
+def run_stream(models):
+    """Voogedastuse režiim: iga sümbol saab oma voo, otsused tehakse suletud küünalde peale.
+
+    Samal minutil sulgunud küünlad kogutakse `STREAM_BATCH_WINDOW` jooksul
+    kokku ja ennustatakse ühe päringuga.
+    """
+    from kline_stream import KlineStream  # websockets ainult voorežiimis
+    closed = queue.Queue()
+    streams = []
+    for state in states.values():
+        # Soojendus või (hetktõmmisest taastatud olekule) ainult puuduvad küünlad
+        if fetch_data(state) is None:
+            raise RuntimeError(f"{state.symbol}: indikaatorite soojendus ebaõnnestus")
+
+        def on_close(kline, state=state):
+            with span('indicators'), state.lock:
+                data = fillna(state.engine.update(kline))
+                state.candles.append(kline[:6])
+            closed.put((state, data, int(kline[6]) / 1000))
+
+        stream = KlineStream(state.symbol, on_close, binance, interval=KLINE_INTERVAL)
+        for k in state.candles:
+            stream.buffer.add(k)
+        streams.append(stream.start())
+    logger.info(f"📡 Küünlavoo režiim (WebSocket + REST varu), {len(streams)} sümbolit")
 
-    model = joblib.load('trading_brain_xgb.pkl') if os.path.exists('trading_brain_xgb.pkl') else None
+    try:
+        while True:
+            ticks = [closed.get()]
+            deadline = time.time() + STREAM_BATCH_WINDOW
+            while len(ticks) < len(states) and (timeout := deadline - time.time()) > 0:
+                try:
+                    ticks.append(closed.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            model, version = models.acquire()
+            with span('cycle'):
+                process_batch([(s, d) for s, d, _ in ticks], model, version)
+            LOOP_LAG.set(time.time() - min(t for _, _, t in ticks))
+            save_snapshot(version)
+    finally:
+        for stream in streams:
+            stream.stop()
+        save_snapshot(models.current[1], force=True)
+        log_writer.close()  # Järjekorras olevad read andmebaasi või žurnaali
+
+def save_snapshot(model_version, force=False):
+    """Salvestab hetktõmmise, kui eelmisest on möödas `SNAPSHOT_SECONDS` (või `force`)."""
+    global _snapshot_at
+    now = time.time()
+    if force or now - _snapshot_at >= snapshot.SNAPSHOT_SECONDS:
+        with span('snapshot'):
+            snapshot.save(states, model_version)
+        _snapshot_at = now
+
+def init_metrics():
+    """Käivitab /metrics serveri, kui METRICS_PORT on määratud."""
+    if not METRICS_PORT:
+        return
+    metrics.serve(METRICS_PORT)
+    metrics.gauge('bot_log_queue_depth', 'Kirjutamata logiread järjekorras').set_function(lambda: log_writer.queue.qsize())
+    metrics.gauge('bot_log_journal_rows', 'Žurnaali jäänud read (andmebaas polnud kättesaadav)') \
+        .set_function(lambda: log_writer.metrics()['journal_rows'])
+    metrics.gauge('bot_risk_percent', 'Kehtiv riskitase (%)').set_function(lambda: risk_setting.get())
+
+def start_bot(source=None, sink=None, clock=None, risk=None, model_path=MODEL_PATH):
+    """Boti põhitsükkel.
+
+    Vaikimisi päris Binance, Supabase ja kell. Replay (replay.py) annab
+    asemele küünlaallika (`get_klines`), logija (`write`), kella (`time`,
+    `sleep`, `utcnow`) ja riski (`get`); otsustuskood on mõlemal sama.
+    Live bot taastab oleku hetktõmmisest (snapshot.py), kui see on olemas.
+    """
+    global log_writer, risk_setting, model_watcher, binance, _clock
+    live = sink is None
+    if source is None or live:
+        connect()
+    if source is not None:
+        binance = source
+    if clock is not None:
+        _clock = clock
+
+    # Live'is laetakse mudel taustal (xgboost import) samal ajal, kui olek taastatakse
+    model_watcher = ModelWatcher(model_path)
+    if live:
+        model_watcher.start()
+    else:
+        model_watcher.load()  # Replay jääb stardis laetud mudeli juurde
+
+    saved = snapshot.load() if live else None
+    states.clear()
+    for symbol in SYMBOLS:
+        state = states[symbol] = SymbolState(symbol)
+        if saved and snapshot.restore(state, saved):
+            continue
+        # Kohalik logija alustab puhtalt lehelt, nagu live bot tühja tabeli peal
+        state.position = sync_position_from_supabase(symbol) if live else None
+    if live:
+        log_writer = TradeLogWriter(supabase).start()
+        risk_setting = CachedSetting("risk_percent", risk_percent_fetcher(supabase), ttl=RISK_TTL, default=100.0).start()
+        risk_setting.subscribe(lambda old, new: logger.info(f"🛡️ Risk muutus: {old}% -> {new}%"))
+        init_metrics()
+        # Supervisori SIGTERM lõpetab tsükli nii, et viimane hetktõmmis jõuab kettale
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    else:
+        log_writer = sink
+        risk_setting = risk
+
+    model_watcher.ready.wait(MODEL_WAIT)
+    model, version = model_watcher.acquire()
     if model:
-        logger.info("🧠 AI Mudel laaditud (Futures Enabled).")
+        logger.info(f"🧠 AI Mudel laaditud: {version} (Futures Enabled).")
     else:
-        logger.warning("⚠️ Mudelit ei leitud.")
+        logger.warning("⚠️ Mudelit ei leitud (laetakse, kui fail tekib).")
+    if saved and saved["model_version"] != version:
+        logger.info(f"ℹ️ Mudel on pärast hetktõmmist vahetunud: {saved['model_version']} -> {version}")
 
-    while True:
-        start_time = time.time()
-        data = fetch_data()
-        
-        if data:
-            # --- TURVAKONTROLL: Kas andmed on reaalsed? ---
-            # Kui maht on 0, tähendab see, et börsilt ei tulnud õigeid andmeid
-            current_vol = float(data.get('vol', 0))
-            current_price = float(data.get('price', 0))
-
-            if current_vol == 0 or current_price == 0:
-                logger.warning(f"⚠️ Vigased andmed börsilt (Vol: {current_vol}, Hind: {current_price}). Jätan vahele.")
-                time.sleep(5) # Ootame 5 sekundit ja proovime uuesti
-                continue
-            
-            # --- 0. LOE RISK ANDMEBAASIST ---
-            try:
-                r_res = supabase.table("risk_management").select("risk_percent").eq("id", 1).execute()
-                # Teeme protsendist kordaja (nt 50% slider -> 0.5 kordaja)
-                risk_multiplier = (r_res.data[0]['risk_percent'] / 100.0) if r_res.data else 1.0
-            except Exception as e:
-                logger.warning(f"⚠️ Ei saanud riski kätte, kasutan 100%: {e}")
-                risk_multiplier = 1.0
-
-            # 1. AI Ennustus
-            feat_vector = [float(data.get(f, 0)) for f in FEATURES]
-            if model:
-                probs = model.predict_proba(np.array([feat_vector]))[0]
-                ai_action = ["SHORT", "HOLD", "LONG"][np.argmax(probs)]
-                confidence = float(np.max(probs))
+    if KLINE_MODE == "stream" and source is None:
+        run_stream(model_watcher)
+        return
+
+    # Binance'i päringud käivad sümbolite kaupa paralleelselt, kliendid on ühised
+    pool = ThreadPoolExecutor(max_workers=min(len(states), 16), thread_name_prefix="fetch")
+    first_start = next_start = None
+    try:
+        while True:
+            start_time = _clock.time()
+            if next_start is not None:
+                LOOP_LAG.set(start_time - next_start)
+                DRIFT.set((start_time - first_start + CYCLE_SECONDS / 2) % CYCLE_SECONDS - CYCLE_SECONDS / 2)
             else:
-                ai_action, confidence, probs = "HOLD", 0.0, [0, 1, 0]
-
-            # 2. FUTUURIDE PNL ARVUTUS
-            current_price = float(data['price'])
-            avg_entry = float(current_position['entry_price']) if current_position else 0.0
-            
-            raw_pnl = 0.0
-            if current_position:
-                if current_position['type'] == "LONG":
-                    raw_pnl = ((current_price - avg_entry) / avg_entry * 100)
-                elif current_position['type'] == "SHORT":
-                    raw_pnl = ((avg_entry - current_price) / avg_entry * 100)
-
-            # RAKENDAME RISKI (Siin toimub maagia)
-            final_pnl = raw_pnl * risk_multiplier
-
-            summary = f"AI: {ai_action} | Risk: {risk_multiplier*100:.0f}% | PNL:{final_pnl:.2f}%"
-
-            # 3. KAUPLEMISE OTSUS
-            if ai_action == "LONG" and confidence > 0.45:
-                if current_position is None or current_position['type'] == "SHORT":
-                    current_position = {"entry_price": current_price, "type": "LONG"}
-                    logger.info(f"🚀 OPEN LONG: {current_price}")
-
-            elif ai_action == "SHORT" and confidence > 0.45:
-                if current_position is None or current_position['type'] == "LONG":
-                    current_position = {"entry_price": current_price, "type": "SHORT"}
-                    logger.info(f"📉 OPEN SHORT: {current_price}")
-
-            # 4. PAYLOAD SUPABASE-ILE
-            log_payload = {
-                "price": current_price,
-                "rsi": float(data['rsi']),
-                "macd": float(data['macd']),
-                "macd_signal": float(data['macd_signal']),
-                "vwap": float(data['vwap']),
-                "stoch_k": float(data['stoch_k']),
-                "stoch_d": float(data['stoch_d']),
-                "atr": float(data['atr']),
-                "ema200": float(data['ema200']),
-                "market_pressure": float(data['market_pressure']),
-                "symbol": SYMBOL,
-                "pnl": final_pnl, # Kasutame riskiga korrigeeritud PNL-i
-                "ai_prediction": confidence,
-                "bot_confidence": confidence,
-                "fear_greed_index": 50,
-                "is_panic_mode": bool(data['is_panic_mode']),
-                "bb_upper": float(data['bb_upper']),
-                "bb_lower": float(data['bb_lower']),
-                "volume": float(data['vol']),
-                "avg_entry_price": current_position['entry_price'] if current_position else 0.0,
-                "action": current_position['type'] if current_position else "HOLD",
-                "analysis_summary": summary,
-                "created_at": datetime.utcnow().isoformat()
-            }
-
-            # 5. SALVESTAMINE
-            try:
-                supabase.table("trade_logs").insert(log_payload).execute()
-                logger.info(f"📊 {summary} | Hind: {current_price}")
-            except Exception as e:
-                logger.error(f"❌ Supabase viga: {e}")
+                first_start = start_time
+            pending = list(states.values())
+            model, version = model_watcher.acquire()
+            with span('cycle'):
+                while pending:
+                    ticks = [(s, d) for s, d in zip(pending, pool.map(fetch_data, pending)) if d]
+                    done = process_batch(ticks, model, version)
+                    # Vigaste andmetega sümbolid proovime 5 sekundi pärast uuesti
+                    pending = [s for s, _ in ticks if s.symbol not in done]
+                    if pending and _clock.time() - start_time < 50:
+                        _clock.sleep(5)
+                    else:
+                        break
 
-        time.sleep(max(0, 60 - (time.time() - start_time)))
+            elapsed = _clock.time() - start_time
+            HEADROOM.set(CYCLE_SECONDS - elapsed)
+            next_start = start_time + max(CYCLE_SECONDS, elapsed)
+            if live:
+                save_snapshot(version)
+            _clock.sleep(max(0, CYCLE_SECONDS - elapsed))
+    finally:
+        pool.shutdown(wait=False)
+        if live:
+            save_snapshot(version, force=True)
+            log_writer.close()  # Järjekorras olevad read andmebaasi või žurnaali
 
 if __name__ == "__main__":
-    start_bot()
\ No newline at end of file
+    start_bot()
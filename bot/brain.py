@@ -1,4 +1,7 @@
 import os
+import sys
+import json
+import time
 import pandas as pd
 import numpy as np
 import joblib
@@ -7,6 +10,9 @@ from xgboost import XGBClassifier
 from supabase import create_client
 from dotenv import load_dotenv
 from pathlib import Path
+from datetime import datetime, timezone
+
+from log_loader import iter_chunks, scalar
 
 # Seadistame logimise
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - [brain] %(message)s')
@@ -39,71 +45,225 @@ supabase = create_client(url, key)
 # TUNNUSTE JÄRJEKORD - Peab olema sama mis bot.py-s!
 FEATURES = ['price', 'rsi', 'macd', 'macd_signal', 'vwap', 'stoch_k', 'stoch_d', 'atr', 'ema200', 'market_pressure']
 
-def train_brain():
-    logger.info("🧠 Alustan puhaste andmete laadimist...")
-    
+MODEL_PATH = Path('trading_brain_xgb.pkl')
+STORE_DIR = Path(os.getenv('BRAIN_STORE_DIR', Path(__file__).parent / '.brain_store'))
+STORE_PATH = STORE_DIR / 'features.npz'   # id, created_at, symbol, X, trained (kõik kehtivad read)
+STATE_PATH = STORE_DIR / 'state.json'     # watermark ja mudeli seis
+MANIFEST_PATH = STORE_DIR / 'runs.jsonl'  # iga treeningu aeg ja andmemaht
+STORE_FORMAT = 2                          # 1: ilma sümboli ja treenitud ridade märgita
+BRAIN_MODE = os.getenv('BRAIN_MODE', 'incremental')  # 'incremental' või 'full'
+# Žurnaalist hiljem sisse mängitud read on vanema created_at-iga kui watermark.
+# Iga sünkroonimine loeb selle akna uuesti (topelt read eemaldab id).
+LATE_WINDOW = pd.Timedelta(hours=float(os.getenv('BRAIN_LATE_HOURS', 24)))
+
+HORIZON = 15          # Mitu küünalt ette märgistame (sama sümboli ridu)
+THRESHOLD = 0.1       # % muutus, millest alates LONG/SHORT
+TREES = 200           # Täistreening
+INCREMENT_TREES = 20  # Lisapuud iga inkrementaalse treeningu kohta
+MAX_TREES = 1000      # Sellest suurem mudel treenitakse nullist uuesti
+
+def new_model(n_estimators=TREES):
+    return XGBClassifier(
+        n_estimators=n_estimators,
+        max_depth=6,
+        learning_rate=0.05,
+        objective='multi:softprob',
+        num_class=3,
+        eval_metric='mlogloss'
+    )
+
+# --- Kohalik tunnuste hoidla ---
+
+def load_state():
+    return json.loads(STATE_PATH.read_text()) if STATE_PATH.exists() else {}
+
+def save_state(state):
+    STORE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = STATE_PATH.with_suffix('.tmp')
+    tmp.write_text(json.dumps(state, indent=2))
+    os.replace(tmp, STATE_PATH)
+
+def empty_store():
+    return {
+        "id": np.empty(0, dtype=np.int64),
+        "created_at": np.empty(0, dtype='U40'),
+        "symbol": np.empty(0, dtype='U20'),
+        "X": np.empty((0, len(FEATURES))),
+        "trained": np.empty(0, dtype=bool),
+    }
+
+def load_store():
+    """Tagastab hoidla {veerg: massiiv} järjestatuna (created_at, id) järgi. Vana formaat -> None."""
+    if not STORE_PATH.exists():
+        return empty_store()
+    data = np.load(STORE_PATH)
+    if 'format' not in data or int(data['format']) != STORE_FORMAT:
+        return None
+    return {col: data[col] for col in empty_store()}
+
+def save_store(store):
+    STORE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = STORE_DIR / 'features.tmp.npz'
+    np.savez(tmp, format=STORE_FORMAT, **store)
+    os.replace(tmp, STORE_PATH)
+
+def sync_start(state):
+    """Kursor (created_at, id), millest sünkroonimist alustada: watermark miinus LATE_WINDOW."""
+    if not state.get('watermark'):
+        return None, None
+    return (pd.Timestamp(state['watermark']) - LATE_WINDOW).isoformat(), None
+
+def sync_store(state):
+    """Lisab watermark'ist (miinus LATE_WINDOW) uuemad read hoidlasse. Tagastab (hoidla, uute ridade arv).
+
+    Tõmbab ainult id, created_at, symbol ja FEATURES veerud, samad NULL filtrid mis varem.
+    """
+    store = load_store()
+    if store is None:
+        logger.info("ℹ️ Hoidla on vanas formaadis, laen kõik read uuesti ja treenin nullist.")
+        store = empty_store()
+        for key in ('watermark', 'watermark_id', 'trained_upto', 'model_trees'):
+            state.pop(key, None)
+    parts = [store]
+    known = set(store['id'].tolist())
+    fetched = 0
+    start, start_id = sync_start(state) if len(store['id']) else (None, None)
+    for chunk in iter_chunks(supabase, FEATURES + ['symbol'],
+                             where=lambda q: q.not_.is_("macd", "null").not_.is_("rsi", "null"),
+                             start=start, start_id=start_id):
+        last = (str(chunk['created_at'][-1]), scalar(chunk['id'][-1]))
+        if last[0] > state.get('watermark', ''):
+            state['watermark'], state['watermark_id'] = last
+        X = np.column_stack([chunk[f] for f in FEATURES])
+        new = ~np.isnan(X).any(axis=1) & np.array([i not in known for i in chunk['id'].tolist()], dtype=bool)
+        fetched += int(new.sum())
+        parts.append({
+            "id": chunk['id'][new],
+            "created_at": chunk['created_at'][new].astype('U40'),
+            "symbol": np.array([s or '' for s in chunk['symbol'][new]], dtype='U20'),
+            "X": X[new],
+            "trained": np.zeros(int(new.sum()), dtype=bool),
+        })
+    # Tühja hoidla id tüüp (int64) ei pruugi klappida tabeli omaga (UUID)
+    parts = [p for p in parts if len(p['id'])] or [store]
+    if not fetched:
+        return parts[0], 0
+
+    merged = {col: np.concatenate([p[col] for p in parts]) for col in store}
+    order = np.lexsort((merged['id'], merged['created_at']))
+    merged = {col: values[order] for col, values in merged.items()}
+    save_store(merged)
+    return merged, fetched
+
+# --- TARGE MÄRGISTAMINE ---
+
+def make_labels(price, symbol):
+    """HORIZON sama sümboli küünla pärast: > +0.1% LONG (2), < -0.1% SHORT (0), muidu HOLD (1).
+
+    Read on (created_at, id) järjekorras ja sümbolid vaheldumisi, seega nihutame
+    hinda sümboli sees. Iga sümboli viimastel HORIZON real tulevikku veel pole -
+    need jäävad märgistamata (-1) ja saavad sildi järgmisel treeningul.
+    """
+    future = pd.Series(price).groupby(symbol, sort=False).shift(-HORIZON).to_numpy()
+    change = (future - price) / price * 100
+    labels = np.where(change > THRESHOLD, 2, np.where(change < -THRESHOLD, 0, 1))
+    return np.where(np.isnan(future), -1, labels).astype(np.int64)
+
+def write_manifest(entry):
+    STORE_DIR.mkdir(parents=True, exist_ok=True)
+    with open(MANIFEST_PATH, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry) + "\n")
+
+def save_model(model):
+    # Atomaarne asendus, et bot/tööprotsessid ei loeks poolikut faili
+    tmp = MODEL_PATH.with_suffix('.tmp')
+    joblib.dump(model, tmp)
+    os.replace(tmp, MODEL_PATH)
+
+def train_brain(mode=None):
+    """Treenib mudeli. 'incremental' jätkab olemasolevat boosterit uute märgistatud ridadega,
+    'full' treenib nullist kogu kohaliku hoidla peal. Tagastab manifesti kirje."""
+    mode = mode or BRAIN_MODE
+    logger.info(f"🧠 Alustan puhaste andmete laadimist ({mode})...")
+    started = time.time()
+
     try:
-        # Tõmbame andmed, kus olulised näitajad pole NULL
-        res = supabase.table("trade_logs").select("*") \
-            .not_.is_("macd", "null") \
-            .not_.is_("rsi", "null") \
-            .order("created_at", desc=True) \
-            .limit(2000).execute()
-        
-        if not res.data:
+        state = load_state()
+        store, fetched = sync_store(state)
+        fetch_seconds = time.time() - started
+        logger.info(f"📥 Uusi ridu: {fetched}, hoidlas kokku: {len(store['id'])}")
+
+        if not len(store['id']):
             logger.error("❌ Andmeid ei leitud Supabase'ist!")
-            return
+            return None
 
-        df = pd.DataFrame(res.data)
-        
-        # Veendume, et kõik FEATURES on olemas
-        missing_cols = [c for c in FEATURES if c not in df.columns]
-        if missing_cols:
-            logger.error(f"❌ Tabelis puuduvad veerud: {missing_cols}")
-            return
+        X, trained = store['X'], store['trained']
+        labels = make_labels(X[:, FEATURES.index('price')], store['symbol'])
+        labeled = labels >= 0
 
-        df[FEATURES] = df[FEATURES].apply(pd.to_numeric, errors='coerce')
-        df = df.dropna(subset=FEATURES)
+        # Inkrementaalne ainult siis, kui on millest jätkata
+        old_model = joblib.load(MODEL_PATH) if MODEL_PATH.exists() else None
+        total_trees = state.get('model_trees', 0)
+        if mode == 'incremental' and (old_model is None or not trained.any()
+                                      or total_trees + INCREMENT_TREES > MAX_TREES):
+            logger.info("ℹ️ Inkrementaalseks treeninguks puudub alus, treenin kogu hoidla peal.")
+            mode = 'full'
 
-        # TARGE MÄRGISTAMINE
-        df = df.sort_values('created_at')
-        df['future_price'] = df['price'].shift(-15) 
-        df['change_pct'] = (df['future_price'] - df['price']) / df['price'] * 100
-        
-        threshold = 0.1 
+        # Treenitud read on märgitud hoidlas id kaupa, mitte positsiooniga (hilised read nihutavad)
+        rows = labeled & ~trained if mode == 'incremental' else labeled
+        X_train = pd.DataFrame(X[rows], columns=FEATURES)
+        y = pd.Series(labels[rows])
 
-        def get_label(c):
-            if c > threshold: return 2   # LONG
-            if c < -threshold: return 0  # SHORT
-            return 1                     # HOLD
+        logger.info(f"📊 Treeningandmed: {len(y)} rida. Jaotus: {y.value_counts().to_dict()}")
 
-        df['label'] = df['change_pct'].apply(get_label)
-        df = df.dropna(subset=['label'])
+        if len(y) < 10:
+            logger.warning("⚠️ Liiga vähe andmeid treenimiseks!")
+            save_state(state)
+            return None
 
-        X = df[FEATURES]
-        y = df['label']
+        if mode == 'incremental' and y.nunique() < 3:
+            # XGBClassifier nõuab kõiki klasse; ootame rohkem andmeid
+            logger.info("ℹ️ Uutes ridades pole kõiki klasse, jätan treeningu vahele.")
+            save_state(state)
+            return None
 
-        logger.info(f"📊 Treeningandmed: {len(df)} rida. Jaotus: {y.value_counts().to_dict()}")
+        train_start = time.time()
+        if mode == 'incremental':
+            model = new_model(INCREMENT_TREES)
+            model.fit(X_train, y, xgb_model=old_model.get_booster())
+            total_trees += INCREMENT_TREES
+        else:
+            model = new_model()
+            model.fit(X_train, y)
+            total_trees = TREES
+        train_seconds = time.time() - train_start
 
-        if len(df) < 10:
-            logger.warning("⚠️ Liiga vähe andmeid treenimiseks!")
-            return
-
-        model = XGBClassifier(
-            n_estimators=200,
-            max_depth=6,
-            learning_rate=0.05,
-            objective='multi:softprob',
-            num_class=3,
-            eval_metric='mlogloss'
-        )
-        
-        model.fit(X, y)
-        joblib.dump(model, 'trading_brain_xgb.pkl')
-        logger.info("🚀 UUS AJU SALVESTATUD! (trading_brain_xgb.pkl)")
+        save_model(model)
+        trained[rows] = True
+        save_store(store)
+        state.pop('trained_upto', None)  # Vana positsioonipõhine märge
+        state.update({"model_trees": total_trees})
+        save_state(state)
+
+        entry = {
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "mode": mode,
+            "fetched_rows": fetched,
+            "store_rows": len(store['id']),
+            "train_rows": len(y),
+            "labels": {int(k): int(v) for k, v in y.value_counts().items()},
+            "total_trees": total_trees,
+            "fetch_seconds": round(fetch_seconds, 3),
+            "train_seconds": round(train_seconds, 3),
+            "watermark": state.get('watermark'),
+        }
+        write_manifest(entry)
+        logger.info(f"🚀 UUS AJU SALVESTATUD! ({MODEL_PATH}, {mode}, {total_trees} puud, {train_seconds:.1f}s)")
+        return entry
 
     except Exception as e:
         logger.error(f"❌ Viga treenimisel: {e}")
+        return None
 
 if __name__ == "__main__":
-    train_brain()
\ No newline at end of file
+    train_brain('full' if '--full' in sys.argv else None)
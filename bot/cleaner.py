@@ -1,10 +1,29 @@
+"""trade_logs hooldus: tasemetega säilitus ja koondamine.
+
+1. Rollup: `RAW_RETENTION_DAYS`-st vanemad read (kõik, mitte ainult HOLD)
+   koondatakse 5m ja 1h ridadeks tabelisse `trade_logs_rollup`: hinna OHLC,
+   indikaatorite keskmised, mahu summa ja viimane positsioon. Töödeldakse
+   ainult täis tunde pärast viimast 1h ämbrit, seega kordus ei kirjuta
+   osalisi ämbreid üle.
+2. Kustutamine: vanad HOLD read (ja `ROLLUP_RETENTION` järgi vanad 5m
+   ämbrid) kustutatakse id vahemike kaupa (`DELETE_CHUNK` rida), tükkide
+   vahel paus. Kui rollup ebaõnnestub, toorandmeid ei kustutata.
+
+Kirjutamiseks on vaja teenusevõtit (`SUPABASE_KEY`): `trade_logs_rollup`-il on
+RLS ja anon võtmele ainult lugemisõigus.
+"""
 import os
+import sys
+import time
 import logging
-from datetime import datetime, timedelta
 from supabase import create_client
 from dotenv import load_dotenv
 from pathlib import Path
 
+import pandas as pd
+
+from log_loader import iter_chunks
+
 # 1. LOGIMISE SEADISTUS
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - [cleaner] %(message)s')
 logger = logging.getLogger(__name__)
@@ -16,38 +35,132 @@ if not env_path.exists():
 load_dotenv(dotenv_path=env_path)
 
 SUPABASE_URL = os.getenv('VITE_SUPABASE_URL') or os.getenv('SUPABASE_URL')
-SUPABASE_KEY = os.getenv('VITE_SUPABASE_ANON_KEY') or os.getenv('SUPABASE_KEY')
+SUPABASE_KEY = os.getenv('SUPABASE_KEY')  # Teenusevõti: anon võtmega upsert ja delete lükatakse RLS-i tõttu tagasi
 
 if not SUPABASE_URL or not SUPABASE_KEY:
-    logger.error("❌ Supabase seaded puudu! Kontrolli .env faili.")
-    exit()
+    logger.error("❌ Supabase seaded puudu! Puhastus vajab SUPABASE_URL-i ja teenusevõtit SUPABASE_KEY (.env).")
+    sys.exit(1)
 
 supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+RAW_RETENTION_DAYS = int(os.getenv('RAW_RETENTION_DAYS', 7))  # HOLD toorandmed, et AI saaks treenida
+ROLLUP_TABLE = "trade_logs_rollup"
+ROLLUP_INTERVALS = {"5m": "5min", "1h": "1h"}  # 1h viimasena: see on ühtlasi rollup'i watermark
+ROLLUP_RETENTION = {"5m": 90, "1h": None}  # päeva; None = hoitakse alatiseks
+MEAN_COLUMNS = ['rsi', 'macd', 'macd_signal', 'vwap', 'stoch_k', 'stoch_d', 'atr', 'ema200',
+                'market_pressure', 'bb_upper', 'bb_lower', 'bot_confidence']
+LAST_COLUMNS = ['action', 'avg_entry_price', 'pnl']
+ROLLUP_SOURCE = ['symbol', 'price', 'volume'] + MEAN_COLUMNS + LAST_COLUMNS
+UPSERT_BATCH = 500
+DELETE_CHUNK = int(os.getenv('DELETE_CHUNK', 500))
+DELETE_PAUSE = 0.2  # sekundit tükkide vahel, et andmebaas jõuaks hingata
+
+# --- ROLLUP ---
+
+def rollup_watermark():
+    """Viimase koondatud tunni lõpp (ISO) või None, kui rollup'e veel pole."""
+    res = supabase.table(ROLLUP_TABLE).select("bucket").eq("interval", "1h") \
+        .order("bucket", desc=True).limit(1).execute()
+    if not res.data:
+        return None
+    return (pd.Timestamp(res.data[0]['bucket']) + pd.Timedelta(hours=1)).isoformat()
+
+def iter_hours(start, end):
+    """Toorread [start, end) täis tundide kaupa DataFrame'idena (mälu piirab lehe suurus)."""
+    carry = None
+    for chunk in iter_chunks(supabase, ROLLUP_SOURCE, start=start, end=end):
+        df = pd.DataFrame(chunk)
+        df['created_at'] = pd.to_datetime(df['created_at'], format='ISO8601', utc=True)
+        if carry is not None:
+            df = pd.concat([carry, df], ignore_index=True)
+        hour = df['created_at'].dt.floor('1h')
+        done = hour < hour.iloc[-1]  # viimane tund võib järgmisesse lehte jätkuda
+        if done.any():
+            yield df[done]
+        carry = df[~done]
+    if carry is not None and len(carry):
+        yield carry  # `end` on tunni piiril, seega ka viimane tund on täis
+
+def aggregate(df, interval, freq):
+    """Toorread -> rollup-read (list of dict) ühe intervalli jaoks."""
+    df = df.assign(symbol=df['symbol'].fillna('BTCUSDT'))
+    g = df.groupby(['symbol', df['created_at'].dt.floor(freq).rename('bucket')], sort=True)
+    out = g['price'].agg(open='first', high='max', low='min', close='last')
+    out['rows'] = g.size()
+    out['volume'] = g['volume'].sum()
+    out[MEAN_COLUMNS] = g[MEAN_COLUMNS].mean()
+    out[LAST_COLUMNS] = g[LAST_COLUMNS].last()  # viimane teadaolev positsioon ämbris
+    out = out.reset_index()
+    out['bucket'] = out['bucket'].map(pd.Timestamp.isoformat)
+    out.insert(1, 'interval', interval)
+    out = out.astype(object).where(out.notna(), None)
+    return out.to_dict('records')
+
+def run_rollup(cutoff):
+    """Koondab read [watermark, cutoff). Tagastab kirjutatud rollup-ridade arvu."""
+    start = rollup_watermark()
+    written = 0
+    for hours in iter_hours(start, cutoff):
+        # 1h read viimasena: kui upsert katkeb, watermark ei liigu ja tund koondatakse uuesti
+        rows = [r for interval, freq in ROLLUP_INTERVALS.items() for r in aggregate(hours, interval, freq)]
+        for i in range(0, len(rows), UPSERT_BATCH):
+            supabase.table(ROLLUP_TABLE).upsert(rows[i:i + UPSERT_BATCH], on_conflict="symbol,interval,bucket").execute()
+        written += len(rows)
+    return written
+
+# --- KUSTUTAMINE ---
+
+def delete_chunked(table, where, chunk=DELETE_CHUNK, pause=DELETE_PAUSE):
+    """Kustutab `where(query)` read id vahemike kaupa. Tagastab kustutatud ridade arvu.
+
+    Tüki esimene ja viimane id loetakse `where` filtriga, kustutamine käib
+    sama filtri ja id vahemikuga - URL ei kasva tüki suurusega (id-de loend
+    `in_()`-is oleks ~20 KB). Iga tükk on eraldi väike tehing ja vastus ei
+    sisalda kustutatud ridu.
+    """
+    deleted = 0
+    while True:
+        res = where(supabase.table(table).select("id")).order("id").limit(chunk).execute()
+        ids = [r['id'] for r in res.data or []]
+        if not ids:
+            return deleted
+        where(supabase.table(table).delete(returning="minimal")).gte("id", ids[0]).lte("id", ids[-1]).execute()
+        deleted += len(ids)
+        if len(ids) < chunk:
+            return deleted
+        logger.info(f"🗑️ {table}: kustutatud {deleted} rida...")
+        time.sleep(pause)
+
 def run_smart_cleanup():
-    logger.info("🧹 Alustan andmebaasi tarka puhastust (V3.0)...")
-    
+    """Rollup, siis kustutamine. Tagastab kokkuvõtte (dict)."""
+    logger.info("🧹 Alustan andmebaasi tarka puhastust (V4.0)...")
+    now = pd.Timestamp.now(tz='UTC').floor('1h')
+    cutoff = (now - pd.Timedelta(days=RAW_RETENTION_DAYS)).isoformat()
+    summary = {"cutoff": cutoff, "rollup_rows": 0, "deleted_raw": 0, "deleted_rollup": 0}
+
+    # 1. KOONDAMINE: enne kustutamist, et treeningandmed ei kaoks jäljetult
     try:
-        # 1. Arvutame kuupäeva (nt 7 päeva tagasi)
-        # Hoiame HOLD andmeid veidi kauem (7 päeva), et AI saaks treenida
-        cutoff_date = (datetime.now() - timedelta(days=7)).isoformat()
-        
-        # 2. KUSTUTAME: Ainult need 'HOLD' read, mis on vanad
-        # Me EI puutu ridu, kus action on midagi muud (BUY, SELL, DCA, CLOSE)
-        response = supabase.table("trade_logs") \
-            .delete() \
-            .eq("action", "HOLD") \
-            .lt("created_at", cutoff_date) \
-            .execute()
-        
-        deleted_count = len(response.data) if response.data else 0
-        logger.info(f"✅ Puhastus lõpetatud! Eemaldati {deleted_count} vana 'HOLD' rida.")
-        
-        # 3. VALIKULINE: Kontrollime tabeli suurust
-        # Kui ridu on ikka liiga palju, võime vanu andmeid veelgi piirata.
+        summary["rollup_rows"] = run_rollup(cutoff)
+        logger.info(f"📦 Koondatud {summary['rollup_rows']} rollup-rida ({', '.join(ROLLUP_INTERVALS)})")
+    except Exception as e:
+        logger.error(f"❌ Rollup ebaõnnestus, toorandmeid ei kustuta: {e}")
+        return summary
 
+    # 2. KUSTUTAMINE: ainult vanad 'HOLD' read, teisi (LONG, SHORT) ei puutu
+    try:
+        summary["deleted_raw"] = delete_chunked(
+            "trade_logs", lambda q: q.eq("action", "HOLD").lt("created_at", cutoff))
+        for interval, days in ROLLUP_RETENTION.items():
+            if days is None:
+                continue
+            old = (now - pd.Timedelta(days=days)).isoformat()
+            summary["deleted_rollup"] += delete_chunked(
+                ROLLUP_TABLE, lambda q: q.eq("interval", interval).lt("bucket", old))
+        logger.info(f"✅ Puhastus lõpetatud! Eemaldati {summary['deleted_raw']} vana 'HOLD' rida "
+                    f"ja {summary['deleted_rollup']} vana rollup-rida.")
     except Exception as e:
         logger.error(f"❌ Viga puhastamise käigus: {e}")
+    return summary
 
 if __name__ == "__main__":
-    run_smart_cleanup()
\ No newline at end of file
+    run_smart_cleanup()
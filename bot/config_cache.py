@@ -0,0 +1,142 @@
+"""Vahemällu salvestatud seaded (nt risk_percent) taustal värskendamisega.
+
+Kauplemistsükkel loeb väärtust ainult mälust (`get`), andmebaasi küsib
+taustalõim iga `ttl` sekundi järel või kohe pärast `invalidate()`-i.
+Teine protsess samas masinas (dashboard) annab muutusest teada
+`notify_change(name)`-iga, mis puudutab signaalfaili; lõim kontrollib selle
+mtime'i kord sekundis.
+
+Viimane õnnestunud väärtus salvestatakse kettale, seega ka andmebaasi
+katkestuse ja boti taaskäivituse ajal jääb kehtima viimane teadaolev
+väärtus, mitte vaikimisi 100%.
+
+Testides võib `fetch` olla lihtsalt `lambda: 50.0`.
+"""
+import os
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(os.getenv('CONFIG_CACHE_DIR', Path(__file__).parent))
+
+
+class CachedSetting:
+    """Üks seade: mälus olev väärtus, TTL värskendus ja muutuse teavitus."""
+
+    def __init__(self, name, fetch, ttl=30.0, default=None, cache_dir=CACHE_DIR):
+        self.name = name
+        self.fetch = fetch
+        self.ttl = ttl
+        self.default = default
+        self.path = Path(cache_dir) / f".{name}_cache.json"
+        self.signal_path = _signal_path(name, cache_dir)
+        self.value = None
+        self.fetched_at = None
+        self._listeners = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._load()
+
+    # --- Avalik API ---
+
+    def get(self):
+        """Viimane teadaolev väärtus (ei tee võrgupäringut)."""
+        return self.default if self.value is None else self.value
+
+    def subscribe(self, callback):
+        """callback(vana, uus) kutsutakse iga muutuse peale."""
+        self._listeners.append(callback)
+
+    def invalidate(self):
+        """Sunnib taustalõime kohe uuesti lugema."""
+        self._wake.set()
+
+    def refresh(self):
+        """Loeb väärtuse allikast. Tagastab True, kui õnnestus."""
+        try:
+            new = self.fetch()
+        except Exception as e:
+            logger.warning(f"⚠️ {self.name} lugemine ebaõnnestus, kasutan viimast ({self.get()}): {e}")
+            return False
+        if new is None:
+            return False
+        old, self.value, self.fetched_at = self.value, new, time.time()
+        if new != old:
+            self._save()
+            for callback in self._listeners:
+                callback(old, new)
+        return True
+
+    def start(self):
+        if self.value is None:
+            self.refresh()
+        else:
+            self._wake.set()  # Kettal olev väärtus kehtib, värskendus käib kohe taustal
+        self._thread = threading.Thread(target=self._run, name=f"config-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    # --- Sisemus ---
+
+    def _run(self):
+        seen = _mtime(self.signal_path)
+        next_refresh = time.time() + self.ttl
+        while not self._stop.is_set():
+            woke = self._wake.wait(min(1.0, self.ttl))
+            self._wake.clear()
+            signal = _mtime(self.signal_path)
+            if self._stop.is_set():
+                break
+            if woke or signal != seen or time.time() >= next_refresh:
+                seen = signal
+                self.refresh()
+                next_refresh = time.time() + self.ttl
+
+    def _load(self):
+        try:
+            if self.path.exists():
+                data = json.loads(self.path.read_text())
+                self.value, self.fetched_at = data["value"], data["fetched_at"]
+        except Exception as e:
+            logger.warning(f"⚠️ {self.name} vahemälu faili ei saanud lugeda: {e}")
+
+    def _save(self):
+        try:
+            tmp = self.path.with_suffix('.tmp')
+            tmp.write_text(json.dumps({"value": self.value, "fetched_at": self.fetched_at}))
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logger.warning(f"⚠️ {self.name} vahemälu salvestamine ebaõnnestus: {e}")
+
+
+def _signal_path(name, cache_dir=CACHE_DIR):
+    return Path(cache_dir) / f".{name}_changed"
+
+
+def _mtime(path):
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def notify_change(name, cache_dir=CACHE_DIR):
+    """Annab samas masinas töötavale botile teada, et seade muutus."""
+    _signal_path(name, cache_dir).touch()
+
+
+def risk_percent_fetcher(client):
+    """risk_management.risk_percent lugeja Supabase'ist."""
+    def fetch():
+        res = client.table("risk_management").select("risk_percent").eq("id", 1).execute()
+        return float(res.data[0]['risk_percent']) if res.data else None
+    return fetch
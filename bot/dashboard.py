@@ -4,9 +4,13 @@ from supabase import create_client
 import os
 from dotenv import load_dotenv
 import plotly.graph_objects as go
-from datetime import datetime
+from datetime import datetime, timedelta
 import time
 
+from config_cache import notify_change
+from log_cache import LogCache
+from downsample import downsample, load_chart
+
 # --- 1. SEADISTUSED ---
 load_dotenv()
 st.set_page_config(page_title="AI Trader Live - Futures Mode", layout="wide")
@@ -17,26 +21,64 @@ def init_supabase():
 
 supabase = init_supabase()
 
-def get_data():
+DASHBOARD_COLUMNS = ['created_at', 'price', 'rsi', 'pnl', 'action', 'avg_entry_price', 'bot_confidence']
+DASHBOARD_WINDOW = int(os.getenv('DASHBOARD_WINDOW', 300))  # Mitu viimast rida näidatakse
+REFRESH_SECONDS = 60
+CHART_WIDTH = 1200  # Punkte graafiku kohta (~ekraani laius pikslites)
+HISTORY_RANGES = {"Live": None, "24 tundi": 24, "7 päeva": 168, "30 päeva": 720, "90 päeva": 2160}
+SYMBOLS = [s.strip().upper() for s in os.getenv('SYMBOLS', 'BTCUSDT').split(',') if s.strip()]
+
+@st.cache_resource
+def init_log_cache(symbol):
+    # Üks aken sümboli kohta kogu protsessi peale, kõik vaatajad jagavad seda
+    return LogCache(supabase, DASHBOARD_COLUMNS, window=DASHBOARD_WINDOW, symbol=symbol)
+
+@st.cache_data(ttl=REFRESH_SECONDS)
+def fetch_shared(symbol):
+    """Delta-päring ühe korra TTL jooksul, tulemus on kõigile sessioonidele ühine."""
+    return init_log_cache(symbol).refresh()
+
+def get_data(symbol):
+    """Tagastab (df, (win_rate, max_profit, max_loss))."""
     try:
-        response = supabase.table("trade_logs").select("*").order("created_at", desc=True).limit(300).execute()
-        df = pd.DataFrame(response.data)
-        if not df.empty:
-            df['created_at'] = pd.to_datetime(df['created_at'])
-            df = df.sort_values('created_at')
-        return df
+        return fetch_shared(symbol)
     except Exception as e:
         st.error(f"Andmete viga: {e}")
-        return pd.DataFrame()
+        return pd.DataFrame(), (0, 0, 0)
+
+@st.cache_data(ttl=REFRESH_SECONDS)
+def load_history(hours, symbol):
+    """Pikem ajalugu: loetakse tükkidena ja vähendatakse enne brauserisse saatmist."""
+    start = (datetime.utcnow() - timedelta(hours=hours)).isoformat()
+    return load_chart(supabase, start, columns=['price', 'pnl'], width=CHART_WIDTH, symbol=symbol)
+
+def live_charts(df):
+    """Live aken samas kujus nagu `load_history` tulemus."""
+    x = df['created_at'].to_numpy()
+    return {c: downsample(x, df[c].to_numpy(dtype=float), CHART_WIDTH, actions=df['action'].to_numpy())
+            for c in ('price', 'pnl')}
+
+@st.cache_data(ttl=REFRESH_SECONDS)
+def build_figures(version, _charts, symbol):
+    """Graafikud ehitatakse uuesti ainult siis, kui on uusi ridu (`version` = vahemik + viimane created_at)."""
+    price, pnl = _charts['price'], _charts['pnl']
+    fig = go.Figure()
+    if 'envelope' in price:
+        # Iga ämbri tegelik min/max, et vähendamisel ükski piik ei kaoks
+        env = price['envelope']
+        fig.add_trace(go.Scatter(x=env['x'], y=env['max'], line=dict(width=0), showlegend=False, hoverinfo='skip'))
+        fig.add_trace(go.Scatter(x=env['x'], y=env['min'], fill='tonexty', line=dict(width=0),
+                                 fillcolor='rgba(0,255,0,0.15)', name="min/max"))
+    fig.add_trace(go.Scatter(x=price['x'], y=price['y'], name=symbol, line=dict(color='#00ff00', width=2)))
+
+    buys, shorts = price['markers']['LONG'], price['markers']['SHORT']
+    fig.add_trace(go.Scatter(x=buys['x'], y=buys['y'], mode='markers', name='LONG', marker=dict(symbol='triangle-up', size=12, color='cyan')))
+    fig.add_trace(go.Scatter(x=shorts['x'], y=shorts['y'], mode='markers', name='SHORT', marker=dict(symbol='triangle-down', size=12, color='magenta')))
+    fig.update_layout(template="plotly_dark", height=450)
 
-def calculate_stats(df):
-    if df.empty: return 0, 0, 0
-    trades_with_pnl = df[df['pnl'] != 0]
-    if trades_with_pnl.empty: return 0, 0, 0
-    win_rate = (len(trades_with_pnl[trades_with_pnl['pnl'] > 0]) / len(trades_with_pnl)) * 100
-    max_profit = df['pnl'].max()
-    max_loss = df['pnl'].min()
-    return win_rate, max_profit, max_loss
+    fig_pnl = go.Figure(go.Scatter(x=pnl['x'], y=pnl['y'], fill='tozeroy', line=dict(color='#00d1ff')))
+    fig_pnl.update_layout(template="plotly_dark", height=250)
+    return fig, fig_pnl
 
 # --- 3. PEALEHT ---
 st.title("🤖 AI Futures Trader - Live")
@@ -65,25 +107,27 @@ new_risk_val = st.sidebar.slider("Kasuta rahakotist (%)", 1, 100, int(current_ri
 
 if st.sidebar.button("Salvesta riski tase"):
     supabase.table("risk_management").update({"risk_percent": new_risk_val}).eq("id", 1).execute()
+    notify_change("risk_percent")  # bot loeb uue väärtuse kohe, mitte TTL-i lõpus
     st.sidebar.success(f"Uus risk: {new_risk_val}%")
     time.sleep(1)
     st.rerun()
 
 st.sidebar.markdown("---")
+symbol = st.sidebar.selectbox("🪙 Sümbol", SYMBOLS)
+history_label = st.sidebar.selectbox("📈 Graafiku vahemik", list(HISTORY_RANGES))
 # --- KÜLGRIBA LÕPP ---
 
-df = get_data()
+df, (win_rate, max_p, max_l) = get_data(symbol)
 
 if not df.empty:
     latest = df.iloc[-1]
-    win_rate, max_p, max_l = calculate_stats(df)
     
     # --- MEETRIKA PLOKK ---
     m1, m2, m3, m4 = st.columns(4)
     pnl_pct = latest.get('pnl', 0)
     current_wallet = initial_capital * (1 + (pnl_pct / 100))
     
-    m1.metric("BTC Hind", f"${latest['price']:.2f}")
+    m1.metric(f"{symbol} Hind", f"${latest['price']:.2f}")
     m2.metric("Rahakott", f"${current_wallet:.2f}", f"{pnl_pct:.2f}%")
     m3.metric("Boti Win Rate", f"{win_rate:.1f}%")
     m4.metric("Parim tehing", f"{max_p:.2f}%")
@@ -103,19 +147,18 @@ if not df.empty:
         st.info(f"🧠 **Boti strateegia:** {msg}")
 
     # --- GRAAFIKUD ---
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(x=df['created_at'], y=df['price'], name="BTC", line=dict(color='#00ff00', width=2)))
-    
-    buys = df[df['action'] == 'LONG']
-    shorts = df[df['action'] == 'SHORT']
-    fig.add_trace(go.Scatter(x=buys['created_at'], y=buys['price'], mode='markers', name='LONG', marker=dict(symbol='triangle-up', size=12, color='cyan')))
-    fig.add_trace(go.Scatter(x=shorts['created_at'], y=shorts['price'], mode='markers', name='SHORT', marker=dict(symbol='triangle-down', size=12, color='magenta')))
-    fig.update_layout(template="plotly_dark", height=450)
+    hours = HISTORY_RANGES[history_label]
+    try:
+        charts = live_charts(df) if hours is None else load_history(hours, symbol)
+    except Exception as e:
+        st.error(f"Ajaloo laadimise viga: {e}")
+        charts = live_charts(df)
+    if hours is not None and charts['price']['downsampled']:
+        st.caption(f"{charts['price']['raw_points']} rida, näidatud {len(charts['price']['x'])} punkti")
+    fig, fig_pnl = build_figures(f"{symbol}:{history_label}:{latest['created_at']}", charts, symbol)
     st.plotly_chart(fig, use_container_width=True)
 
     st.subheader("Kasumi kõver (PNL %)")
-    fig_pnl = go.Figure(go.Scatter(x=df['created_at'], y=df['pnl'], fill='tozeroy', line=dict(color='#00d1ff')))
-    fig_pnl.update_layout(template="plotly_dark", height=250)
     st.plotly_chart(fig_pnl, use_container_width=True)
 
     with st.expander("Vaata detailseid tehingute logisid"):
@@ -124,5 +167,5 @@ if not df.empty:
 else:
     st.warning("Ootan andmeid...")
 
-time.sleep(60)
+time.sleep(REFRESH_SECONDS)
 st.rerun()
\ No newline at end of file
@@ -0,0 +1,122 @@
+"""Pikkade aegridade vähendamine graafikute jaoks.
+
+- LTTB (Largest-Triangle-Three-Buckets) valib joone jaoks punktid, mis
+  säilitavad kuju (tipud ja põhjad jäävad alles);
+- min/max ümbris näitab iga ämbri tegelikku vahemikku, nii et ka LTTB
+  vahele jäänud piigid on graafikul näha;
+- LONG/SHORT markerid (positsiooni avamised) ei lähe vähendamisse, need
+  tagastatakse täpselt.
+
+Kasutus:
+    chart = downsample(x_ms, price, width=1200, actions=action)
+    charts = load_chart(supabase, start_iso, end_iso, columns=['price', 'pnl'], width=1200)
+"""
+import numpy as np
+import pandas as pd
+
+from log_loader import load_arrays
+
+MAX_POINTS = 4000  # Rohkem punkte ei tagastata, olenemata laiusest
+MARKERS = ('LONG', 'SHORT')
+
+
+def lttb(x, y, n_out):
+    """Tagastab `n_out` punkti indeksid (esimene ja viimane alati kaasas)."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    every = (n - 2) / (n_out - 2)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        # Järgmise ämbri keskmine on kolmnurga kolmas tipp
+        nxt_end = min(int((i + 2) * every) + 1, n)
+        if end >= nxt_end:
+            avg_x, avg_y = x[-1], y[-1]
+        else:
+            avg_x, avg_y = x[end:nxt_end].mean(), y[end:nxt_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def minmax(x, y, buckets):
+    """Jagab (ajas sorditud) read `buckets` võrdseks ajavahemikuks.
+
+    Tagastab (ämbri esimese punkti x, min, max) ainult mittetühjade ämbrite kohta.
+    """
+    n = len(x)
+    if n == 0:
+        return x[:0], y[:0], y[:0]
+    xf = np.asarray(x, dtype=np.float64)
+    edges = np.linspace(xf[0], xf[-1], buckets + 1)[:-1]
+    starts = np.unique(np.searchsorted(xf, edges, side='left'))
+    starts = starts[starts < n]
+    return x[starts], np.fmin.reduceat(y, starts), np.fmax.reduceat(y, starts)
+
+
+def markers(x, y, actions):
+    """Positsiooni avamised: read, kus action muutub LONG-iks või SHORT-iks."""
+    actions = np.asarray(actions, dtype=object)
+    changed = np.ones(len(actions), dtype=bool)
+    changed[1:] = actions[1:] != actions[:-1]
+    return {a: {"x": x[changed & (actions == a)], "y": y[changed & (actions == a)]} for a in MARKERS}
+
+
+def downsample(x, y, width=1000, actions=None, max_points=MAX_POINTS):
+    """Vähendab rea umbes ühe punktini piksli kohta.
+
+    `x` peab olema kasvav (nt millisekundid või datetime64). NaN väärtused
+    jäetakse joonest välja. Tagastab dict'i joone, ümbrise ja markeritega.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float64)
+    n_out = int(max(3, min(width, max_points)))
+    valid = ~np.isnan(y)
+    xv, yv = x[valid], y[valid]
+    xf = xv.astype('datetime64[ms]').astype(np.int64) if np.issubdtype(xv.dtype, np.datetime64) else xv
+
+    idx = lttb(xf, yv, n_out)
+    result = {
+        "x": xv[idx],
+        "y": yv[idx],
+        "raw_points": int(len(y)),
+        "downsampled": bool(len(idx) < len(yv)),
+    }
+    if result["downsampled"]:
+        ex, lo, hi = minmax(xv, yv, n_out // 2)
+        result["envelope"] = {"x": ex, "min": lo, "max": hi}
+    if actions is not None:
+        result["markers"] = markers(xv, yv, np.asarray(actions, dtype=object)[valid])
+    return result
+
+
+def to_json(chart):
+    """NumPy massiivid listideks (datetime -> ms epohh), API vastuse jaoks."""
+    def conv(v):
+        if isinstance(v, dict):
+            return {k: conv(val) for k, val in v.items()}
+        if isinstance(v, np.ndarray):
+            if np.issubdtype(v.dtype, np.datetime64):
+                v = v.astype('datetime64[ms]').astype(np.int64)
+            return v.tolist()
+        return v
+    return conv(chart)
+
+
+def load_chart(client, start, end=None, columns=('price',), width=1000, symbol=None):
+    """trade_logs [start, end) -> {veerg: vähendatud graafik} (x on datetime64, UTC).
+
+    Read loetakse tükkidena ainult vajalike veergudega, kõik veerud ühe
+    päringuga. Tabelis on mitu sümbolit, hinnagraafik vajab `symbol`-it.
+    """
+    where = (lambda q: q.eq('symbol', symbol)) if symbol else None
+    data = load_arrays(client, list(columns) + ['action'], where=where, start=start, end=end)
+    x = pd.to_datetime(data['created_at'], format='ISO8601', utc=True).tz_localize(None).to_numpy()
+    return {c: downsample(x, data[c], width, actions=data['action']) for c in columns}
@@ -0,0 +1,250 @@
+"""Ühine tunnuste arvutus: backtester, sweep ja migrate_logs.
+
+Samad valemid on kahes kujus:
+    - inkrementaalne režiim: bot impordib `IndicatorEngine`-i otse
+      indicators.py-st ja uuendab seda iga küünla peale;
+    - partiirežiim: `compute(klines)` arvutab SPEC-i veerud tervete
+      massiividena (pandas ewm/rolling, NumPy), ilma reakaupa tsüklita, ja
+      tagastab veergudena DataFrame'i. Tulemus vastab mootorile
+      ujukomatäpsuse piires - seda kontrollib `verify_against_engine()`
+      (`python features.py`).
+
+Valemid on kirjeldatud `SPEC`-is ja iga muudatus peab tõstma `version`-it.
+Partiitulemused salvestatakse sisu järgi adresseeritud vahemällu: võti on
+SPEC räsi + sümbol/intervall/vahemik + küünalde baitide räsi, seega sama
+vahemiku korduv arvutus loeb valmis faili ja muutunud valemid ei loe vana.
+Backtesteri vahemikud on "viimased N tundi", seega tekib iga käivitusega uus
+fail: vahemälu hoitakse alla `CACHE_MAX_MB`, kõige kauem kasutamata failid
+kustutatakse (LRU, kasutusaeg on faili mtime).
+
+Kasutus:
+    df = compute_range(store, 'BTCUSDT', start_ms, end_ms)
+"""
+import os
+import json
+import hashlib
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from indicators import IndicatorEngine, EPS, DAY_MS
+
+logger = logging.getLogger(__name__)
+
+SPEC = {
+    "version": 1,
+    "rsi": {"length": 14, "smoothing": "rma"},
+    "macd": {"fast": 12, "slow": 26, "signal": 9},
+    "ema200": {"length": 200, "seed": "sma"},
+    "vwap": {"anchor": "D", "price": "hlc3"},
+    "stoch": {"k": 14, "d": 3, "smooth_k": 3},
+    "atr": {"length": 14, "smoothing": "rma"},
+    "bbands": {"length": 20, "std": 2, "ddof": 0},
+    # Küünla sulgemise asukoht vahemikus korda maht - nagu bot on alati logiinud
+    "market_pressure": "(close - low) / (high - low + 1e-7) * volume",
+}
+SPEC_HASH = hashlib.sha256(json.dumps(SPEC, sort_keys=True).encode()).hexdigest()[:12]
+
+FEATURES = ['price', 'rsi', 'macd', 'macd_signal', 'vwap', 'stoch_k', 'stoch_d', 'atr', 'ema200', 'market_pressure']
+KLINE_COLUMNS = ['time', 'open', 'high', 'low', 'close', 'volume']
+INDICATORS = ['rsi', 'macd', 'macd_signal', 'ema200', 'vwap', 'stoch_k', 'stoch_d', 'atr',
+              'market_pressure', 'bb_upper', 'bb_lower']
+COLUMNS = KLINE_COLUMNS + ['price'] + INDICATORS + ['is_panic_mode']
+
+CACHE_DIR = Path(os.getenv('FEATURE_CACHE_DIR', Path(__file__).parent / '.feature_cache'))
+CACHE_MAX_MB = float(os.getenv('FEATURE_CACHE_MB', 512))
+
+
+def _as_array(klines):
+    if isinstance(klines, pd.DataFrame):
+        return klines[KLINE_COLUMNS].to_numpy(dtype=np.float64)
+    arr = np.array([k[:6] for k in klines], dtype=np.float64)
+    return arr.reshape(-1, len(KLINE_COLUMNS))
+
+
+def _ema(x, length):
+    """pandas_ta ema: esimese `length` kehtiva väärtuse SMA on seeme, edasi adjust=False."""
+    out = np.full(len(x), np.nan)
+    valid = np.flatnonzero(~np.isnan(x))
+    if len(valid) < length:
+        return out
+    first = valid[0]
+    seeded = x.copy()
+    seeded[:first + length - 1] = np.nan
+    seeded[first + length - 1] = x[first:first + length].mean()
+    return pd.Series(seeded).ewm(span=length, adjust=False).mean().to_numpy()
+
+
+def _rma(x, length):
+    """pandas_ta rma: Wilderi silumine (ewm alpha=1/length, adjust=True)."""
+    return pd.Series(x).ewm(alpha=1.0 / length, min_periods=length, adjust=True).mean().to_numpy()
+
+
+def compute(klines):
+    """Partiirežiim: küünlad (n, 6) massiiv, KlineStore raam või Binance'i list -> DataFrame.
+
+    Indeks on küünla avamisaeg (DatetimeIndex, UTC).
+    """
+    arr = _as_array(klines)
+    df = pd.DataFrame(arr, columns=KLINE_COLUMNS)
+    high, low, close, vol = (df[c].to_numpy() for c in ('high', 'low', 'close', 'volume'))
+    prev = np.empty_like(close)
+    prev[:1] = np.nan
+    prev[1:] = close[:-1]
+
+    # RSI (Wilder), esimesel küünlal eelmist pole
+    diff = close - prev
+    up = _rma(np.maximum(diff, 0.0), 14)  # NaN jääb NaN-iks
+    down = _rma(np.minimum(diff, 0.0), 14)
+    denom = up + np.abs(down)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(denom != 0, 100.0 * up / denom, np.nan)
+
+    # MACD (12, 26, 9): signaal algab esimesest kehtivast MACD väärtusest
+    macd = _ema(close, 12) - _ema(close, 26)
+    macd_signal = _ema(macd, 9)
+
+    # VWAP, ankur "D" (UTC päev)
+    day = arr[:, 0].astype(np.int64) // DAY_MS
+    sums = pd.DataFrame({'pv': (high + low + close) / 3.0 * vol, 'v': vol}).groupby(day).cumsum()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vwap = np.where(sums['v'] != 0, sums['pv'] / sums['v'], np.nan)
+
+    # Stochastic (14, 3, 3)
+    hh = df['high'].rolling(14).max().to_numpy()
+    ll = df['low'].rolling(14).min().to_numpy()
+    rng = hh - ll
+    raw = 100.0 * (close - ll) / np.where(rng != 0, rng, EPS)
+    stoch_k = pd.Series(raw).rolling(3).mean().to_numpy()
+    stoch_d = pd.Series(stoch_k).rolling(3).mean().to_numpy()
+
+    # ATR (14, rma)
+    hl = high - low
+    tr = np.fmax(np.abs(np.where(hl != 0, hl, EPS)), np.fmax(np.abs(high - prev), np.abs(prev - low)))
+    tr[:1] = np.nan
+    atr = _rma(tr, 14)
+
+    # Bollinger (20, 2), populatsiooni std
+    window = df['close'].rolling(20)
+    mid, std = window.mean().to_numpy(), window.std(ddof=0).to_numpy()
+
+    df['price'] = df['close']
+    df['rsi'] = rsi
+    df['macd'] = macd
+    df['macd_signal'] = macd_signal
+    df['ema200'] = _ema(close, 200)
+    df['vwap'] = vwap
+    df['stoch_k'] = stoch_k
+    df['stoch_d'] = stoch_d
+    df['atr'] = atr
+    df['market_pressure'] = (close - low) / (high - low + 0.0000001) * vol
+    df['bb_upper'] = mid + 2.0 * std
+    df['bb_lower'] = mid - 2.0 * std
+    df['is_panic_mode'] = close < df['bb_lower'].to_numpy()
+    df.index = pd.to_datetime(df['time'], unit='ms')
+    return df[COLUMNS]
+
+
+def verify_against_engine(klines, tolerance=1e-9):
+    """Võrdleb partiitulemust `IndicatorEngine`-iga samal küünlajadal.
+
+    Tagastab {veerg: suurim suhteline erinevus}; tõstab AssertionError'i,
+    kui mõni ületab `tolerance` või NaN mustrid erinevad.
+    """
+    arr = _as_array(klines)
+    got = compute(arr)
+    engine = IndicatorEngine()
+    ref = pd.DataFrame([engine.update(k) for k in arr])
+    report = {}
+    for col in INDICATORS + ['is_panic_mode']:
+        a, b = got[col].to_numpy(float), ref[col].to_numpy(float)
+        assert np.array_equal(np.isnan(a), np.isnan(b)), f"{col}: NaN mustrid erinevad"
+        both = ~np.isnan(a)
+        rel = np.abs(a[both] - b[both]) / np.maximum(np.abs(b[both]), 1.0)
+        report[col] = float(rel.max()) if rel.size else 0.0
+        assert report[col] <= tolerance, f"{col}: erinevus {report[col]:.2e} > {tolerance}"
+    return report
+
+
+def cache_key(arr, symbol='', interval='1m'):
+    """Sisu põhine võti: SPEC räsi, sümbol, intervall, vahemik ja küünalde räsi."""
+    digest = hashlib.sha256(np.ascontiguousarray(arr).tobytes()).hexdigest()[:16]
+    first = int(arr[0, 0]) if len(arr) else 0
+    last = int(arr[-1, 0]) if len(arr) else 0
+    return f"{symbol or 'x'}_{interval}_{first}_{last}_{SPEC_HASH}_{digest}"
+
+
+def compute_cached(klines, symbol='', interval='1m', cache_dir=CACHE_DIR, max_mb=CACHE_MAX_MB):
+    """Nagu `compute`, aga tulemus loetakse/salvestatakse vahemälust."""
+    arr = _as_array(klines)
+    path = Path(cache_dir) / f"{cache_key(arr, symbol, interval)}.npy"
+    if path.exists():
+        data = np.load(path)
+        _touch(path)
+        df = pd.DataFrame(data, columns=COLUMNS)
+        df['is_panic_mode'] = df['is_panic_mode'].astype(bool)
+        df.index = pd.to_datetime(df['time'], unit='ms')
+        return df
+
+    df = compute(arr)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp.npy')
+        np.save(tmp, df[COLUMNS].to_numpy(dtype=np.float64))
+        os.replace(tmp, path)
+        evict(cache_dir, max_mb, keep=path)
+    except OSError as e:
+        logger.warning(f"⚠️ Tunnuste vahemällu kirjutamine ebaõnnestus: {e}")
+    return df
+
+
+def _touch(path):
+    """Märgib faili kasutatuks (LRU), ka siis kui failisüsteem atime'i ei uuenda."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def evict(cache_dir=CACHE_DIR, max_mb=CACHE_MAX_MB, keep=None):
+    """Kustutab kõige kauem kasutamata failid, kuni vahemälu on alla `max_mb`. Tagastab kustutatute arvu."""
+    files = []
+    for path in Path(cache_dir).glob('*.npy'):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue  # Teine protsess jõudis ette
+        files.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in files)
+    limit = max_mb * 1024 * 1024
+    removed = 0
+    for _, size, path in sorted(files, key=lambda f: f[0]):
+        if total <= limit:
+            break
+        if path == keep:
+            continue
+        path.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    if removed:
+        logger.info(f"🧹 Tunnuste vahemälust kustutati {removed} vana faili ({total / 1024 / 1024:.0f} MB alles)")
+    return removed
+
+
+def compute_range(store, symbol, start_ms, end_ms=None):
+    """KlineStore'i vahemik -> tunnused (vahemälust, kui olemas)."""
+    return compute_cached(store.load(symbol, start_ms, end_ms), symbol, store.interval)
+
+
+if __name__ == '__main__':
+    import time
+    from bench_fixtures import synthetic_klines
+
+    klines = synthetic_klines(20_000, seed=42)
+    for col, diff in verify_against_engine(klines).items():
+        print(f"{col:16s} max rel diff {diff:.2e}")
+    start = time.perf_counter()
+    compute(klines)
+    print(f"✅ Partiirežiim vastab mootorile ({len(klines)} küünalt, {time.perf_counter() - start:.3f}s)")
@@ -0,0 +1,333 @@
+"""Inkrementaalne indikaatorite mootor.
+
+Hoiab iga indikaatori jooksvat olekut (EMA akumulaatorid, Wilderi silumine,
+libisevad min/max deque'd ja summad) ning uuendab seda O(1) ajaga iga
+suletud küünla kohta. Valemid järgivad pandas_ta vaikeväärtusi, mida
+kasutab `bot.fetch_data`, seega sama küünlajada peal on tulemused
+pandas_ta-ga identsed (ujukomatäpsuse piires).
+
+Kasutus:
+    engine = IndicatorEngine()
+    engine.warmup(klines[:-1])          # suletud küünlad
+    row = engine.preview(klines[-1])    # pooleli küünal, olekut ei muuda
+    row = engine.update(kline)          # suletud küünal, olek uueneb
+
+Kontroll pandas_ta vastu:
+    python indicators.py
+"""
+import math
+from collections import deque
+
+NAN = float('nan')
+EPS = 2.220446049250313e-16  # sys.float_info.epsilon, nagu pandas_ta non_zero_range
+DAY_MS = 86_400_000
+
+
+class _Ema:
+    """pandas_ta ema: SMA-ga seemendatud, adjust=False."""
+
+    def __init__(self, length):
+        self.length = length
+        self.alpha = 2.0 / (length + 1)
+        self.state = (0, 0.0, NAN)  # (n, seemne summa, väärtus)
+
+    def _step(self, x):
+        n, seed, value = self.state
+        n += 1
+        if n < self.length:
+            return (n, seed + x, NAN), NAN
+        if n == self.length:
+            value = (seed + x) / self.length
+        else:
+            value = self.alpha * x + (1.0 - self.alpha) * value
+        return (n, seed, value), value
+
+    def push(self, x):
+        self.state, value = self._step(x)
+        return value
+
+    def peek(self, x):
+        return self._step(x)[1]
+
+
+class _Rma:
+    """pandas_ta rma: ewm(alpha=1/length, min_periods=length).mean(), adjust=True."""
+
+    def __init__(self, length):
+        self.length = length
+        self.decay = 1.0 - 1.0 / length
+        self.state = (0, 0.0, 0.0)  # (n, lugeja, nimetaja)
+
+    def _step(self, x):
+        n, num, den = self.state
+        n += 1
+        num = num * self.decay + x
+        den = den * self.decay + 1.0
+        return (n, num, den), (num / den if n >= self.length else NAN)
+
+    def push(self, x):
+        self.state, value = self._step(x)
+        return value
+
+    def peek(self, x):
+        return self._step(x)[1]
+
+
+class _Window:
+    """Fikseeritud pikkusega aken libiseva keskmise ja standardhälbe jaoks."""
+
+    def __init__(self, length):
+        self.length = length
+        self.values = deque(maxlen=length)
+        self.total = 0.0
+
+    def _mean(self, x):
+        """Akna keskmine, kui x lisatakse (NaN, kuni aken pole täis)."""
+        if len(self.values) < self.length - 1:
+            return NAN
+        drop = self.values[0] if len(self.values) == self.length else 0.0
+        return (self.total - drop + x) / self.length
+
+    def push(self, x):
+        mean = self._mean(x)
+        if len(self.values) == self.length:
+            self.total -= self.values[0]
+        self.values.append(x)
+        self.total += x
+        return mean
+
+    def peek(self, x):
+        return self._mean(x)
+
+    def std(self, x=None):
+        """Populatsiooni std (ddof=0). Kui x on antud, arvutab akna koos x-iga."""
+        if x is None:
+            window = self.values
+        else:
+            if len(self.values) < self.length - 1:
+                return NAN
+            window = list(self.values)[-(self.length - 1):] + [x]
+        if len(window) < self.length:
+            return NAN
+        mean = sum(window) / self.length
+        return math.sqrt(sum((v - mean) ** 2 for v in window) / self.length)
+
+
+class _Extremum:
+    """Libisev max (või min) monotoonse deque'ga, amortiseeritult O(1)."""
+
+    def __init__(self, length, is_max=True):
+        self.length = length
+        self.sign = 1.0 if is_max else -1.0
+        self.queue = deque()  # (indeks, märgiga väärtus), väärtused kahanevad
+        self.n = 0
+
+    def push(self, x):
+        v = self.sign * x
+        while self.queue and self.queue[-1][1] <= v:
+            self.queue.pop()
+        self.queue.append((self.n, v))
+        if self.queue[0][0] <= self.n - self.length:
+            self.queue.popleft()
+        self.n += 1
+        return self.sign * self.queue[0][1] if self.n >= self.length else NAN
+
+    def peek(self, x):
+        if self.n + 1 < self.length:
+            return NAN
+        best = self.sign * x
+        for idx, v in self.queue:
+            if idx > self.n - self.length:
+                best = max(best, v)
+                break
+        return self.sign * best
+
+
+class IndicatorEngine:
+    """Ühe sümboli indikaatorite olek. Iga `update` on O(1)."""
+
+    def __init__(self):
+        self.rsi_up = _Rma(14)
+        self.rsi_down = _Rma(14)
+        self.ema_fast = _Ema(12)
+        self.ema_slow = _Ema(26)
+        self.macd_signal = _Ema(9)
+        self.ema200 = _Ema(200)
+        self.atr = _Rma(14)
+        self.high_max = _Extremum(14, is_max=True)
+        self.low_min = _Extremum(14, is_max=False)
+        self.stoch_k = _Window(3)
+        self.stoch_d = _Window(3)
+        self.bbands = _Window(20)
+        self.prev_close = None
+        self.vwap_state = (None, 0.0, 0.0)  # (päev, sum(tp*vol), sum(vol))
+        self.last_ts = None
+        self.count = 0
+
+    # --- Avalik API ---
+
+    def update(self, kline):
+        """Lisab suletud küünla olekusse ja tagastab selle indikaatorid."""
+        row = self._compute(kline, commit=True)
+        self.count += 1
+        return row
+
+    def preview(self, kline):
+        """Arvutab indikaatorid (nt pooleli küünlale) olekut muutmata."""
+        return self._compute(kline, commit=False)
+
+    def warmup(self, klines):
+        """Söödab järjest läbi ajaloolised suletud küünlad."""
+        row = None
+        for kline in klines:
+            row = self.update(kline)
+        return row
+
+    # --- Sisemus ---
+
+    def _compute(self, kline, commit):
+        ts = int(kline[0])
+        open_, high, low, close, vol = (float(kline[i]) for i in range(1, 6))
+        step = (lambda ind, x: ind.push(x)) if commit else (lambda ind, x: ind.peek(x))
+
+        # RSI (Wilder)
+        rsi = NAN
+        if self.prev_close is not None:
+            diff = close - self.prev_close
+            up = step(self.rsi_up, max(diff, 0.0))
+            down = step(self.rsi_down, min(diff, 0.0))
+            if not math.isnan(up):
+                denom = up + abs(down)
+                rsi = 100.0 * up / denom if denom else NAN
+
+        # MACD (12, 26, 9)
+        fast = step(self.ema_fast, close)
+        slow = step(self.ema_slow, close)
+        macd = fast - slow
+        macd_signal = step(self.macd_signal, macd) if not math.isnan(macd) else NAN
+
+        ema200 = step(self.ema200, close)
+
+        # VWAP, ankur "D" (UTC päev)
+        day = ts // DAY_MS
+        vwap_day, pv, v = self.vwap_state
+        if day != vwap_day:
+            pv, v = 0.0, 0.0
+        pv += (high + low + close) / 3.0 * vol
+        v += vol
+        vwap = pv / v if v else NAN
+
+        # Stochastic (14, 3, 3)
+        hh = step(self.high_max, high)
+        ll = step(self.low_min, low)
+        stoch_k = stoch_d = NAN
+        if not math.isnan(hh):
+            rng = hh - ll
+            raw = 100.0 * (close - ll) / (rng if rng else EPS)
+            stoch_k = step(self.stoch_k, raw)
+            if not math.isnan(stoch_k):
+                stoch_d = step(self.stoch_d, stoch_k)
+
+        # ATR (14, rma)
+        atr = NAN
+        if self.prev_close is not None:
+            hl = high - low
+            tr = max(abs(hl if hl else EPS), abs(high - self.prev_close), abs(self.prev_close - low))
+            atr = step(self.atr, tr)
+
+        # Bollinger (20, 2)
+        mid = step(self.bbands, close)
+        std = self.bbands.std() if commit else self.bbands.std(close)
+        bb_upper = mid + 2.0 * std
+        bb_lower = mid - 2.0 * std
+
+        if commit:
+            self.prev_close = close
+            self.vwap_state = (day, pv, v)
+            self.last_ts = ts
+
+        return {
+            'ts': ts,
+            'open': open_,
+            'high': high,
+            'low': low,
+            'price': close,
+            'vol': vol,
+            'rsi': rsi,
+            'macd': macd,
+            'macd_signal': macd_signal,
+            'ema200': ema200,
+            'vwap': vwap,
+            'stoch_k': stoch_k,
+            'stoch_d': stoch_d,
+            'atr': atr,
+            'market_pressure': (close - low) / (high - low + 0.0000001) * vol,
+            'bb_upper': bb_upper,
+            'bb_lower': bb_lower,
+            'is_panic_mode': close < bb_lower,
+        }
+
+
+def fillna(row, value=0.0):
+    """Sama mis `df.iloc[-1].fillna(0)` - NaN väärtused asendatakse."""
+    return {k: (value if isinstance(v, float) and math.isnan(v) else v) for k, v in row.items()}
+
+
+def verify_against_pandas_ta(klines, tolerance=1e-6):
+    """Võrdleb mootori väljundit pandas_ta-ga samal küünlajadal.
+
+    Tagastab {veerg: suurim suhteline erinevus}; tõstab AssertionError'i,
+    kui mõni ületab `tolerance`.
+    """
+    import numpy as np
+    import pandas as pd
+    import pandas_ta as ta
+
+    df = pd.DataFrame([k[:6] for k in klines], columns=['ts', 'open', 'high', 'low', 'price', 'vol'])
+    df[['open', 'high', 'low', 'price', 'vol']] = df[['open', 'high', 'low', 'price', 'vol']].astype(float)
+    df['ts'] = pd.to_datetime(df['ts'], unit='ms')
+    df.set_index('ts', inplace=True)
+
+    ref = pd.DataFrame(index=df.index)
+    ref['rsi'] = ta.rsi(df['price'], length=14)
+    macd = ta.macd(df['price'])
+    ref['macd'] = macd.iloc[:, 0]
+    ref['macd_signal'] = macd.iloc[:, 2]
+    ref['ema200'] = ta.ema(df['price'], length=200)
+    ref['vwap'] = ta.vwap(df['high'], df['low'], df['price'], df['vol'])
+    stoch = ta.stoch(df['high'], df['low'], df['price'])
+    ref['stoch_k'] = stoch.iloc[:, 0]
+    ref['stoch_d'] = stoch.iloc[:, 1]
+    ref['atr'] = ta.atr(df['high'], df['low'], df['price'])
+    bbands = ta.bbands(df['price'], length=20, std=2)
+    ref['bb_upper'] = bbands.iloc[:, 2]
+    ref['bb_lower'] = bbands.iloc[:, 0]
+
+    engine = IndicatorEngine()
+    got = pd.DataFrame([engine.update(k) for k in klines], index=df.index)
+
+    report = {}
+    for col in ref.columns:
+        a, b = got[col].to_numpy(float), ref[col].to_numpy(float)
+        both = ~np.isnan(a) & ~np.isnan(b)
+        rel = np.abs(a[both] - b[both]) / np.maximum(np.abs(b[both]), 1.0)
+        report[col] = float(rel.max()) if rel.size else 0.0
+        assert np.array_equal(np.isnan(a), np.isnan(b)), f"{col}: NaN mustrid erinevad"
+        assert report[col] <= tolerance, f"{col}: erinevus {report[col]:.2e} > {tolerance}"
+    return report
+
+
+if __name__ == '__main__':
+    import random
+
+    # Sünteetiline juhuslik jalutuskäik üle kahe UTC päeva
+    random.seed(42)
+    price, klines = 60000.0, []
+    for i in range(3000):
+        o = price
+        price *= 1 + random.gauss(0, 0.001)
+        h, l = max(o, price) * (1 + random.random() * 0.0005), min(o, price) * (1 - random.random() * 0.0005)
+        klines.append([1_700_000_000_000 + i * 60_000, o, h, l, price, random.uniform(1, 50)])
+    for col, diff in verify_against_pandas_ta(klines).items():
+        print(f"{col:12s} max rel diff {diff:.2e}")
+    print("✅ Inkrementaalne mootor vastab pandas_ta-le")
@@ -0,0 +1,199 @@
+"""Kiire ennustaja trading_brain_xgb.pkl mudelile.
+
+Boti tick ennustab mõne rea (üks rida sümboli kohta). Seal ei domineeri
+puude läbimine, vaid XGBoosti kutse enda kulu: sklearn'i kontrollid,
+DMatrix või `inplace_predict`-i adapteri ehitus (~0.5 ms ka ühe rea
+peal). `Predictor` teisendab laadimisel puud NumPy massiivideks ja käib
+väikese partii puhul kõik puud korraga läbi (üks samm sügavuse kohta).
+Suured partiid (backtest, sweep) lähevad muutmata sklearn'i
+`predict_proba`-sse: seal jaotub kutse kulu ridade vahel ja oma tee ei
+andnud võitu (mõõtmisel isegi aeglasem).
+
+Väikese partii tulemus vastab `model.predict_proba`-le float32 täpsusega
+(puude lehtede summa järjekord erineb), suur partii on bit-bitilt sama -
+seda kontrollib `verify()` ja `python inference.py` käivitab ka latentsuse
+mõõtmise.
+
+Kasutus:
+    model = Predictor.load()       # None, kui faili pole
+    probs = model.predict_proba(X)
+"""
+import json
+import time
+import logging
+from pathlib import Path
+
+import numpy as np
+import joblib
+
+logger = logging.getLogger(__name__)
+
+MODEL_PATH = Path(__file__).parent / 'trading_brain_xgb.pkl'
+FEATURES = ['price', 'rsi', 'macd', 'macd_signal', 'vwap', 'stoch_k', 'stoch_d', 'atr', 'ema200', 'market_pressure']
+SMALL_BATCH = 16  # Kuni nii palju ridu ennustatakse NumPy puudega (suuremad sklearn'i predict_proba-ga)
+TOLERANCE = 1e-6  # verify(): lubatud erinevus sklearn'i tõenäosustest
+
+
+class Predictor:
+    """sklearn mudeli kiire ümbris, sama `predict_proba` liidesega."""
+
+    def __init__(self, model):
+        self.model = model
+        self.booster = model.get_booster() if hasattr(model, 'get_booster') else None
+        self.n_classes = int(getattr(model, 'n_classes_', 2))
+        try:
+            self.iteration_range = (0, model.best_iteration + 1)
+        except AttributeError:
+            self.iteration_range = (0, 0)
+        self.forest = None
+        if self.booster is not None:
+            try:
+                self.forest = Forest(self.booster, self.iteration_range)
+            except ValueError as e:
+                logger.info(f"ℹ️ NumPy puid ei kasuta ({e}), väikesed partiid lähevad boosterisse.")
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        """Laeb mudeli failist. Tagastab None, kui faili pole."""
+        path = Path(path)
+        if not path.exists():
+            return None
+        return cls(joblib.load(path))
+
+    def predict_proba(self, X):
+        """(n, klassid) tõenäosused, nagu `XGBClassifier.predict_proba`."""
+        if self.forest is not None and len(X) <= SMALL_BATCH:
+            return self.forest.predict_proba(np.asarray(X, dtype=np.float32))
+        return self.model.predict_proba(X)
+
+    def verify(self, X):
+        """Kontrollib, et tulemus vastab sklearn'i omale (`TOLERANCE`)."""
+        return np.allclose(self.predict_proba(X), self.model.predict_proba(X), rtol=0, atol=TOLERANCE)
+
+
+class Forest:
+    """Boosteri puud NumPy massiividena: kõik puud läbitakse korraga, üks samm sügavuse kohta.
+
+    Toetab `multi:softprob` ja `binary:logistic` mudeleid numbriliste
+    tunnustega; muu puhul tõstab ValueError-i.
+    """
+
+    def __init__(self, booster, iteration_range=(0, 0)):
+        learner = json.loads(booster.save_raw('json'))['learner']
+        objective = learner['objective']['name']
+        if objective not in ('multi:softprob', 'binary:logistic'):
+            raise ValueError(f"eesmärk {objective}")
+        model = learner['gradient_booster']['model']
+        if learner['gradient_booster']['name'] != 'gbtree':
+            raise ValueError(f"booster {learner['gradient_booster']['name']}")
+        trees, groups = model['trees'], model['tree_info']
+        begin, end = iteration_range
+        if end:
+            indptr = model['iteration_indptr']
+            trees, groups = trees[indptr[begin]:indptr[end]], groups[indptr[begin]:indptr[end]]
+        if any(t['categories_nodes'] for t in trees):
+            raise ValueError("kategoorilised tunnused")
+
+        self.softmax = objective == 'multi:softprob'
+        base = learner['learner_model_param']['base_score'].strip('[]').split(',')
+        self.base = np.array(base, dtype=np.float32)
+        if not self.softmax:
+            # binary:logistic hoiab base_score'i tõenäosusena
+            self.base = np.log(self.base / (1 - self.base)).astype(np.float32)
+        self.n_groups = int(learner['learner_model_param']['num_class']) or 1
+
+        # Kõik puud ühte massiivi; leht viitab iseendale, nii et lisasammud ei liiguta.
+        # Puud on klasside kaupa järjest, et lehtede summa oleks üks reduceat.
+        order = np.argsort(np.asarray(groups, dtype=np.intp), kind='stable')
+        trees = [trees[i] for i in order]
+        sizes = [len(t['left_children']) for t in trees]
+        offsets = np.cumsum([0] + sizes)
+        left = np.concatenate([np.array(t['left_children']) + o for t, o in zip(trees, offsets)])
+        right = np.concatenate([np.array(t['right_children']) + o for t, o in zip(trees, offsets)])
+        leaf = left < offsets[:-1].repeat(sizes)
+        nodes = np.arange(len(leaf))
+        left[leaf] = right[leaf] = nodes[leaf]
+        self.children = np.column_stack([left, right]).ravel()  # node * 2 + (paremale)
+        self.default_left = np.concatenate([np.array(t['default_left'], dtype=bool) for t in trees])
+        self.feature = np.concatenate([t['split_indices'] for t in trees]).astype(np.intp)
+        self.threshold = np.concatenate([t['split_conditions'] for t in trees]).astype(np.float32)
+        self.value = np.where(leaf, self.threshold, 0).astype(np.float64)
+        self.roots = offsets[:-1]
+        counts = np.bincount(np.asarray(groups, dtype=np.intp), minlength=self.n_groups)
+        self.group_start = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        self.depth = max(_depth(t) for t in trees) if trees else 0
+
+    def margin(self, X):
+        """Puude lehtede summa + base_score klassi kaupa, (n, grupid)."""
+        n, width = X.shape
+        flat = X.ravel()
+        row_start = (np.arange(n) * width)[:, None]
+        node = np.tile(self.roots, (n, 1))
+        for _ in range(self.depth):
+            x = flat[row_start + self.feature[node]]
+            # NaN: x < lävi on False, default_left pöörab suuna vasakule
+            right = ~(x < self.threshold[node]) ^ (np.isnan(x) & self.default_left[node])
+            node = self.children[node * 2 + right]
+        sums = np.add.reduceat(self.value[node], self.group_start, axis=1)
+        return (sums + self.base).astype(np.float32)
+
+    def predict_proba(self, X):
+        margin = self.margin(X)
+        if not self.softmax:
+            p = 1 / (1 + np.exp(-margin[:, 0]))
+            return np.column_stack([1 - p, p])
+        e = np.exp(margin - margin.max(axis=1, keepdims=True))
+        return e / e.sum(axis=1, keepdims=True)
+
+
+def _depth(tree):
+    left, right = tree['left_children'], tree['right_children']
+    depth, level = 0, [0]
+    while True:
+        level = [c for n in level if left[n] != -1 for c in (left[n], right[n])]
+        if not level:
+            return depth
+        depth += 1
+
+
+def sample_features(n, seed=0, missing=0.05):
+    """Juhuslikud, BTC hinnaga sarnased tunnuste read (osa NaN-idega) testimiseks."""
+    rng = np.random.default_rng(seed)
+    scale = np.array([1000, 20, 50, 50, 1000, 30, 30, 50, 1000, 0.01])
+    center = np.array([60000, 50, 0, 0, 60000, 50, 50, 100, 60000, 0])
+    X = rng.normal(size=(n, len(FEATURES))) * scale + center
+    X[rng.random(X.shape) < missing] = np.nan
+    return X
+
+
+def benchmark(predictor, repeat=2000, batch=100_000):
+    """Latentsus: üks rida (µs) ja suur partii (ms), sklearn vs Predictor."""
+    def timed(f, n):
+        f()
+        start = time.perf_counter()
+        for _ in range(n):
+            f()
+        return (time.perf_counter() - start) / n
+
+    row, X = sample_features(1, seed=1), sample_features(batch, seed=2)
+    return {
+        "row_sklearn_us": timed(lambda: predictor.model.predict_proba(row), repeat) * 1e6,
+        "row_predictor_us": timed(lambda: predictor.predict_proba(row), repeat) * 1e6,
+        "batch_sklearn_ms": timed(lambda: predictor.model.predict_proba(X), 3) * 1e3,
+        "batch_predictor_ms": timed(lambda: predictor.predict_proba(X), 3) * 1e3,
+    }
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - [inference] %(message)s')
+    predictor = Predictor.load()
+    if predictor is None:
+        print(f"Mudelit ei leitud: {MODEL_PATH}")
+        raise SystemExit(1)
+
+    for n in (1, SMALL_BATCH, 50_000):
+        ok = predictor.verify(sample_features(n, seed=n))
+        print(f"{'✅' if ok else '❌'} {n} rida: {'sama' if ok else 'ERINEB'}")
+
+    for name, value in benchmark(predictor).items():
+        print(f"{name:>20}: {value:10.1f}")
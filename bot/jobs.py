@@ -0,0 +1,197 @@
+"""Taustatööde järjekord (backtest, treenimine) soojade tööprotsessidega.
+
+Tööprotsessid käivitatakse üks kord: initsialiseerija impordib pandas'e,
+binance'i ja backtesteri (mis laadib ka mudeli), seega iga töö algab kohe,
+mitte uue Pythoni protsessi külmkäivitusega. Progress ja tühistamise lipp
+liiguvad jagatud `Manager().dict()` kaudu.
+
+Kasutus (api.py):
+    queue = JobQueue(max_workers=2)
+    job_id = queue.submit("backtest", {"hours": 500})
+    queue.status(job_id)
+"""
+import os
+import time
+import uuid
+import logging
+import threading
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+BOT_DIR = Path(__file__).parent
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+MAX_PENDING = int(os.getenv('JOB_MAX_PENDING', 20))
+JOB_TTL = 3600  # Lõpetatud tööde säilitusaeg (s)
+
+_progress = None   # tööprotsessis: jagatud dict {job_id: {"progress", "message"}}
+_cancelled = None  # tööprotsessis: jagatud dict {job_id: True}
+_model_mtime = None
+
+
+class JobCancelled(BaseException):
+    # BaseException, et skriptide `except Exception` seda alla ei neelaks
+    pass
+
+
+class QueueFull(Exception):
+    pass
+
+
+# --- Tööprotsessi pool ---
+
+def _init_worker(progress, cancelled):
+    """Soojendab tööprotsessi: impordid ja mudel laaditakse üks kord."""
+    global _progress, _cancelled
+    _progress, _cancelled = progress, cancelled
+    os.chdir(BOT_DIR)
+    try:
+        import backtester  # noqa: F401 - laadib pandas_ta, binance kliendi ja mudeli
+        _refresh_model(backtester)
+    except Exception as e:
+        logger.warning(f"⚠️ Tööprotsessi soojendus ebaõnnestus: {e}")
+
+
+def _refresh_model(backtester):
+    """Laeb mudeli uuesti, kui treenimine on faili vahepeal üle kirjutanud."""
+    global _model_mtime
+    if not backtester.MODEL_PATH.exists():
+        return
+    mtime = backtester.MODEL_PATH.stat().st_mtime
+    if _model_mtime is not None and mtime != _model_mtime:
+        from inference import Predictor
+        backtester.model = Predictor.load(backtester.MODEL_PATH)
+    _model_mtime = mtime
+
+
+def _reporter(job_id):
+    """Tagastab progress(fraction, message) funktsiooni, mis kontrollib ka tühistamist."""
+    def report(fraction, message=""):
+        if _cancelled.get(job_id):
+            raise JobCancelled(job_id)
+        _progress[job_id] = {"progress": round(float(fraction), 3), "message": message}
+    return report
+
+
+def _run_backtest(job_id, params):
+    import backtester
+    _refresh_model(backtester)
+    report = _reporter(job_id)
+    report(0.0, "alustan")
+    return backtester.run_backtest(int(params.get("hours", 500)), progress=report)
+
+
+def _run_train(job_id, params):
+    try:
+        import brain
+    except SystemExit:
+        # brain.py kutsub puuduvate seadete korral exit()
+        raise RuntimeError("brain.py ei käivitunud (kontrolli SUPABASE_URL/SUPABASE_KEY)")
+    report = _reporter(job_id)
+    report(0.0, "treenin")
+    run = brain.train_brain(params.get("mode"))
+    report(1.0, "valmis")
+    return {"status": "completed", "run": run}
+
+
+TASKS = {"backtest": _run_backtest, "train": _run_train}
+
+
+# --- API poolne järjekord ---
+
+class JobQueue:
+    """Piiratud arvu soojade tööprotsessidega tööjärjekord."""
+
+    def __init__(self, max_workers=JOB_WORKERS, max_pending=MAX_PENDING):
+        ctx = multiprocessing.get_context("spawn")
+        self._manager = ctx.Manager()
+        self.progress = self._manager.dict()
+        self.cancelled = self._manager.dict()
+        self.max_pending = max_pending
+        self.executor = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=ctx,
+            initializer=_init_worker, initargs=(self.progress, self.cancelled)
+        )
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, params=None):
+        if kind not in TASKS:
+            raise ValueError(f"Tundmatu töö tüüp: {kind}")
+        with self._lock:
+            self._prune()
+            active = sum(1 for j in self.jobs.values() if not j["future"].done())
+            if active >= self.max_pending:
+                raise QueueFull(f"Järjekord on täis ({active} tööd)")
+            job_id = uuid.uuid4().hex[:12]
+            self.progress[job_id] = {"progress": 0.0, "message": "järjekorras"}
+            future = self.executor.submit(TASKS[kind], job_id, params or {})
+            self.jobs[job_id] = {
+                "id": job_id, "type": kind, "params": params or {},
+                "submitted_at": time.time(), "finished_at": None, "future": future,
+            }
+            future.add_done_callback(lambda f, j=job_id: self._finished(j))
+        logger.info(f"📥 Töö {job_id} ({kind}) järjekorras")
+        return job_id
+
+    def status(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        future = job["future"]
+        state = dict(self.progress.get(job_id, {}))
+        if future.cancelled():
+            status = "cancelled"
+        elif future.done():
+            exc = future.exception()
+            status = "cancelled" if isinstance(exc, JobCancelled) else ("failed" if exc else "completed")
+        elif future.running():
+            status = "cancelling" if self.cancelled.get(job_id) else "running"
+        else:
+            status = "queued"
+        result = {
+            "id": job_id, "type": job["type"], "params": job["params"], "status": status,
+            "progress": state.get("progress", 0.0), "message": state.get("message", ""),
+            "submitted_at": job["submitted_at"], "finished_at": job["finished_at"],
+        }
+        if status == "failed":
+            result["error"] = str(future.exception())
+        return result
+
+    def result(self, job_id, timeout=None):
+        """Töö tulemus; `timeout` korral ootab kuni nii kaua."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        return job["future"].result(timeout=timeout)
+
+    def cancel(self, job_id):
+        """Järjekorras töö tühistatakse kohe, jooksev töö järgmisel progressi sammul."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return False
+        if job["future"].cancel():
+            return True
+        if not job["future"].done():
+            self.cancelled[job_id] = True
+            return True
+        return False
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self._manager.shutdown()
+
+    def _finished(self, job_id):
+        job = self.jobs.get(job_id)
+        if job:
+            job["finished_at"] = time.time()
+
+    def _prune(self):
+        cutoff = time.time() - JOB_TTL
+        for job_id in [j for j, job in self.jobs.items() if job["finished_at"] and job["finished_at"] < cutoff]:
+            self.jobs.pop(job_id, None)
+            self.progress.pop(job_id, None)
+            self.cancelled.pop(job_id, None)
+
@@ -0,0 +1,166 @@
+"""Kohalik küünalde hoidla (memory-mapped NumPy), jagatud sümboli ja päeva kaupa.
+
+Struktuur kettal:
+    <root>/<SYMBOL>/<interval>/<YYYY-MM-DD>.npy    float64 (n, 6): time, open, high, low, close, volume
+    <root>/<SYMBOL>/<interval>/<YYYY-MM-DD>.json   kaetud vahemik {"from": ms, "to": ms}
+
+Päringul laaditakse päevafailid `mmap_mode='r'`-iga ja Binance'ist
+tõmmatakse ainult kaetud vahemikust puuduvad osad. Korduv backtest sama
+perioodi peale võrku ei puutu.
+
+Kasutus:
+    store = KlineStore(client)
+    df = store.load_frame('BTCUSDT', start_ms, end_ms)
+"""
+import os
+import json
+import time
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(os.getenv('KLINE_CACHE_DIR', Path(__file__).parent / '.kline_cache'))
+COLUMNS = ['time', 'open', 'high', 'low', 'close', 'volume']
+INTERVAL_MS = {'1m': 60_000, '3m': 180_000, '5m': 300_000, '15m': 900_000, '1h': 3_600_000}
+DAY_MS = 86_400_000
+
+
+def hours_ago_ms(hours):
+    """Sama mis Binance "N hours ago UTC", millisekundites."""
+    return int((time.time() - hours * 3600) * 1000)
+
+
+class KlineStore:
+    """Päevade kaupa partitsioneeritud küünlavahemälu ühe intervalli jaoks."""
+
+    def __init__(self, client, root=CACHE_DIR, interval='1m'):
+        self.client = client
+        self.root = Path(root)
+        self.interval = interval
+        self.step = INTERVAL_MS[interval]
+        self.stats = {"fetches": 0, "fetched_rows": 0}
+
+    # --- Avalik API ---
+
+    def load(self, symbol, start_ms, end_ms=None, fetch=True):
+        """Tagastab (n, 6) massiivi küünaldest, mille avamisaeg on [start, end).
+
+        Ühe päeva piires on tulemus mmap-i vaade (ilma koopiata).
+        """
+        start_ms, end_ms = self._clip(start_ms, end_ms)
+        if fetch:
+            self.top_up(symbol, start_ms, end_ms)
+        parts = []
+        for day in self._days(start_ms, end_ms):
+            arr = self._read(symbol, day)
+            if arr is None or not len(arr):
+                continue
+            times = arr[:, 0]
+            lo, hi = np.searchsorted(times, [start_ms, end_ms])
+            if hi > lo:
+                parts.append(arr[lo:hi])
+        if not parts:
+            return np.empty((0, len(COLUMNS)), dtype=np.float64)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def load_frame(self, symbol, start_ms, end_ms=None, fetch=True):
+        """Nagu `load`, aga DataFrame'ina (üks float64 plokk, copy=False)."""
+        return pd.DataFrame(self.load(symbol, start_ms, end_ms, fetch), columns=COLUMNS, copy=False)
+
+    def missing_ranges(self, symbol, start_ms, end_ms=None):
+        """Tagastab ühendatud [(algus, lõpp)] vahemikud, mida hoidlas pole."""
+        start_ms, end_ms = self._clip(start_ms, end_ms)
+        ranges = []
+        for day in self._days(start_ms, end_ms):
+            d0 = day * DAY_MS
+            qs, qe = max(start_ms, d0), min(end_ms, d0 + DAY_MS)
+            cov = self._coverage(symbol, day)
+            if cov is None:
+                gaps = [(qs, qe)]
+            else:
+                # Katvus peab jääma katkematuks, seega täidame ka vahepealse osa
+                gaps = []
+                if qs < cov['from']:
+                    gaps.append((qs, cov['from']))
+                if qe > cov['to']:
+                    gaps.append((cov['to'], qe))
+            for gs, ge in gaps:
+                if ranges and ranges[-1][1] == gs:
+                    ranges[-1] = (ranges[-1][0], ge)
+                else:
+                    ranges.append((gs, ge))
+        return [(s, e) for s, e in ranges if e > s]
+
+    def top_up(self, symbol, start_ms, end_ms=None):
+        """Tõmbab Binance'ist ainult puuduvad vahemikud ja salvestab need."""
+        for gs, ge in self.missing_ranges(symbol, start_ms, end_ms):
+            logger.info(f"📥 Küünlad puudu: {symbol} {_fmt(gs)} - {_fmt(ge)}, tõmban")
+            klines = self.client.get_historical_klines(symbol, self.interval, gs, ge - 1)
+            self.stats["fetches"] += 1
+            self.stats["fetched_rows"] += len(klines)
+            arr = np.array([k[:6] for k in klines], dtype=np.float64).reshape(-1, len(COLUMNS))
+            self._write_range(symbol, arr, gs, ge)
+
+    # --- Sisemus ---
+
+    def _clip(self, start_ms, end_ms):
+        # Ainult suletud küünlad: praegu pooleli olev küünal jääb välja
+        last_open = int(time.time() * 1000) // self.step * self.step
+        end_ms = last_open if end_ms is None else min(int(end_ms), last_open)
+        start_ms = int(start_ms) // self.step * self.step
+        return start_ms, max(start_ms, end_ms)
+
+    def _days(self, start_ms, end_ms):
+        if end_ms <= start_ms:
+            return range(0)
+        return range(start_ms // DAY_MS, (end_ms - 1) // DAY_MS + 1)
+
+    def _path(self, symbol, day):
+        name = datetime.fromtimestamp(day * DAY_MS / 1000, tz=timezone.utc).strftime('%Y-%m-%d')
+        return self.root / symbol / self.interval / name
+
+    def _read(self, symbol, day):
+        path = self._path(symbol, day).with_suffix('.npy')
+        return np.load(path, mmap_mode='r') if path.exists() else None
+
+    def _coverage(self, symbol, day):
+        path = self._path(symbol, day).with_suffix('.json')
+        return json.loads(path.read_text()) if path.exists() else None
+
+    def _write_range(self, symbol, arr, start_ms, end_ms):
+        """Ühendab uued read päevafailidega ja laiendab katvust (atomaarne asendus)."""
+        for day in self._days(start_ms, end_ms):
+            d0 = day * DAY_MS
+            qs, qe = max(start_ms, d0), min(end_ms, d0 + DAY_MS)
+            new = arr[(arr[:, 0] >= qs) & (arr[:, 0] < qe)]
+            old = self._read(symbol, day)
+            if old is not None and len(old):
+                merged = np.concatenate([np.asarray(old), new])
+                _, idx = np.unique(merged[:, 0], return_index=True)
+                merged = merged[idx]
+            else:
+                merged = new
+
+            cov = self._coverage(symbol, day)
+            cov = {"from": qs, "to": qe} if cov is None else \
+                {"from": min(cov['from'], qs), "to": max(cov['to'], qe)}
+
+            base = self._path(symbol, day)
+            base.parent.mkdir(parents=True, exist_ok=True)
+            # Ajutised failid protsessi kaupa: tööprotsessid ja laadijad võivad sama päeva korraga kirjutada.
+            # Katvus kirjutatakse pärast andmeid, et lugeja ei näeks kunagi katvust ilma küünaldeta.
+            tmp = base.with_suffix(f'.{os.getpid()}.tmp.npy')
+            np.save(tmp, merged)
+            os.replace(tmp, base.with_suffix('.npy'))
+            tmp = base.with_suffix(f'.{os.getpid()}.tmp.json')
+            tmp.write_text(json.dumps(cov))
+            os.replace(tmp, base.with_suffix('.json'))
+
+
+def _fmt(ms):
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d %H:%M')
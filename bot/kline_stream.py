@@ -0,0 +1,244 @@
+"""Küünalde voogedastus Binance WebSocketist koos REST varuvariandiga.
+
+`KlineStream` kuulab `<symbol>@kline_<interval>` voogu, hoiab kohalikku
+`CandleBuffer`-it ja kutsub `on_close(kline)` iga suletud küünla peale.
+Kui voos tekib auk, tõmmatakse REST-ist ainult puuduvad küünlad. Kui
+WebSocket ei ole kättesaadav, küsitakse REST-ist kuni ühendus taastub.
+
+Küünlad liiguvad alati REST `get_klines` formaadis (list), et
+`IndicatorEngine` saaks neid otse kasutada.
+
+Kohalik test võltsserveri vastu:
+    python kline_stream.py --fake
+"""
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+
+from websockets.sync.client import connect
+
+logger = logging.getLogger(__name__)
+
+WS_URL = os.getenv('BINANCE_WS_URL', 'wss://stream.binance.com:9443/ws')
+INTERVAL_MS = {'1m': 60_000, '3m': 180_000, '5m': 300_000, '15m': 900_000, '1h': 3_600_000}
+
+
+def kline_from_stream(k):
+    """Teisendab voo `k` objekti REST kline listiks."""
+    return [int(k['t']), k['o'], k['h'], k['l'], k['c'], k['v'], int(k['T']),
+            k.get('q', '0'), int(k.get('n', 0)), k.get('V', '0'), k.get('Q', '0'), '0']
+
+
+def kline_to_stream(kline, symbol, closed=True):
+    """REST kline -> voo sõnum (kasutab võltsserver)."""
+    return {
+        'e': 'kline', 'E': int(kline[6]), 's': symbol,
+        'k': {'t': int(kline[0]), 'T': int(kline[6]), 's': symbol, 'i': '1m',
+              'o': str(kline[1]), 'h': str(kline[2]), 'l': str(kline[3]), 'c': str(kline[4]),
+              'v': str(kline[5]), 'n': 0, 'x': closed, 'q': '0', 'V': '0', 'Q': '0'},
+    }
+
+
+class CandleBuffer:
+    """Suletud küünalde ringpuhver koos augu tuvastamisega."""
+
+    def __init__(self, maxlen=300, interval_ms=60_000):
+        self.klines = deque(maxlen=maxlen)
+        self.interval_ms = interval_ms
+        self.last_ts = None
+
+    def gap_before(self, ts):
+        """Tagastab (algus, lõpp) ms vahemiku puuduvatest küünaldest või None."""
+        if self.last_ts is None or ts <= self.last_ts + self.interval_ms:
+            return None
+        return self.last_ts + self.interval_ms, ts - 1
+
+    def add(self, kline):
+        """Lisab küünla, kui see on uuem kui viimane. Tagastab True, kui lisati."""
+        ts = int(kline[0])
+        if self.last_ts is not None and ts <= self.last_ts:
+            return False
+        self.klines.append(kline)
+        self.last_ts = ts
+        return True
+
+
+class KlineStream:
+    """Ühe sümboli küünlavoog, mis kutsub `on_close` iga suletud küünla peale."""
+
+    def __init__(self, symbol, on_close, rest_client, interval='1m', buffer=None,
+                 url=None, poll_seconds=5, max_backoff=60):
+        self.symbol = symbol
+        self.interval = interval
+        self.on_close = on_close
+        self.rest = rest_client
+        self.buffer = buffer or CandleBuffer(interval_ms=INTERVAL_MS[interval])
+        self.url = url or f"{WS_URL}/{symbol.lower()}@kline_{interval}"
+        self.poll_seconds = poll_seconds
+        self.max_backoff = max_backoff
+        self.stats = {"ws_candles": 0, "rest_candles": 0, "gaps": 0, "reconnects": 0}
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- Elutsükkel ---
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name=f"kline-{self.symbol}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def run(self):
+        """Blokeeriv põhitsükkel: WebSocket, vea korral REST küsitlus ja uus katse."""
+        backoff = 1
+        while not self._stop.is_set():
+            try:
+                self._consume()
+                backoff = 1
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                self.stats["reconnects"] += 1
+                logger.warning(f"⚠️ Küünlavoog katkes ({e}), REST küsitlus {backoff}s")
+                deadline = time.time() + backoff
+                while time.time() < deadline and not self._stop.is_set():
+                    self._poll_rest()
+                    self._stop.wait(min(self.poll_seconds, backoff))
+                backoff = min(backoff * 2, self.max_backoff)
+
+    # --- Sisemus ---
+
+    def _consume(self):
+        with connect(self.url, open_timeout=10, close_timeout=1) as ws:
+            # Katkestuse ajal puudu jäänud küünlad täidab esimene sõnum augu tuvastusega
+            logger.info(f"🔌 Küünlavoog ühendatud: {self.url}")
+            while not self._stop.is_set():
+                try:
+                    raw = ws.recv(timeout=1)
+                except TimeoutError:
+                    continue
+                msg = json.loads(raw)
+                msg = msg.get('data', msg)  # kombineeritud voo ümbris
+                k = msg.get('k')
+                if k and k.get('x'):
+                    self._deliver(kline_from_stream(k), source="ws")
+
+    def _deliver(self, kline, source):
+        gap = self.buffer.gap_before(int(kline[0]))
+        if gap:
+            self.stats["gaps"] += 1
+            self._backfill(*gap)
+        if self.buffer.add(kline):
+            self.stats[f"{source}_candles"] += 1
+            self.on_close(kline)
+
+    def _backfill(self, start_ms, end_ms):
+        logger.info(f"🩹 Täidan küünalde augu REST-ist: {start_ms} - {end_ms}")
+        klines = self.rest.get_klines(symbol=self.symbol, interval=self.interval,
+                                      startTime=start_ms, endTime=end_ms, limit=1000)
+        for k in klines:
+            if self.buffer.add(k):
+                self.stats["rest_candles"] += 1
+                self.on_close(k)
+
+    def _poll_rest(self):
+        """Tõmbab REST-ist kõik suletud küünlad alates viimasest teadaolevast."""
+        try:
+            kwargs = {"limit": 1000}
+            if self.buffer.last_ts is not None:
+                kwargs["startTime"] = self.buffer.last_ts + self.buffer.interval_ms
+            klines = self.rest.get_klines(symbol=self.symbol, interval=self.interval, **kwargs)
+        except Exception as e:
+            logger.error(f"❌ REST küsitluse viga: {e}")
+            return
+        now_ms = int(time.time() * 1000)
+        for k in klines:
+            if int(k[6]) < now_ms and self.buffer.add(k):
+                self.stats["rest_candles"] += 1
+                self.on_close(k)
+
+
+# --- Testimiseks: kohalik võltsserver ja REST ---
+
+class FakeRestClient:
+    """Mälus olev `get_klines`, mis serveerib etteantud küünlaid."""
+
+    def __init__(self, klines):
+        self.klines = klines
+        self.calls = 0
+
+    def get_klines(self, symbol=None, interval=None, startTime=None, endTime=None, limit=500):
+        self.calls += 1
+        rows = [k for k in self.klines
+                if (startTime is None or k[0] >= startTime) and (endTime is None or k[0] <= endTime)]
+        return rows[:limit] if startTime is not None else rows[-limit:]
+
+
+class FakeKlineServer:
+    """Kohalik WebSocket server, mis saadab küünlad voo formaadis.
+
+    `drop` indeksitega küünlad jäetakse saatmata, et simuleerida auke.
+    """
+
+    def __init__(self, klines, symbol='BTCUSDT', drop=(), delay=0.0, host='127.0.0.1', port=0):
+        from websockets.sync.server import serve
+
+        self.klines = klines
+        self.symbol = symbol
+        self.drop = set(drop)
+        self.delay = delay
+        self._server = serve(self._handler, host, port)
+        self.url = f"ws://{host}:{self._server.socket.getsockname()[1]}/ws"
+
+    def _handler(self, ws):
+        for i, k in enumerate(self.klines):
+            if i in self.drop:
+                continue
+            ws.send(json.dumps(kline_to_stream(k, self.symbol)))
+            if self.delay:
+                time.sleep(self.delay)
+        # Hoiame ühendust lahti, nagu päris voog
+        try:
+            ws.recv()
+        except Exception:
+            pass
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+
+
+if __name__ == '__main__':
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - [stream] %(message)s')
+    if '--fake' not in sys.argv:
+        print("Kasutus: python kline_stream.py --fake")
+        sys.exit(0)
+
+    base = 1_700_000_000_000
+    klines = [[base + i * 60_000, '100', '101', '99', '100.5', '10', base + i * 60_000 + 59_999,
+               '0', 0, '0', '0', '0'] for i in range(200)]
+    server = FakeKlineServer(klines, drop={50, 51, 52, 120}).start()
+    rest = FakeRestClient(klines)
+    received = []
+    stream = KlineStream('BTCUSDT', received.append, rest, url=f"{server.url}/btcusdt@kline_1m")
+    stream.buffer.add(klines[0])
+    stream.start()
+    deadline = time.time() + 10
+    while len(received) < len(klines) - 1 and time.time() < deadline:
+        time.sleep(0.05)
+    stream.stop()
+    server.stop()
+    ok = [k[0] for k in received] == [k[0] for k in klines[1:]]
+    print(f"{'✅' if ok else '❌'} Saadud {len(received)} küünalt, statistika: {stream.stats}")
@@ -0,0 +1,129 @@
+"""Protsessi ülene trade_logs aken dashboardi jaoks.
+
+Esimesel korral loetakse viimased `window` rida, edaspidi ainult read alates
+viimasest nähtud created_at-ist miinus `LATE_WINDOW` (kuid mitte aknast
+vanemad). Nii jõuavad kohale ka read, mille log_writer hiljem žurnaalist sisse
+mängis (vanema created_at-iga); juba nähtud read eemaldatakse id järgi.
+Statistika (win rate, parim ja halvim PnL) uueneb ainult lisandunud ja aknast
+välja kukkunud ridade põhjal; hilise rea korral arvutatakse see akna peal
+uuesti. `symbol` piirab akna ühe sümboliga (tabelis on mitu). `refresh` on
+lõimekindel ja teeb `min_interval` jooksul ainult ühe päringu, seega
+andmebaasi koormus ei sõltu avatud vaadete arvust.
+"""
+import os
+import time
+import threading
+from collections import deque
+
+import pandas as pd
+
+from log_loader import load_frame
+
+LATE_WINDOW = pd.Timedelta(minutes=float(os.getenv('LOG_CACHE_LATE_MINUTES', 60)))
+
+
+class RunningStats:
+    """Dashboardi statistika libiseva akna peal: lisamine ja eemaldamine on O(1) amortiseeritult."""
+
+    def __init__(self):
+        self.rows = 0
+        self.trades = 0  # read, kus pnl != 0
+        self.wins = 0
+        self.added = 0    # mitu rida kokku lisatud (indeks max/min deque'dele)
+        self.removed = 0
+        self.max_q = deque()  # (indeks, pnl), kahanev
+        self.min_q = deque()  # (indeks, pnl), kasvav
+
+    def add(self, pnl):
+        for p in pnl:
+            self.rows += 1
+            self.trades += p != 0
+            self.wins += p > 0
+            if p == p:  # NaN jääb max/min-ist välja nagu pandas'es
+                while self.max_q and self.max_q[-1][1] <= p:
+                    self.max_q.pop()
+                self.max_q.append((self.added, p))
+                while self.min_q and self.min_q[-1][1] >= p:
+                    self.min_q.pop()
+                self.min_q.append((self.added, p))
+            self.added += 1
+
+    def remove(self, pnl):
+        """Eemaldab akna algusest need read (samas järjekorras, nagu lisati)."""
+        for p in pnl:
+            self.rows -= 1
+            self.trades -= p != 0
+            self.wins -= p > 0
+            self.removed += 1
+        for q in (self.max_q, self.min_q):
+            while q and q[0][0] < self.removed:
+                q.popleft()
+
+    def summary(self):
+        """(win_rate, max_profit, max_loss): võidud pnl != 0 ridadest, max/min kõigist."""
+        if not self.rows or not self.trades:
+            return 0, 0, 0
+        max_p = self.max_q[0][1] if self.max_q else float('nan')
+        max_l = self.min_q[0][1] if self.min_q else float('nan')
+        return float(self.wins / self.trades * 100), float(max_p), float(max_l)
+
+
+class LogCache:
+    """Viimased `window` rida trade_logs'ist koos jooksva statistikaga."""
+
+    def __init__(self, client, columns, window=300, min_interval=5.0, symbol=None):
+        self.client = client
+        self.columns = list(dict.fromkeys(['created_at', 'pnl'] + list(columns)))
+        self.window = window
+        self.min_interval = min_interval
+        self.symbol = symbol
+        self.df = None
+        self.ids = set()
+        self.stats = RunningStats()
+        self.refreshed_at = 0.0
+        self.queries = 0
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Tõmbab ainult uued read. Tagastab (df koopia, (win_rate, max_profit, max_loss))."""
+        with self._lock:
+            if time.time() - self.refreshed_at >= self.min_interval:
+                where = (lambda q: q.eq('symbol', self.symbol)) if self.symbol else None
+                if self.df is None:
+                    new = load_frame(self.client, self.columns, where=where, desc=True, limit=self.window).iloc[::-1]
+                else:
+                    new = load_frame(self.client, self.columns, where=where, start=self._start())
+                self.queries += 1
+                self._append(new)
+                self.refreshed_at = time.time()
+            return self.df.copy(), self.stats.summary()
+
+    def _start(self):
+        """Hilise akna algus: viimane created_at miinus LATE_WINDOW, aga mitte aknast vanem."""
+        if self.df.empty:
+            return None
+        created = self.df['created_at']
+        return max(created.iloc[-1] - LATE_WINDOW, created.iloc[0]).isoformat()
+
+    def _append(self, new):
+        new = new.reset_index(drop=True)
+        if len(new):
+            new = new[~new['id'].isin(self.ids)]
+            new = new.assign(created_at=pd.to_datetime(new['created_at'], format='ISO8601')).reset_index(drop=True)
+        late = (self.df is not None and len(self.df) and len(new)
+                and new['created_at'].iloc[0] < self.df['created_at'].iloc[-1])
+        if late:
+            # Žurnaalist hiljem tulnud read lähevad õigele kohale, statistika arvutatakse akna peal uuesti
+            df = pd.concat([self.df, new], ignore_index=True).sort_values(['created_at', 'id'], kind='stable')
+            df = df.iloc[-self.window:].reset_index(drop=True)
+            self.stats = RunningStats()
+            self.stats.add(df['pnl'].to_numpy(dtype=float))
+        else:
+            self.stats.add(new['pnl'].to_numpy(dtype=float))
+            df = new if self.df is None else pd.concat([self.df, new], ignore_index=True)
+            extra = len(df) - self.window
+            if extra > 0:
+                self.stats.remove(df['pnl'].iloc[:extra].to_numpy(dtype=float))
+                df = df.iloc[extra:].reset_index(drop=True)
+        self.df = df
+        self.ids = set(df['id'].tolist())
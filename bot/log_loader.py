@@ -0,0 +1,159 @@
+"""trade_logs lugemine keyset lehekülgedena, tüübitud NumPy tükkidena.
+
+Lehed järjestatakse (created_at, id) järgi; järgmine leht algab rangelt
+viimase nähtud (created_at, id) paari järelt (PostgRESTi `or` filter), nii
+et ka terve leht sama ajatempliga ridu ei jää toppama. Seega ei ole päring
+piiratud fikseeritud `limit`-iga ega aeglustu suure offset'iga.
+Järgmine leht tõmmatakse taustalõimes juba siis, kui kasutaja eelmist alles
+töötleb.
+
+Kasutus:
+    for chunk in iter_chunks(supabase, ['price', 'rsi']):
+        chunk['price']           # float64 massiiv, None -> NaN
+    df = load_frame(supabase, ['created_at', 'price'], desc=True, limit=300)
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 1000  # Supabase tagastab max 1000 rida päringu kohta
+KEYS = ['id', 'created_at']
+TEXT_COLUMNS = {'created_at', 'action', 'symbol', 'analysis_summary'}
+
+
+def _fetch_page(client, table, select, where, any_of, cursor, end, page_size, desc):
+    last_ts, last_id = cursor
+    query = client.table(table).select(select)
+    if where is not None:
+        query = where(query)
+    # PostgREST ei pruugi kahte `or=` parameetrit ühendada, seega `any_of` ja kursor
+    # lähevad ühte loogikafiltrisse: (A või B) ja N == (A ja N) või (B ja N)
+    extra = f",or({','.join(any_of)})" if any_of else ""
+    if last_ts is not None:
+        # Vahemik created_at indeksi jaoks; võrdse ajatempliga read eristab id
+        query = query.lte('created_at', last_ts) if desc else query.gte('created_at', last_ts)
+    if last_ts is not None and last_id is not None:
+        op = 'lt' if desc else 'gt'
+        ts, key = _quote(last_ts), _quote(last_id)
+        query = query.or_(f"and(created_at.{op}.{ts}{extra}),and(created_at.eq.{ts},id.{op}.{key}{extra})")
+    elif any_of:
+        query = query.or_(",".join(any_of))
+    if end is not None:
+        query = query.gt('created_at', end) if desc else query.lt('created_at', end)
+    return query.order('created_at', desc=desc).order('id', desc=desc).limit(page_size).execute().data
+
+
+def _quote(value):
+    """PostgRESTi loogikafiltri väärtus jutumärkides (ajatemplis on '.', ':' ja '+')."""
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def iter_pages(client, columns, table='trade_logs', where=None, any_of=None, start=None, start_id=None,
+               end=None, desc=False, limit=None, page_size=PAGE_SIZE, prefetch=True):
+    """Genereerib lehti (list of dict).
+
+    `where(query)` lisab filtrid (nt `lambda q: q.not_.is_('rsi', 'null')`).
+    `any_of` on PostgRESTi tingimused, millest vähemalt üks peab kehtima
+    (nt `['vwap.is.null', 'volume.is.null']`); `where`-is `or_` ei tohi olla,
+    sest kursor kasutab seda ise.
+    `start`/`start_id` on kursor: tagastatakse ainult sellest rangelt edasi olevad
+    read (ilma `start_id`-ta alates `start`-ist kaasa arvatud).
+    `end` on välistav created_at piir.
+    """
+    select = ", ".join(dict.fromkeys(KEYS + list(columns)))
+    pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-loader") if prefetch else None
+
+    def fetch(cursor):
+        args = (client, table, select, where, any_of, cursor, end, page_size, desc)
+        if pool is None:
+            return _Done(_fetch_page(*args))
+        return pool.submit(_fetch_page, *args)
+
+    cursor, seen = (start, start_id), 0
+    try:
+        pending = fetch(cursor)
+        while True:
+            data = pending.result()
+            page = data if limit is None else data[:limit - seen]
+            if not page:
+                return
+            cursor = (page[-1]['created_at'], page[-1]['id'])
+            seen += len(page)
+            last = len(data) < page_size or (limit is not None and seen >= limit)
+            if not last:
+                pending = fetch(cursor)  # järgmine leht laeb samal ajal, kui seda töödeldakse
+            yield page
+            if last:
+                return
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _Done:
+    """Sünkroonse päringu tulemus samas liideses nagu Future."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def result(self):
+        return self.value
+
+
+def scalar(value):
+    """NumPy skalaar -> Python väärtus (kursori, JSON-i ja päringute jaoks)."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _ids(values):
+    """id on täisarv (bigint) või UUID - viimasel juhul fikseeritud pikkusega tekst."""
+    try:
+        return np.array(values, dtype=np.int64)
+    except (TypeError, ValueError):
+        return np.array(values, dtype=str)
+
+
+def to_arrays(rows, columns, dtypes=None):
+    """List of dict -> {veerg: NumPy massiiv}. Numbrid float64 (None -> NaN), id int64/str, tekst object."""
+    dtypes = dtypes or {}
+    out = {}
+    for col in dict.fromkeys(KEYS + list(columns)):
+        values = [r.get(col) for r in rows]
+        if col == 'id' and col not in dtypes:
+            out[col] = _ids(values)
+            continue
+        dtype = dtypes.get(col, object if col in TEXT_COLUMNS else np.float64)
+        if dtype is np.float64:
+            try:
+                out[col] = np.array(values, dtype=np.float64)
+            except (TypeError, ValueError):
+                out[col] = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=np.float64)
+        else:
+            out[col] = np.array(values, dtype=dtype)
+    return out
+
+
+def iter_chunks(client, columns, dtypes=None, **kwargs):
+    """Nagu `iter_pages`, aga iga leht on {veerg: massiiv}. Mälu piirab lehe suurus."""
+    for page in iter_pages(client, columns, **kwargs):
+        yield to_arrays(page, columns, dtypes)
+
+
+def load_arrays(client, columns, dtypes=None, **kwargs):
+    """Kõik tükid ühendatud massiivideks {veerg: massiiv} (ilma DataFrame'ita)."""
+    parts = list(iter_chunks(client, columns, dtypes, **kwargs))
+    if not parts:
+        return to_arrays([], columns, dtypes)
+    return {col: np.concatenate([p[col] for p in parts]) for col in parts[0]}
+
+
+def load_frame(client, columns, **kwargs):
+    """Kõik lehed ühte DataFrame'i (mugavus väiksematele päringutele)."""
+    chunks = [pd.DataFrame(chunk) for chunk in iter_chunks(client, columns, **kwargs)]
+    if not chunks:
+        return pd.DataFrame(columns=list(dict.fromkeys(KEYS + list(columns))))
+    return pd.concat(chunks, ignore_index=True)
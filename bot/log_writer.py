@@ -0,0 +1,238 @@
+"""Taustal töötav trade_logs kirjutaja (write-behind).
+
+Kauplemistsükkel paneb payload'i ainult järjekorda (`write` ei blokeeri
+kunagi). Taustalõim koondab read partiideks ja teeb ühe `insert([...])`
+päringu. Kui andmebaas pole kättesaadav, kirjutatakse partii kohalikku
+append-only žurnaali (JSONL, fsync) ja see mängitakse uuesti sisse, kui
+ühendus taastub. Järjekord säilib: kuni žurnaal pole tühi, lähevad ka uued
+read žurnaali.
+
+Taasesituse ajal on žurnaal ümber nimetatud (`.replay`), nii et võrgupäringud
+käivad ilma lukuta ja `write()` ei jää aeglase andmebaasi taha ootama. Rea,
+mille andmebaas `DEAD_LETTER_ATTEMPTS` korda tagasi lükkab (näiteks NOT NULL
+või tüübiviga), tõstame eraldi faili (`DEAD_LETTER_PATH`), et see ei
+blokeeriks ülejäänud žurnaali.
+"""
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from pathlib import Path
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_PATH = Path(os.getenv('TRADE_LOG_JOURNAL', Path(__file__).parent / '.trade_logs_journal.jsonl'))
+DEAD_LETTER_PATH = Path(os.getenv('TRADE_LOG_DEAD_LETTER', Path(__file__).parent / '.trade_logs_dead.jsonl'))
+DEAD_LETTER_ATTEMPTS = 3
+# Postgresi SQLSTATE klassid / PostgREST koodid, kus andmebaas vastas ja lükkas rea tagasi
+# (andmete, piirangu- ja skeemivead). Ühenduse vead ei loe kunagi katseks.
+REJECT_CODES = ('22', '23', '42', 'PGRST1', 'PGRST2')
+
+
+class TradeLogWriter:
+    """Partiidena kirjutav logija koos kohaliku žurnaaliga."""
+
+    def __init__(self, client, table="trade_logs", batch_size=100, flush_interval=1.0,
+                 retry_interval=15.0, max_queue=10_000, journal_path=JOURNAL_PATH,
+                 dead_letter_path=DEAD_LETTER_PATH):
+        self.client = client
+        self.table = table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+        self.journal_path = Path(journal_path)
+        self.replay_path = self.journal_path.with_suffix('.replay')
+        self.dead_letter_path = Path(dead_letter_path)
+        self.queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()  # kaitseb žurnaali
+        # Ridu žurnaalis (koos pooleli taasesitusega); loetakse kettalt ainult stardis
+        self._journal_count = len(_read_lines(self.replay_path)) + len(_read_lines(self.journal_path))
+        self._stop = threading.Event()
+        self._thread = None
+        self._next_retry = 0.0
+        self._last_error = None
+        self._rejections = {}  # žurnaali rida -> tagasilükkamiste arv
+        self.stats = {
+            "written": 0, "flushes": 0, "failed_flushes": 0,
+            "spilled": 0, "replayed": 0, "dead_letter": 0,
+            "last_flush_ms": 0.0, "max_flush_ms": 0.0,
+        }
+
+    # --- Avalik API ---
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="trade-log-writer", daemon=True)
+        self._thread.start()
+        return self
+
+    def write(self, payload):
+        """Lisab rea järjekorda. Ei blokeeri; täis järjekorra korral läheb rida žurnaali."""
+        try:
+            self.queue.put_nowait(payload)
+        except queue.Full:
+            self._spill([payload])
+
+    def close(self, timeout=10):
+        """Peatab lõime pärast järjekorra tühjendamist."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+
+    def metrics(self):
+        """Järjekorra sügavus, žurnaali suurus ja flush'i latentsus."""
+        return {**self.stats, "queue_depth": self.queue.qsize(), "journal_rows": self._journal_rows()}
+
+    # --- Sisemus ---
+
+    def _run(self):
+        self._replay()
+        while not (self._stop.is_set() and self.queue.empty()):
+            batch = self._collect()
+            if batch:
+                self._flush(batch)
+            elif self._has_journal() and time.time() >= self._next_retry:
+                self._replay()
+
+    def _collect(self):
+        """Ootab kuni `flush_interval` või täis partiini."""
+        batch = []
+        deadline = time.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch):
+        # Kui žurnaalis on vanemaid ridu, peavad need enne andmebaasi jõudma
+        if self._has_journal():
+            self._spill(batch)
+            if time.time() >= self._next_retry:
+                self._replay()
+            return
+        if not self._insert(batch):
+            self._spill(batch)
+
+    def _insert(self, rows):
+        start = time.perf_counter()
+        self._last_error = None
+        try:
+            self.client.table(self.table).insert(rows).execute()
+        except Exception as e:
+            self._last_error = e
+            self.stats["failed_flushes"] += 1
+            metrics.ERRORS.inc(stage='supabase_insert')
+            self._next_retry = time.time() + self.retry_interval
+            logger.error(f"❌ Supabase viga ({len(rows)} rida jääb žurnaali): {e}")
+            return False
+        elapsed = (time.perf_counter() - start) * 1000
+        metrics.STAGE.observe(elapsed / 1000, stage='supabase_insert')
+        self.stats["flushes"] += 1
+        self.stats["written"] += len(rows)
+        self.stats["last_flush_ms"] = elapsed
+        self.stats["max_flush_ms"] = max(self.stats["max_flush_ms"], elapsed)
+        return True
+
+    def _spill(self, rows):
+        with self._lock:
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                for row in rows:
+                    f.write(json.dumps(row, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.stats["spilled"] += len(rows)
+            self._journal_count += len(rows)
+
+    def _has_journal(self):
+        return any(p.exists() and p.stat().st_size > 0 for p in (self.replay_path, self.journal_path))
+
+    def _journal_rows(self):
+        return self._journal_count
+
+    def _replay(self):
+        """Mängib žurnaali partiidena sisse; ebaõnnestumisel jääb ülejäänu alles.
+
+        Lukk on ainult failide ümbertõstmise ajal, päringud käivad ilma selleta.
+        """
+        with self._lock:
+            # `.replay` on alles, kui eelmine taasesitus katkes (vanemad read)
+            lines = _read_lines(self.replay_path) + _read_lines(self.journal_path)
+            if not lines:
+                return
+            _write_lines(self.replay_path, lines)
+            self.journal_path.unlink(missing_ok=True)
+
+        done, dead = self._send(lines)
+        if dead:
+            _write_lines(self.dead_letter_path, dead, append=True)
+            self.stats["dead_letter"] += len(dead)
+            metrics.ERRORS.inc(len(dead), stage='trade_log_dead_letter')
+            logger.error(f"☠️ {len(dead)} rida lükati korduvalt tagasi, tõstetud: {self.dead_letter_path}")
+        self.stats["replayed"] += done - len(dead)
+
+        with self._lock:
+            # Taasesituse ajal žurnaali lisandunud read tulevad alles jäänute järele
+            rest = lines[done:] + _read_lines(self.journal_path)
+            _write_lines(self.journal_path, rest)
+            self._journal_count = len(rest)
+            self.replay_path.unlink(missing_ok=True)
+        if done:
+            logger.info(f"🔁 Žurnaalist taastatud {done - len(dead)} rida, alles {len(lines) - done}")
+
+    def _send(self, lines):
+        """Saadab žurnaali read. Tagastab (läbitud ridade arv, surnud read)."""
+        done, dead = 0, []
+        while done < len(lines):
+            batch = lines[done:done + self.batch_size]
+            if self._insert([json.loads(line) for line in batch]):
+                done += len(batch)
+                continue
+            if not self._rejected():
+                break
+            # Andmebaas vastas, aga partii ei läinud: otsime rea kaupa süüdlase
+            for line in batch:
+                if self._insert([json.loads(line)]):
+                    done += 1
+                    continue
+                if not self._rejected():
+                    return done, dead
+                self._rejections[line] = self._rejections.get(line, 0) + 1
+                if self._rejections[line] < DEAD_LETTER_ATTEMPTS:
+                    return done, dead
+                del self._rejections[line]
+                dead.append(line)
+                done += 1
+        return done, dead
+
+    def _rejected(self):
+        """Kas viimane viga oli andmebaasi tagasilükkamine (mitte ühenduse viga)?"""
+        code = str(getattr(self._last_error, 'code', None) or '')
+        return code.startswith(REJECT_CODES)
+
+
+def _read_lines(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return [line.rstrip('\n') for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def _write_lines(path, lines, append=False):
+    """Kirjutab read fsync-iga; ülekirjutus käib atomaarselt ajutise faili kaudu."""
+    target = path if append else path.with_suffix('.tmp')
+    with open(target, 'a' if append else 'w', encoding='utf-8') as f:
+        for line in lines:
+            f.write(line + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    if not append:
+        os.replace(target, path)
@@ -0,0 +1,233 @@
+"""Kerged mõõdikud (Prometheus tekstiformaat) ilma väliste sõltuvusteta.
+
+Mõõdikud on vaikimisi välja lülitatud: siis on `span()` jagatud tühi
+kontekst ja `inc`/`set`/`observe` naasevad kohe, seega kuum tsükkel ei
+maksa peaaegu midagi. `enable()` (või `serve(port)`) lülitab need sisse.
+Funktsiooniga gauge'id (`Gauge.set_function`) arvutatakse alles päringu
+ajal.
+
+Kasutus:
+    STAGE = histogram('bot_stage_seconds', 'Tsükli etappide kestus', ['stage'])
+    with span('predict'):
+        ...
+    serve(9108)  # GET http://127.0.0.1:9108/metrics
+"""
+import time
+import bisect
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+enabled = False
+_metrics = {}  # nimi -> mõõdik, registreerimise järjekorras
+_registry_lock = threading.Lock()
+
+
+def enable(on=True):
+    global enabled
+    enabled = on
+
+
+def _label_str(names, values, extra=''):
+    pairs = [f'{n}="{str(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}  # sildiväärtuste tuple -> väärtus
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(n, '') for n in self.labels)
+
+    def header(self):
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+
+    def render(self):
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f'{self.name}{_label_str(self.labels, k)} {v}' for k, v in items]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if not enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        self._function = None
+
+    def set(self, value, **labels):
+        if not enabled:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, fn):
+        """`fn()` -> arv või {sildiväärtuste tuple: arv}; kutsutakse ainult päringu ajal."""
+        self._function = fn
+
+    def render(self):
+        if self._function is None:
+            return super().render()
+        try:
+            value = self._function()
+        except Exception as e:
+            logger.warning(f"⚠️ Mõõdik {self.name} ebaõnnestus: {e}")
+            return self.header()
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        return self.header() + [f'{self.name}{_label_str(self.labels, k)} {v}' for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        if not enabled:
+            return
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]  # ämbrid, +Inf, summa
+            counts[i] += 1
+            counts[-1] += value
+
+    def render(self):
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        lines = self.header()
+        for key, counts in items:
+            total = 0
+            for bound, n in zip(self.buckets + ('+Inf',), counts[:-1]):
+                total += n
+                le = f'le="{bound}"'
+                lines.append(f'{self.name}_bucket{_label_str(self.labels, key, le)} {total}')
+            lines.append(f'{self.name}_sum{_label_str(self.labels, key)} {counts[-1]}')
+            lines.append(f'{self.name}_count{_label_str(self.labels, key)} {total}')
+        return lines
+
+
+def _register(cls, name, *args, **kwargs):
+    with _registry_lock:
+        if name not in _metrics:
+            _metrics[name] = cls(name, *args, **kwargs)
+        return _metrics[name]
+
+
+def counter(name, help, labels=()):
+    return _register(Counter, name, help, labels)
+
+
+def gauge(name, help, labels=()):
+    return _register(Gauge, name, help, labels)
+
+
+def histogram(name, help, labels=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram, name, help, labels, buckets)
+
+
+# --- Ajamõõtmine ---
+
+STAGE = histogram('bot_stage_seconds', 'Kauplemistsükli etappide kestus (s)', ['stage'])
+ERRORS = counter('bot_errors_total', 'Vead etapiti', ['stage'])
+
+
+class _Span:
+    __slots__ = ('hist', 'labels', 'start')
+
+    def __init__(self, hist, labels):
+        self.hist = hist
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(stage, hist=STAGE, **labels):
+    """`with span('predict'):` - kestus läheb `hist`-i sildiga stage=<stage>."""
+    if not enabled:
+        return _NULL_SPAN
+    return _Span(hist, {'stage': stage, **labels})
+
+
+# --- Väljund ---
+
+def render():
+    """Kõik mõõdikud Prometheus tekstiformaadis."""
+    with _registry_lock:
+        metrics = list(_metrics.values())
+    # Ilma väärtusteta mõõdikud jäetakse välja, et eri protsesside väljundeid saaks liita
+    blocks = [lines for lines in (m.render() for m in metrics) if len(lines) > 2]
+    return ''.join(line + '\n' for lines in blocks for line in lines)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # päringuid ei logita, scraper käib iga paari sekundi tagant
+
+
+def serve(port, host='127.0.0.1'):
+    """Lülitab mõõdikud sisse ja käivitab taustal /metrics serveri."""
+    enable()
+    server = ThreadingHTTPServer((host, int(port)), _Handler)
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    logger.info(f"📈 Mõõdikud: http://{host}:{port}/metrics")
+    return server
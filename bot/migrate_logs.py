@@ -1,19 +1,28 @@
 """Backfill missing indicator columns in `trade_logs` table.
 
-This script fetches all rows where one of the new features is null and
-recomputes them based on the market data at the time of the log.
-It uses the same indicator functions as `bot.get_market_data`.
+This script pages through all rows where one of the new features is null,
+groups them per symbol into contiguous time ranges, fetches each range once (with
+indicator warmup) from the local kline store and writes the recomputed
+values back with per-row updates, several in flight at once. (An upsert
+with partial rows would fail: the proposed INSERT row lacks NOT NULL
+columns such as price, and Postgres checks those before ON CONFLICT.)
+It uses the shared feature pipeline (features.py), the same one the bot
+logs with, so backfilled values match live rows.
 
 Usage:
     python migrate_logs.py
 """
 import os
+import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-import pandas_ta as ta
 from binance.client import Client
 from supabase import create_client
 from dotenv import load_dotenv
+from kline_store import KlineStore
+from features import compute_cached
+from log_loader import iter_pages
 import logging
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - [migrate] %(message)s')
@@ -22,67 +31,103 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 client = Client(os.getenv('BINANCE_API_KEY'), os.getenv('BINANCE_API_SECRET'))
 supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
-SYMBOL = 'BTCUSDT'
-
-
-# copy of indicator logic, returns df with new columns present
-
-def enrich_df(df: pd.DataFrame) -> pd.DataFrame:
-    df['rsi'] = ta.rsi(df['close'], length=14)
-    macd = ta.macd(df['close'])
-    df['macd'] = macd.iloc[:, 0]
-    df['macd_signal'] = macd.iloc[:, 2]
-    bbands = ta.bbands(df['close'], length=20, std=2)
-    df['bb_lower'] = bbands.iloc[:, 0]
-    df['bb_upper'] = bbands.iloc[:, 2]
-    df['ema50'] = ta.ema(df['close'], length=50)
-    df['ema200'] = ta.ema(df['close'], length=200)
-    df['atr'] = ta.atr(df['high'], df['low'], df['close'], length=14)
+SYMBOL = 'BTCUSDT'  # rows logged before the symbol column existed
+store = KlineStore(client)
+
+COLS = ['volume', 'vwap', 'stoch_k', 'stoch_d']
+PAGE_SIZE = 1000
+UPDATE_BATCH = 500     # rows per progress step
+UPDATE_WORKERS = 8     # concurrent update requests
+WARMUP_MINUTES = 300   # enough history for ema200 / stoch / atr to settle
+MAX_GAP_MINUTES = 60   # rows further apart than this start a new kline range
+MINUTE_MS = 60_000
+
+
+def iter_pending_rows(limit=None):
+    """Yield pages of rows that miss any of COLS, using keyset pagination.
+
+    Pages are ordered by (created_at, id) by the shared log loader, so the scan
+    is not capped by a fixed limit and stays correct while rows are being
+    updated. The next page is prefetched while the current one is processed.
+    """
+    nulls = [f"{c}.is.null" for c in COLS]
+    yield from iter_pages(supabase, COLS + ['symbol'], any_of=nulls, limit=limit, page_size=PAGE_SIZE)
+
+
+def coalesce_ranges(minutes):
+    """Group sorted minute timestamps (ms) into contiguous [start, end) ranges."""
+    ranges = []
+    for m in minutes:
+        if ranges and m - ranges[-1][1] <= MAX_GAP_MINUTES * MINUTE_MS:
+            ranges[-1][1] = m + MINUTE_MS
+        else:
+            ranges.append([m, m + MINUTE_MS])
+    return ranges
+
+
+def compute_updates(df):
+    """Fetch each symbol's ranges once (with warmup), enrich them and match rows by minute."""
+    epoch = pd.Timestamp(0, tz='UTC')
+    ms = (pd.to_datetime(df['created_at'], utc=True, format='ISO8601') - epoch) // pd.Timedelta(milliseconds=1)
+    minute = ms // MINUTE_MS * MINUTE_MS
+    symbol = df['symbol'].fillna(SYMBOL) if 'symbol' in df else SYMBOL
+    df = df.assign(minute=minute.to_numpy(), symbol=symbol)
+    updates = []
+    for sym, rows in df.groupby('symbol', sort=False):
+        updates += _symbol_updates(sym, rows)
+    return updates
+
+
+def _symbol_updates(symbol, df):
+    updates = []
+    for start, end in coalesce_ranges(sorted(df['minute'].unique())):
+        day_start = start // 86_400_000 * 86_400_000  # vwap is anchored to the UTC day
+        mdf = compute_cached(store.load(symbol, min(start - WARMUP_MINUTES * MINUTE_MS, day_start), end), symbol)
+        mdf.index = mdf['time'].astype('int64')
+        rows = df[(df['minute'] >= start) & (df['minute'] < end)]
+        found = mdf.reindex(rows['minute'].to_numpy())[COLS].to_dict('records')
+        for row, newvals in zip(rows.to_dict('records'), found):
+            update = {'id': row['id']}
+            for c in COLS:
+                # keep the existing value when the recomputed one is unavailable
+                v = newvals[c] if pd.notna(newvals[c]) else row[c]
+                update[c] = float(v) if pd.notna(v) else None
+            updates.append(update)
+    return updates
+
+
+def update_row(update):
+    """Write one row's recomputed columns. Returns True on success."""
     try:
-        df['vwap'] = ta.vwap(df['high'], df['low'], df['close'], df['volume'])
-        stoch = ta.stoch(df['high'], df['low'], df['close'])
-        df['stoch_k'] = stoch.iloc[:, 0]
-        df['stoch_d'] = stoch.iloc[:, 1]
-    except Exception:
-        pass
-    return df
-
-
-def backfill_records(limit=100):
-    # fetch rows missing any of the target columns
-    cols = ['volume', 'vwap', 'stoch_k', 'stoch_d']
-    query = supabase.table('trade_logs')
-    for c in cols:
-        query = query.or_(f"{c}.is.null")
-    # supabase-python doesn't support or chaining easily; so we'll simply
-    # do select and filter in pandas below.
-    res = supabase.table('trade_logs').select('*').limit(limit).execute()
-    if not res.data:
-        logger.info('No rows returned.')
-        return
-    df = pd.DataFrame(res.data)
-    to_process = df[[c for c in cols if c in df.columns]].isna().any(axis=1)
-    df = df[to_process]
+        supabase.table('trade_logs').update({c: update[c] for c in COLS}).eq('id', update['id']).execute()
+        return True
+    except Exception as e:
+        logger.error(f"Error updating row {update['id']}: {e}")
+        return False
+
+
+def backfill_records(limit=None):
+    """Backfill all pending rows. Returns (updated, failed)."""
+    pending = [pd.DataFrame(page) for page in iter_pending_rows(limit)]
+    if not pending:
+        logger.info('No rows need backfill.')
+        return 0, 0
+    df = pd.concat(pending, ignore_index=True)
     logger.info(f"Processing {len(df)} rows for backfill")
 
-    for idx, row in df.iterrows():
-        ts = row['created_at']
-        # fetch a bit of market data around the timestamp
-        try:
-            end = pd.to_datetime(ts).strftime('%Y-%m-%d %H:%M:%S') + ' UTC'
-            klines = client.get_historical_klines(SYMBOL, '1m', end, limit=10)
-            mdf = pd.DataFrame(klines, columns=['time','open','high','low','close','volume','_','_','_','_','_','_'])
-            mdf[['open','high','low','close','volume']] = mdf[['open','high','low','close','volume']].apply(pd.to_numeric)
-            mdf = enrich_df(mdf)
-            # take the last row (closest to timestamp)
-            newvals = mdf.iloc[-1]
-            update = {k: float(newvals[k]) for k in cols if k in newvals}
-            if update:
-                logger.info(f"Updating row {row['id']} with {update}")
-                supabase.table('trade_logs').update(update).eq('id', row['id']).execute()
-        except Exception as e:
-            logger.error(f"Error processing row {row['id']}: {e}")
+    updates = compute_updates(df)
+    total = failed = 0
+    with ThreadPoolExecutor(max_workers=UPDATE_WORKERS) as pool:
+        for i in range(0, len(updates), UPDATE_BATCH):
+            batch = updates[i:i + UPDATE_BATCH]
+            ok = sum(pool.map(update_row, batch))
+            total += ok
+            failed += len(batch) - ok
+            logger.info(f"Updated {total}/{len(updates)} rows ({failed} failed)")
+    logger.info(f"Backfilled {total} rows, {failed} failed")
+    return total, failed
 
 
 if __name__ == '__main__':
-    backfill_records(limit=2000)
+    _, failed = backfill_records()
+    sys.exit(1 if failed else 0)
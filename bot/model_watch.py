@@ -0,0 +1,214 @@
+"""Mudeli kuumvahetus töötavas botis.
+
+Taustalõim vaatab `trading_brain_xgb.pkl` faili (mtime + suurus, muutusel
+sisu räsi). Uus mudel laetakse ja kontrollitakse lõimes (3 klassi,
+soojendusennustus nii NumPy puude kui sklearn'i teel, tõenäosused lõplikud ja
+summaga 1) ning jäetakse ootele. Kauplemistsükkel võtab tick'i alguses
+`acquire()`-ga paari (mudel, versioon), seega vahetus toimub alati tick'ide
+vahel ja ühe tick'i kõik sümbolid kasutavad sama mudelit.
+
+Eelmine mudel jääb mällu ja `rollback()` paneb selle kohe tagasi. Teisest
+protsessist (api.py) annab sama käsu `request_rollback()` signaalfailiga,
+nagu `config_cache.notify_change`. Tagasi võetud mudel eelmiseks ei jää, seega
+teine tagasivõtt ei vii vigase mudeli juurde tagasi. Tagasi lükatud
+versioonid (vigased ja tagasi võetud) salvestatakse mudeli kõrvale
+(`.<mudel>_rejected.json`) ja neid ei laeta uuesti ka pärast taaskäivitust,
+kuni fail muutub.
+
+Versioon on faili sisu sha256 esimesed 12 märki - sama fail annab sama
+versiooni ka pärast taaskäivitust.
+
+Kasutus:
+    models = ModelWatcher(MODEL_PATH).start()   # esimene laadimine juba lõimes
+    models.ready.wait(60)
+    model, version = models.acquire()           # iga tick'i alguses
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from pathlib import Path
+
+import numpy as np
+
+import metrics
+from inference import Predictor, MODEL_PATH, sample_features
+from strategies import ACTIONS
+from config_cache import notify_change, _signal_path, _mtime
+
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = float(os.getenv('MODEL_POLL', 5))  # Kui tihti faili kontrollitakse (s)
+WARMUP_ROWS = 256   # Soojendusennustuse partii (üle SMALL_BATCH, et ka sklearn'i tee käiks läbi)
+N_CLASSES = len(ACTIONS)  # SHORT, HOLD, LONG
+ROLLBACK = "model_rollback"  # Signaalfaili nimi (config_cache.notify_change)
+
+RELOADS = metrics.counter('bot_model_reloads_total', 'Mudeli vahetused tulemuse järgi', ['result'])
+
+
+def file_version(path):
+    """Faili sisu räsi (12 märki)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def validate(predictor):
+    """Soojendusennustus. Tõstab ValueError-i, kui mudel pole botile sobiv."""
+    if predictor.n_classes != N_CLASSES:
+        raise ValueError(f"klasse {predictor.n_classes}, vaja {N_CLASSES}")
+    X = sample_features(WARMUP_ROWS, seed=7)
+    for probs in (predictor.predict_proba(X[:1]), predictor.predict_proba(X)):
+        if probs.shape[1] != N_CLASSES or not np.isfinite(probs).all():
+            raise ValueError(f"vigased tõenäosused (kuju {probs.shape})")
+        if not np.allclose(probs.sum(axis=1), 1.0, atol=1e-3):
+            raise ValueError("tõenäosuste summa pole 1")
+
+
+def request_rollback():
+    """Palub samas masinas töötaval botil eelmise mudeli tagasi võtta."""
+    notify_change(ROLLBACK)
+
+
+class ModelWatcher:
+    """Kehtiv mudel, eelmine mudel ja taustal laetud ootel mudel."""
+
+    def __init__(self, path=MODEL_PATH, poll=POLL_SECONDS):
+        self.path = Path(path)
+        self.poll = poll
+        self.signal_path = _signal_path(ROLLBACK)
+        self._signal = _mtime(self.signal_path)  # Enne starti antud signaalid ei kehti
+        self.current = (None, None)   # (Predictor, versioon)
+        self.previous = (None, None)
+        self.pending = None           # (Predictor, versioon), võetakse kasutusele acquire()-s
+        self.rejected_path = self.path.with_name(f".{self.path.stem}_rejected.json")
+        self.rejected = self._load_rejected()  # versioonid, mida ei laeta (vigased või tagasi lükatud)
+        self._stat = None
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.ready = threading.Event()  # Esimene kontroll (laadimine) on tehtud
+
+    # --- Avalik API ---
+
+    def load(self):
+        """Esimene laadimine sünkroonselt (stardis). Vigane fail jätab mudelita."""
+        self.check()
+        self.acquire()
+        self.ready.set()
+        return self
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="model-watch", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def subscribe(self, callback):
+        """callback(vana_versioon, uus_versioon) kutsutakse iga vahetuse peale."""
+        self._listeners.append(callback)
+
+    def acquire(self):
+        """Tagastab (mudel, versioon); ootel mudel võetakse kasutusele siin, tick'ide vahel."""
+        with self._lock:
+            pending, self.pending = self.pending, None
+            if pending is not None:
+                old = self.current
+                # Tagasi võetud mudelit eelmiseks ei jäeta, muidu vahelduks tagasivõtt kahe mudeli vahel
+                self.previous = (None, None) if old[1] in self.rejected else old
+                self.current = pending
+        if pending is not None and old[0] is not None:
+            logger.info(f"🔁 Mudel vahetatud: {old[1]} -> {pending[1]}")
+        if pending is not None:
+            for callback in self._listeners:
+                callback(old[1], pending[1])
+        return self.current
+
+    def rollback(self):
+        """Paneb eelmise mudeli ootele (vahetub järgmise tick'i alguses). Tagastab False, kui pole eelmist."""
+        with self._lock:
+            if self.previous[0] is None:
+                return False
+            self._reject(self.current[1])
+            self.pending = self.previous
+        RELOADS.inc(result='rollback')
+        logger.warning(f"⏪ Mudel võetakse tagasi: {self.current[1]} -> {self.previous[1]}")
+        return True
+
+    def check(self):
+        """Kontrollib faili ja tagasivõtu signaali. Tagastab True, kui uus mudel jäi ootele."""
+        signal = _mtime(self.signal_path)
+        if signal != self._signal:
+            self._signal = signal
+            if not self.rollback():
+                logger.warning("⚠️ Tagasivõtt: eelmist mudelit pole mälus.")
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return False
+        stat = (st.st_mtime_ns, st.st_size)
+        if stat == self._stat:
+            return False
+        self._stat = stat
+        version = file_version(self.path)
+        if version == self.current[1]:
+            return False
+        if version in self.rejected:
+            if self.current[0] is None:
+                logger.warning(f"⚠️ Mudel {version} on varem tagasi lükatud, jään mudelita kuni uue failini.")
+            return False
+        try:
+            started = time.perf_counter()
+            predictor = Predictor.load(self.path)
+            validate(predictor)
+        except Exception as e:
+            with self._lock:
+                self._reject(version)
+            RELOADS.inc(result='invalid')
+            logger.error(f"❌ Uus mudel {version} lükati tagasi: {e}")
+            return False
+        with self._lock:
+            self.pending = (predictor, version)
+        if self.current[0] is not None:
+            RELOADS.inc(result='loaded')
+            logger.info(f"🧠 Uus mudel {version} laetud ja kontrollitud ({time.perf_counter() - started:.2f}s), "
+                        f"vahetus järgmisel tick'il.")
+        return True
+
+    # --- Sisemus ---
+
+    def _load_rejected(self):
+        try:
+            return set(json.loads(self.rejected_path.read_text()))
+        except FileNotFoundError:
+            return set()
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Tagasi lükatud mudelite faili ei saa lugeda: {e}")
+            return set()
+
+    def _reject(self, version):
+        """Lisab versiooni tagasi lükatute hulka ja salvestab selle (lukk on käes)."""
+        self.rejected.add(version)
+        tmp = self.rejected_path.with_suffix(f'.{os.getpid()}.tmp')
+        try:
+            tmp.write_text(json.dumps(sorted(self.rejected)))
+            os.replace(tmp, self.rejected_path)
+        except OSError as e:
+            logger.warning(f"⚠️ Tagasi lükatud mudelite salvestamine ebaõnnestus: {e}")
+
+    def _run(self):
+        while True:
+            try:
+                self.check()
+            except Exception as e:
+                logger.warning(f"⚠️ Mudeli kontroll ebaõnnestus: {e}")
+            self.ready.set()
+            if self._stop.wait(self.poll):
+                break
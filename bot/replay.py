@@ -0,0 +1,201 @@
+"""Boti kiire korduskäivitus salvestatud küünalde peal.
+
+`bot.start_bot` jookseb muutmata otsustuskoodiga, asendatud on ainult
+välismaailm:
+    - `ReplayClock` - `sleep` keerab virtuaalset aega edasi, ei maga;
+    - `KlineReplay` - `get_klines` annab küünlad kuni kella hetkeni;
+    - `ReplaySink` - read, mis live bot saadaks Supabase'i, jäävad mällu.
+
+Salvestatud pooleli küünal on juba lõplik, seega tick toimub minuti
+viimasel sekundil (`TICK_OFFSET`), nagu live bot, mis tiksub kell xx:59.
+Sama kella ja samade küünaldega on read samad, mis live bot oleks
+kirjutanud (ilma andmebaasi id-ta). Nädal 1m andmeid jookseb sekunditega.
+
+Kasutus:
+    python replay.py --days 7 --out replay.jsonl           # KlineStore (puuduv osa Binance'ist)
+    python replay.py --days 7 --offline                    # ainult kohalik vahemälu
+    python replay.py --synthetic 10080 --out replay.jsonl  # võrguta, bench_fixtures.py küünlad
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from datetime import datetime, timezone
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STEP_MS = 60_000
+TICK_OFFSET = 59.0  # Tick'i aeg küünla avamisest (s)
+DEFAULT_RISK = float(os.getenv('REPLAY_RISK', 100.0))
+
+
+class ReplayFinished(Exception):
+    """Küünlad said otsa."""
+
+
+class ReplayClock:
+    """Virtuaalne kell: `sleep` liigutab aega ja lõpetab, kui küünlad saavad otsa."""
+
+    def __init__(self, start, end):
+        self.now = float(start)
+        self.end = float(end)
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(0.0, seconds)
+        if self.now > self.end:
+            raise ReplayFinished()
+
+    def utcnow(self):
+        return datetime.fromtimestamp(self.now, timezone.utc).replace(tzinfo=None)
+
+
+class KlineReplay:
+    """Binance'i `get_klines` asendus: {sümbol: (n, 6) massiiv}, nähtav kuni kella hetkeni."""
+
+    KLINE_INTERVAL_1MINUTE = '1m'
+
+    def __init__(self, klines, clock):
+        self.klines = {s: np.asarray(a, dtype=np.float64) for s, a in klines.items()}
+        self.times = {s: a[:, 0] for s, a in self.klines.items()}
+        self.clock = clock
+        self.calls = 0
+
+    def get_klines(self, symbol, interval=None, limit=500):
+        self.calls += 1
+        hi = int(np.searchsorted(self.times[symbol], self.clock.now * 1000, side='right'))
+        return self.klines[symbol][max(0, hi - limit):hi].tolist()
+
+
+class ReplaySink:
+    """TradeLogWriter'i asendus: read kogutakse järjekorras mällu."""
+
+    def __init__(self):
+        self.rows = []
+
+    def write(self, payload):
+        self.rows.append(payload)
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            for row in self.rows:
+                f.write(json.dumps(row) + '\n')
+
+
+class FixedSetting:
+    """CachedSetting'u asendus püsiva väärtusega."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+def replay(klines, risk=DEFAULT_RISK, model_path=None):
+    """Laseb `bot.start_bot`-i üle küünalde {sümbol: massiiv}. Tagastab (ReplaySink, statistika)."""
+    import bot
+
+    warmup = bot.WARMUP_CANDLES
+    short = [s for s, a in klines.items() if len(a) <= warmup]
+    if short:
+        raise ValueError(f"Liiga vähe küünlaid ({', '.join(short)}): vaja üle {warmup}")
+    # Esimene tick näeb `warmup` küünalt, viimane on kõigi sümbolite viimane ühine minut
+    start = max(a[warmup - 1, 0] for a in klines.values()) / 1000 + TICK_OFFSET
+    end = min(a[-1, 0] for a in klines.values()) / 1000 + TICK_OFFSET
+
+    clock = ReplayClock(start, end)
+    source = KlineReplay(klines, clock)
+    sink = ReplaySink()
+    bot.SYMBOLS = list(klines)
+    began = time.perf_counter()
+    try:
+        bot.start_bot(source=source, sink=sink, clock=clock, risk=FixedSetting(risk),
+                      model_path=model_path or bot.MODEL_PATH)
+    except ReplayFinished:
+        pass
+    elapsed = time.perf_counter() - began
+    ticks = int((min(clock.now, end) - start) // bot.CYCLE_SECONDS) + 1
+    stats = {
+        "symbols": len(klines),
+        "ticks": ticks,
+        "rows": len(sink.rows),
+        "trades": _trades(sink.rows),
+        "seconds": round(elapsed, 2),
+        "ticks_per_second": round(ticks / elapsed, 1) if elapsed else None,
+    }
+    return sink, stats
+
+
+def _trades(rows):
+    """Positsiooni avamiste arv (action muutus sümboli sees)."""
+    last, count = {}, 0
+    for row in rows:
+        action = row['action']
+        if action != 'HOLD' and last.get(row['symbol']) != action:
+            count += 1
+        last[row['symbol']] = action
+    return count
+
+
+def load_klines(symbols, days, end_ms=None, offline=False):
+    """KlineStore'ist {sümbol: massiiv}: `days` päeva + soojenduse küünlad enne seda."""
+    from kline_store import KlineStore
+    import bot
+
+    client = None
+    if not offline:
+        from binance.client import Client
+        client = Client(os.getenv('BINANCE_API_KEY'), os.getenv('BINANCE_API_SECRET'))
+    if end_ms is None:
+        end_ms = int(time.time() * 1000) // STEP_MS * STEP_MS
+    start_ms = end_ms - int(days * 86_400_000) - bot.WARMUP_CANDLES * STEP_MS
+    store = KlineStore(client)
+    return {s: np.asarray(store.load(s, start_ms, end_ms, fetch=not offline)) for s in symbols}
+
+
+def main(argv=None):
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Boti korduskäivitus salvestatud küünalde peal")
+    parser.add_argument('--symbols', default=os.getenv('SYMBOLS', 'BTCUSDT'), help="Komaga eraldatud")
+    parser.add_argument('--days', type=float, default=7)
+    parser.add_argument('--offline', action='store_true', help="Ära täienda vahemälu Binance'ist")
+    parser.add_argument('--synthetic', type=int, metavar='MINUTES', help="bench_fixtures.py sünteetilised küünlad")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--risk', type=float, default=DEFAULT_RISK, help="risk_percent (%%)")
+    parser.add_argument('--model', help="Mudeli fail (vaikimisi trading_brain_xgb.pkl)")
+    parser.add_argument('--out', help="Read JSONL faili")
+    parser.add_argument('--verbose', action='store_true', help="Boti tick'ide logi")
+    args = parser.parse_args(argv)
+
+    import bot
+    symbols = [s.strip().upper() for s in args.symbols.split(',') if s.strip()]
+    if args.synthetic:
+        from bench_fixtures import synthetic_klines
+        n = args.synthetic + bot.WARMUP_CANDLES
+        klines = {s: synthetic_klines(n, args.seed + i) for i, s in enumerate(symbols)}
+    else:
+        klines = load_klines(symbols, args.days, offline=args.offline)
+
+    if not args.verbose:
+        logging.getLogger(bot.__name__).setLevel(logging.WARNING)
+    sink, stats = replay(klines, risk=args.risk, model_path=args.model)
+    if args.out:
+        sink.save(args.out)
+    print(f"🔁 Replay: {stats['ticks']} tick'i, {stats['rows']} rida, {stats['trades']} tehingut "
+          f"| {stats['seconds']}s ({stats['ticks_per_second']} tick'i/s)")
+    if args.out:
+        print(f"💾 Read: {args.out}")
+    return stats
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,106 @@
+"""Boti oleku hetktõmmis kiireks taaskäivituseks.
+
+Tsüklite järel (kõige tihemini `SNAPSHOT_SECONDS` tagant) kirjutatakse
+kettale iga sümboli indikaatorimootor, viimased suletud küünlad ja
+positsioon ning kehtiv mudeli versioon. Käivitusel taastab bot oleku
+siit: Supabase'i positsioonipäringut ja 300 küünla soojendust pole vaja,
+`fetch_data` tõmbab ainult vahepeal puudu jäänud küünlad.
+
+Mootor on salvestatud eraldi pickle'ina koos indicators.py räsiga. Kui
+indikaatorite kood on vahepeal muutunud, ehitatakse mootor salvestatud
+küünaldest uuesti. `MAX_AGE`-st vanemat hetktõmmist ei kasutata (siis
+oleks soojendus niikuinii vajalik ja positsioon võib olla aegunud).
+
+Kasutus:
+    data = load()                  # None, kui puudub, vigane või vana
+    restore(state, data)           # True, kui sümbol oli hetktõmmises
+    save(states, model_version)
+"""
+import os
+import time
+import pickle
+import hashlib
+import logging
+from pathlib import Path
+
+import indicators
+from indicators import IndicatorEngine
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PATH = Path(os.getenv('BOT_SNAPSHOT', Path(__file__).parent / '.bot_snapshot.pkl'))
+SNAPSHOT_SECONDS = float(os.getenv('SNAPSHOT_SECONDS', 60))
+MAX_AGE = float(os.getenv('SNAPSHOT_MAX_AGE', 5 * 3600))  # s, umbes soojenduse 300 küünalt
+FORMAT = 1
+ENGINE_CODE = hashlib.sha256(Path(indicators.__file__).read_bytes()).hexdigest()[:12]
+
+
+def save(states, model_version, path=SNAPSHOT_PATH):
+    """Kirjutab {sümbol: SymbolState} oleku atomaarselt kettale. Tagastab True, kui õnnestus."""
+    data = {
+        "format": FORMAT,
+        "saved_at": time.time(),
+        "engine_code": ENGINE_CODE,
+        "model_version": model_version,
+        "symbols": {symbol: _symbol(state) for symbol, state in states.items()},
+    }
+    try:
+        tmp = Path(path).with_suffix('.tmp')
+        with open(tmp, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        return True
+    except Exception as e:
+        logger.warning(f"⚠️ Hetktõmmise salvestamine ebaõnnestus: {e}")
+        return False
+
+
+def _symbol(state):
+    # Voo lõim ei tohi mootorit ja küünlaid samal ajal muuta (poolik pickle, deque muutus)
+    with state.lock:
+        return {
+            "engine": pickle.dumps(state.engine, protocol=pickle.HIGHEST_PROTOCOL) if state.engine else None,
+            "candles": list(state.candles),
+            "position": state.position,
+        }
+
+
+def load(path=SNAPSHOT_PATH, max_age=MAX_AGE):
+    """Loeb hetktõmmise. Tagastab None, kui seda pole, see on vigane või vanem kui `max_age`."""
+    try:
+        with open(path, 'rb') as f:
+            data = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"⚠️ Hetktõmmist ei saanud lugeda, alustan nullist: {e}")
+        return None
+    if not isinstance(data, dict) or data.get("format") != FORMAT:
+        return None
+    age = time.time() - data["saved_at"]
+    if age > max_age:
+        logger.info(f"ℹ️ Hetktõmmis on liiga vana ({age / 60:.0f} min), alustan nullist.")
+        return None
+    logger.info(f"♻️ Hetktõmmis leitud ({age:.0f}s tagasi, mudel {data['model_version']})")
+    return data
+
+
+def restore(state, data):
+    """Taastab sümboli positsiooni, küünlad ja mootori. Tagastab False, kui sümbolit polnud."""
+    saved = data["symbols"].get(state.symbol)
+    if saved is None:
+        return False
+    state.position = saved["position"]
+    state.candles.clear()
+    state.candles.extend(saved["candles"])
+    state.engine = None
+    if saved["engine"] is not None and data["engine_code"] == ENGINE_CODE:
+        try:
+            state.engine = pickle.loads(saved["engine"])
+        except Exception as e:
+            logger.warning(f"⚠️ {state.symbol}: mootorit ei saanud taastada: {e}")
+    if state.engine is None and state.candles:
+        # Indikaatorite kood muutus: sama tulemus, mis soojendusel, aga ilma võrguta
+        state.engine = IndicatorEngine()
+        state.engine.warmup(state.candles)
+    return True
@@ -0,0 +1,111 @@
+"""Kauplemisreeglite simulatsioonid NumPy massiividel.
+
+Ühised backtester.py, backtest.py ja sweep.py jaoks. Moodul ei impordi
+pandas'it ega kliente, seega on see sweep'i tööprotsessides odav.
+"""
+import numpy as np
+
+BUY, HOLD, SELL = 1, 0, -1
+ACTIONS = ["SHORT", "HOLD", "LONG"]  # mudeli klasside järjekord
+HOLD_CLASS, LONG_CLASS = ACTIONS.index("HOLD"), ACTIONS.index("LONG")
+
+# Vaikeparameetrid (bot.py, backtester.py, backtest.py)
+BOT_CONFIDENCE = 0.45
+RSI_BUY = 30
+RSI_SELL = 70
+
+
+def rsi_signals(rsi, window_size=50, rsi_buy=RSI_BUY, rsi_sell=RSI_SELL):
+    """RSI reegel kogu massiivile: 1 = BUY, -1 = SELL, 0 = HOLD."""
+    actions = np.zeros(len(rsi), dtype=np.int8)
+    # NaN võrdlused on False, seega puuduv RSI annab HOLD nagu enne
+    actions[rsi > rsi_sell] = SELL
+    actions[rsi < rsi_buy] = BUY
+    actions[:window_size] = HOLD
+    return actions
+
+
+def simulate_rsi(close, actions, start=50):
+    """Positsiooni olekumasin NumPy massiividel.
+
+    Käib läbi ainult signaaliga read; ülejäänud on HOLD-id.
+    Tagastab (trades, holds, running_pnl) samas kujus nagu varem.
+    """
+    trades = []
+    last_buy_price = None
+    running_pnl = 0
+    
+    for i in np.flatnonzero(actions[start:]) + start:
+        price = float(close[i])
+        if actions[i] == BUY and last_buy_price is None:
+            last_buy_price = price
+            trades.append({'type': 'BUY', 'price': price, 'index': int(i)})
+        elif actions[i] == SELL and last_buy_price is not None:
+            pnl = ((price - last_buy_price) / last_buy_price) * 100
+            running_pnl += pnl
+            trades.append({'type': 'SELL', 'price': price, 'pnl': pnl, 'index': int(i)})
+            last_buy_price = None
+    
+    holds = max(0, len(close) - start) - len(trades)
+    return trades, holds, running_pnl
+
+
+def simulate_ai(price, prob, stoch_k, created_at=None, buy_prob=0.6, stoch_max=30,
+                take_profit=1.0, stop_loss=-0.5, exit_prob=0.3, verbose=True):
+    """Ostu/müügi reeglid tõenäosuste massiivi peal. Tagastab (balance, trades, wins)."""
+    balance = 100.0  # Alustame 100 USDT-ga
+    position = 0     # 0 = ei oma, 1 = omame BTC
+    buy_price = 0
+    trades = 0
+    wins = 0
+
+    for i in range(len(price)):
+        p, pr = price[i], prob[i]
+
+        # OSTMINE: Ennustus > 0.6 ja meil pole positsiooni
+        if position == 0 and pr > buy_prob and stoch_k[i] < stoch_max:
+            buy_price = p
+            position = 1
+            trades += 1
+            if verbose and created_at is not None:
+                print(f"[{created_at[i][:16]}] BUY: {p:.2f} (AI: {pr:.2f})")
+
+        # MÜÜMINE: Kasum 1% või kahjum -0.5% (või AI ütleb, et hind langeb)
+        elif position == 1:
+            pnl = (p - buy_price) / buy_price * 100
+            if pnl > take_profit or pnl < stop_loss or pr < exit_prob:
+                balance *= (1 + pnl/100)
+                position = 0
+                if pnl > 0: wins += 1
+                trades += 1
+                if verbose and created_at is not None:
+                    print(f"[{created_at[i][:16]}] SELL: {p:.2f} | PnL: {pnl:.2f}% | Balance: {balance:.2f} USDT")
+
+    return balance, trades, wins
+
+
+def simulate_bot(price, probs, confidence=BOT_CONFIDENCE):
+    """bot.py otsusereegel: argmax klass, kui kindlus > `confidence`, pööra positsioon.
+
+    Positsioon suletakse ainult vastassuunalise signaaliga (nagu botis).
+    Tagastab (pnl_summa, tehingud, võidud).
+    """
+    actions = probs.argmax(axis=1)
+    conf = probs.max(axis=1)
+    entry, side = 0.0, 0  # side: 1 = LONG, -1 = SHORT, 0 = väljas
+    total_pnl, trades, wins = 0.0, 0, 0
+
+    # Ainult read, kus kindlus ületab läve ja signaal pole HOLD
+    for i in np.flatnonzero((conf > confidence) & (actions != HOLD_CLASS)):
+        want = 1 if actions[i] == LONG_CLASS else -1
+        if want == side:
+            continue
+        p = float(price[i])
+        if side:
+            pnl = (p - entry) / entry * 100 * side
+            total_pnl += pnl
+            wins += pnl > 0
+            trades += 1
+        entry, side = p, want
+
+    return total_pnl, trades, wins
@@ -0,0 +1,198 @@
+"""Boti alamprotsessi järelevalve.
+
+Lapse stdout ja stderr loetakse taustalõimes pidevalt tühjaks piiratud
+ringpuhvrisse, seega bot ei jää kunagi täis toru taha kinni. Monitor-lõim
+märkab protsessi lõppemist ja käivitab selle uuesti eksponentsiaalse
+ootega (ooteaeg nullitakse, kui protsess jooksis vähemalt `STABLE_SECONDS`).
+
+Kasutus (api.py):
+    supervisor = BotSupervisor([sys.executable, "bot.py"], cwd=BOT_DIR)
+    supervisor.start()
+    supervisor.logs.wait(after=seq, timeout=15)   # SSE jaoks
+    supervisor.status()
+"""
+import os
+import time
+import logging
+import threading
+import subprocess
+from collections import deque
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+LOG_LINES = int(os.getenv('BOT_LOG_LINES', 2000))  # Ringpuhvri suurus (rida)
+MAX_LINE = 4096  # Pikemad read lõigatakse
+BACKOFF_MIN = 1.0
+BACKOFF_MAX = 60.0
+STABLE_SECONDS = 60  # Nii kaua jooksnud protsessi lõpp ei suurenda ooteaega
+
+
+class LogBuffer:
+    """Piiratud ringpuhver järjenumbritega ridadega; lugejad saavad uusi ridu oodata."""
+
+    def __init__(self, maxlen=LOG_LINES):
+        self.lines = deque(maxlen=maxlen)
+        self.seq = 0
+        self._cond = threading.Condition()
+
+    def append(self, line, source="bot"):
+        with self._cond:
+            self.seq += 1
+            self.lines.append({"seq": self.seq, "ts": datetime.now().isoformat(), "source": source, "line": line})
+            self._cond.notify_all()
+
+    def tail(self, after=0, limit=None):
+        """Read, mille seq > after (vanimad võivad olla puhvrist juba välja langenud)."""
+        with self._cond:
+            out = [e for e in self.lines if e["seq"] > after]
+        return out[-limit:] if limit else out
+
+    def wait(self, after, timeout=None):
+        """Ootab, kuni on ridu järjenumbriga > after. Tagastab need (või [] aegumisel)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.seq > after, timeout)
+        return self.tail(after)
+
+
+class BotSupervisor:
+    """Käivitab, jälgib ja vajadusel taaskäivitab ühe alamprotsessi."""
+
+    def __init__(self, cmd, cwd=None, env=None, max_restarts=None):
+        self.cmd = list(cmd)
+        self.cwd = cwd
+        self.env = {**os.environ, **(env or {}), "PYTHONUNBUFFERED": "1"}
+        self.max_restarts = max_restarts
+        self.logs = LogBuffer()
+        self.process = None
+        self.started_at = None      # järelevalve algus
+        self.last_start = None      # viimase protsessi käivitus (time.time())
+        self.restarts = 0
+        self.last_exit_code = None
+        self.last_exit_at = None
+        self.next_restart_at = None
+        self.error = None
+        self._thread = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def supervised(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def running(self):
+        proc = self.process
+        return proc is not None and proc.poll() is None
+
+    def start(self):
+        """Alustab järelevalvet. Tagastab False, kui see juba käib."""
+        with self._lock:
+            if self.supervised:
+                return False
+            self._stopping.clear()
+            self.started_at = datetime.now().isoformat()
+            self.restarts = 0
+            self.error = None
+            self._thread = threading.Thread(target=self._run, name="bot-supervisor", daemon=True)
+            self._thread.start()
+        return True
+
+    def stop(self, timeout=5):
+        """Peatab protsessi ja järelevalve. Tagastab "stopped", "killed" või None (ei jooksnud)."""
+        with self._lock:
+            if self._thread is None:
+                return None
+            self._stopping.set()
+            proc, thread = self.process, self._thread
+        result = "stopped"
+        if proc is not None and proc.poll() is None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+                result = "killed"
+        thread.join(timeout=timeout)
+        with self._lock:
+            self._thread = None
+            self.next_restart_at = None
+        return result
+
+    def status(self):
+        now = time.time()
+        running = self.running
+        proc = self.process
+        return {
+            "running": running,
+            "supervised": self.supervised,
+            "pid": proc.pid if running else None,
+            "started_at": self.started_at,
+            "uptime_seconds": round(now - self.last_start, 1) if running else 0,
+            "restarts": self.restarts,
+            "last_exit_code": self.last_exit_code,
+            "last_exit_at": self.last_exit_at,
+            "next_restart_in": round(max(0.0, self.next_restart_at - now), 1) if self.next_restart_at else None,
+            "error": self.error,
+        }
+
+    # --- Sisemine ---
+
+    def _spawn(self):
+        with self._lock:
+            if self._stopping.is_set():
+                return None
+            self.process = subprocess.Popen(
+                self.cmd, cwd=self.cwd, env=self.env,
+                stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+            )
+            self.last_start = time.time()
+            self.next_restart_at = None
+        self.logs.append(f"▶️ Protsess käivitatud (pid {self.process.pid})", source="supervisor")
+        return self.process
+
+    def _drain(self, proc):
+        """Loeb lapse väljundi tühjaks kuni toru sulgemiseni."""
+        for raw in iter(lambda: proc.stdout.readline(MAX_LINE), b""):
+            self.logs.append(raw.decode("utf-8", errors="replace").rstrip("\r\n"))
+        proc.stdout.close()
+
+    def _run(self):
+        failures = 0
+        while not self._stopping.is_set():
+            try:
+                proc = self._spawn()
+            except OSError as e:
+                proc = None
+                self.error = str(e)
+                logger.error(f"❌ Boti käivitus ebaõnnestus: {e}")
+            if proc is not None:
+                reader = threading.Thread(target=self._drain, args=(proc,), name="bot-output", daemon=True)
+                reader.start()
+                code = proc.wait()
+                reader.join(timeout=2)
+                ran = time.time() - self.last_start
+                self.last_exit_code, self.last_exit_at = code, datetime.now().isoformat()
+                if self._stopping.is_set():
+                    break
+                self.logs.append(f"⚠️ Protsess lõppes koodiga {code} ({ran:.0f}s)", source="supervisor")
+                logger.warning(f"⚠️ Bot lõppes ootamatult (kood {code}, jooksis {ran:.0f}s)")
+                failures = 0 if ran >= STABLE_SECONDS else failures + 1
+            elif self._stopping.is_set():
+                break
+            else:
+                failures += 1
+
+            if self.max_restarts is not None and self.restarts >= self.max_restarts:
+                self.error = f"Taaskäivituste piir ({self.max_restarts}) täis"
+                logger.error(f"❌ {self.error}")
+                break
+            delay = min(BACKOFF_MAX, BACKOFF_MIN * 2 ** max(failures - 1, 0))
+            self.next_restart_at = time.time() + delay
+            if self._stopping.wait(delay):
+                break
+            self.restarts += 1
+        with self._lock:
+            self.process = None
+            self.next_restart_at = None
@@ -0,0 +1,165 @@
+"""Strateegia parameetrite sweep mitme protsessoriga.
+
+Indikaatorid ja mudeli tõenäosused arvutatakse üks kord ning pannakse
+jagatud mällu (`multiprocessing.shared_memory`). Tööprotsessid loevad sama
+maatriksit ilma koopiata ja hindavad parameetrikombinatsioone paralleelselt.
+
+Strateegiad:
+    rsi  - backtester.py RSI reegel      (rsi_buy, rsi_sell)
+    ai   - backtest.py ostu/müügi reegel (buy_prob, stoch_max, take_profit, stop_loss, exit_prob)
+    bot  - bot.py kindluse lävi          (confidence)
+
+Käivitamine:
+    python sweep.py rsi --hours 2000 --grid '{"rsi_buy": [20, 25, 30], "rsi_sell": [70, 75, 80]}'
+    python sweep.py ai --hours 4000 --random '{"buy_prob": [0.4, 0.8], "take_profit": [0.5, 2.0]}' --samples 300
+"""
+import os
+import sys
+import json
+import random
+import logging
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from features import FEATURES, compute_range
+from strategies import BOT_CONFIDENCE, RSI_BUY, RSI_SELL, rsi_signals, simulate_ai, simulate_bot, simulate_rsi
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - [sweep] %(message)s')
+logger = logging.getLogger(__name__)
+
+COLUMNS = ['close', 'rsi', 'stoch_k', 'p_short', 'p_hold', 'p_long']
+COL = {name: i for i, name in enumerate(COLUMNS)}
+
+DEFAULTS = {
+    "rsi": {"rsi_buy": RSI_BUY, "rsi_sell": RSI_SELL},
+    "ai": {"buy_prob": 0.6, "stoch_max": 30, "take_profit": 1.0, "stop_loss": -0.5, "exit_prob": 0.3},
+    "bot": {"confidence": BOT_CONFIDENCE},
+}
+
+_matrix = None  # tööprotsessis: vaade jagatud mälule
+_shm = None
+
+
+# --- Andmed ---
+
+def build_matrix(hours):
+    """Küünlad -> indikaatorid -> mudeli tõenäosused, kõik üheks (n, 6) maatriksiks."""
+    import backtester
+
+    df = compute_range(backtester.store, backtester.SYMBOL, backtester.hours_ago_ms(hours))
+    probs = np.full((len(df), 3), np.nan)
+    if backtester.model is not None and len(df):
+        probs = backtester.model.predict_proba(df[FEATURES].to_numpy(dtype=np.float64))
+    matrix = np.column_stack([df['close'], df['rsi'], df['stoch_k'], probs]).astype(np.float64)
+    logger.info(f"📊 Maatriks valmis: {matrix.shape[0]} rida")
+    return matrix
+
+
+# --- Parameetrid ---
+
+def expand_grid(grid):
+    """{"a": [1, 2], "b": [3]} -> [{"a": 1, "b": 3}, {"a": 2, "b": 3}]"""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def sample_random(space, samples, seed=42):
+    """Juhuslik otsing: [lo, hi] on ühtlane vahemik (täisarvud, kui mõlemad on int),
+    pikem list on valikute hulk."""
+    rng = random.Random(seed)
+    combos = []
+    for _ in range(samples):
+        combo = {}
+        for key, spec in space.items():
+            if len(spec) == 2 and all(isinstance(v, int) for v in spec):
+                combo[key] = rng.randint(spec[0], spec[1])
+            elif len(spec) == 2:
+                combo[key] = round(rng.uniform(spec[0], spec[1]), 4)
+            else:
+                combo[key] = rng.choice(spec)
+        combos.append(combo)
+    return combos
+
+
+# --- Hindamine (tööprotsessis) ---
+
+def _attach(name, shape):
+    global _matrix, _shm
+    _shm = shared_memory.SharedMemory(name=name)
+    _matrix = np.ndarray(shape, dtype=np.float64, buffer=_shm.buf)
+
+
+def evaluate(strategy, params, matrix=None):
+    """Hindab ühte kombinatsiooni. Tagastab tulemuste rea."""
+    m = _matrix if matrix is None else matrix
+    p = {**DEFAULTS[strategy], **params}
+    close = m[:, COL['close']]
+
+    if strategy == "rsi":
+        actions = rsi_signals(m[:, COL['rsi']], rsi_buy=p['rsi_buy'], rsi_sell=p['rsi_sell'])
+        trades, _, pnl = simulate_rsi(close, actions)
+        sells = [t for t in trades if t['type'] == 'SELL']
+        closed, wins, score = len(sells), sum(1 for t in sells if t['pnl'] > 0), pnl
+    elif strategy == "ai":
+        balance, trades, wins = simulate_ai(close, m[:, COL['p_hold']], m[:, COL['stoch_k']], verbose=False, **p)
+        closed, score = trades // 2, balance - 100.0
+    else:
+        score, closed, wins = simulate_bot(close, m[:, COL['p_short']:COL['p_long'] + 1], p['confidence'])
+
+    return {**p, "score": float(score), "trades": int(closed),
+            "win_rate": (wins / closed * 100) if closed else 0.0}
+
+
+def _evaluate_chunk(strategy, combos):
+    return [evaluate(strategy, params) for params in combos]
+
+
+def run_sweep(matrix, strategy, combos, workers=None, chunk=8):
+    """Jagab maatriksi ja hindab kombinatsioonid protsessikogumis. Tagastab järjestatud tabeli."""
+    workers = workers or os.cpu_count() or 1
+    shm = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+    try:
+        shared = np.ndarray(matrix.shape, dtype=np.float64, buffer=shm.buf)
+        shared[:] = matrix
+        chunks = [combos[i:i + chunk] for i in range(0, len(combos), chunk)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                 initargs=(shm.name, matrix.shape)) as pool:
+            rows = [row for part in pool.map(_evaluate_chunk, [strategy] * len(chunks), chunks) for row in part]
+    finally:
+        shm.close()
+        shm.unlink()
+    return pd.DataFrame(rows).sort_values("score", ascending=False).reset_index(drop=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Strateegia parameetrite sweep")
+    parser.add_argument("strategy", choices=sorted(DEFAULTS))
+    parser.add_argument("--hours", type=int, default=500)
+    parser.add_argument("--grid", help='JSON, nt {"rsi_buy": [20, 30]}')
+    parser.add_argument("--random", help='JSON, nt {"buy_prob": [0.4, 0.8]}')
+    parser.add_argument("--samples", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--out", help="Salvesta kogu tabel CSV-na")
+    args = parser.parse_args()
+
+    if args.grid:
+        combos = expand_grid(json.loads(args.grid))
+    elif args.random:
+        combos = sample_random(json.loads(args.random), args.samples, args.seed)
+    else:
+        print("Anna --grid või --random")
+        sys.exit(1)
+
+    matrix = build_matrix(args.hours)
+    logger.info(f"🔀 {len(combos)} kombinatsiooni, strateegia {args.strategy}")
+    table = run_sweep(matrix, args.strategy, combos, args.workers)
+    if args.out:
+        table.to_csv(args.out, index=False)
+    print(table.head(args.top).to_string())
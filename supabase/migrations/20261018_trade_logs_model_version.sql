@@ -0,0 +1,3 @@
+
+-- Mudeli versioon, millega rida otsustati (bot/model_watch.py: faili sha256, 12 märki)
+ALTER TABLE public.trade_logs ADD COLUMN IF NOT EXISTS model_version TEXT;
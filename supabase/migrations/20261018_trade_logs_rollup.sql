@@ -0,0 +1,45 @@
+
+-- 5m / 1h koondread vanadest trade_logs ridadest (bot/cleaner.py)
+CREATE TABLE IF NOT EXISTS public.trade_logs_rollup (
+  id BIGSERIAL PRIMARY KEY,
+  symbol TEXT NOT NULL,
+  interval TEXT NOT NULL,
+  bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+  open NUMERIC NOT NULL,
+  high NUMERIC NOT NULL,
+  low NUMERIC NOT NULL,
+  close NUMERIC NOT NULL,
+  rows INTEGER NOT NULL,
+  volume NUMERIC,
+  rsi NUMERIC,
+  macd NUMERIC,
+  macd_signal NUMERIC,
+  vwap NUMERIC,
+  stoch_k NUMERIC,
+  stoch_d NUMERIC,
+  atr NUMERIC,
+  ema200 NUMERIC,
+  market_pressure NUMERIC,
+  bb_upper NUMERIC,
+  bb_lower NUMERIC,
+  bot_confidence NUMERIC,
+  action TEXT,
+  avg_entry_price NUMERIC,
+  pnl NUMERIC,
+  UNIQUE (symbol, interval, bucket)
+);
+
+CREATE INDEX IF NOT EXISTS trade_logs_rollup_interval_bucket_idx
+  ON public.trade_logs_rollup (interval, bucket);
+
+-- Puhastaja otsib vanu HOLD ridu ja loeb ridu ajas järjest
+CREATE INDEX IF NOT EXISTS trade_logs_action_created_at_idx
+  ON public.trade_logs (action, created_at);
+
+-- Kirjutab ainult bot/cleaner.py teenusevõtmega (SUPABASE_KEY, möödub RLS-ist), anon võti saab ainult lugeda
+ALTER TABLE public.trade_logs_rollup ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Anyone can view trade_logs_rollup"
+  ON public.trade_logs_rollup
+  FOR SELECT
+  USING (true);